@@ -0,0 +1,275 @@
+# =====================================================
+# alert_journal.py
+# Append-only, segmented alert journal for Mini-SIEM.
+# Each alert is written as one JSON line (NDJSON) to the active segment.
+# Full segments are sealed with an atomic rename, and the oldest
+# sealed segments are removed to bound disk usage.
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import json
+import os
+import re
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+JOURNAL_DIR = "alerts_journal"   # Directory holding all segment files
+SEGMENT_MAX_ALERTS = 1000        # Alerts per segment before rotation
+MAX_SEGMENTS = 1000              # Sealed segments kept on disk (~1 million alerts)
+
+ACTIVE_SUFFIX = ".open"          # Segment currently being written
+SEALED_SUFFIX = ".ndjson"        # Finished, read-only segment
+
+_SEGMENT_RE = re.compile(r"^segment-(\d{8})(\.open|\.ndjson)$")
+
+# =====================================================
+# Segment helpers (shared by writer and readers)
+# =====================================================
+
+def segment_name(seq, sealed):
+    """Return the file name for segment number `seq`."""
+    return f"segment-{seq:08d}{SEALED_SUFFIX if sealed else ACTIVE_SUFFIX}"
+
+
+def list_segments(directory=JOURNAL_DIR):
+    """
+    Return all segments in the journal as (seq, path, sealed) tuples,
+    sorted oldest first.
+    """
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for name in os.listdir(directory):
+        match = _SEGMENT_RE.match(name)
+        if match:
+            seq = int(match.group(1))
+            sealed = match.group(2) == SEALED_SUFFIX
+            segments.append((seq, os.path.join(directory, name), sealed))
+    segments.sort()
+    return segments
+
+
+def find_segment(seq, directory=JOURNAL_DIR):
+    """
+    Return the current path of segment `seq`, or None if it no longer exists.
+    A segment can move from `.open` to `.ndjson` while a reader follows it.
+    """
+    # Check the active name first: if it is renamed between the two checks,
+    # the sealed name is found on the second one.
+    for sealed in (False, True):
+        path = os.path.join(directory, segment_name(seq, sealed))
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_records(path, offset=0):
+    """
+    Read complete NDJSON records from `path` starting at byte `offset`.
+    Returns (records, new_offset). A trailing line without a newline is
+    treated as still being written and is left for the next call.
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+
+    end = data.rfind(b"\n")
+    if end < 0:
+        return [], offset
+
+    records = []
+    for line in data[:end].split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # Skip garbage left by a crash; the writer repairs it on startup
+            continue
+    return records, offset + end + 1
+
+# =====================================================
+# Journal writer
+# =====================================================
+
+class AlertJournal:
+    """
+    Append-only writer for the alert journal.
+    - append() writes one line to the active segment: O(1) per event
+    - full segments are sealed by an atomic os.replace()
+    - on startup, a torn final line from a crash is truncated away
+    - on_seal(seq, path) is called after each rotation (e.g. to archive it)
+    """
+
+    def __init__(self, directory=JOURNAL_DIR, segment_max_alerts=SEGMENT_MAX_ALERTS,
+                 max_segments=MAX_SEGMENTS, fsync=True, on_seal=None):
+        self.directory = directory
+        self.segment_max_alerts = segment_max_alerts
+        self.max_segments = max_segments
+        self.fsync = fsync
+        self.on_seal = on_seal
+        self._file = None
+        self._seq = 0
+        self._count = 0
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    # -----------------------------
+    # Startup recovery
+    # -----------------------------
+    def _recover(self):
+        """Repair the journal after an unclean shutdown and open the active segment."""
+        segments = list_segments(self.directory)
+        active = [s for s in segments if not s[2]]
+
+        # A crash during rotation can leave more than one active segment.
+        # Only the newest may stay open; older ones are sealed.
+        for seq, path, _ in active[:-1]:
+            self._truncate_torn_tail(path)
+            os.replace(path, os.path.join(self.directory, segment_name(seq, True)))
+
+        if active:
+            seq, path, _ = active[-1]
+            self._truncate_torn_tail(path)
+            self._seq = seq
+            self._count = self._count_lines(path)
+        else:
+            last_seq = segments[-1][0] if segments else 0
+            self._seq = last_seq + 1
+            self._count = 0
+
+        self._open_active()
+        if self._count >= self.segment_max_alerts:
+            self._rotate()
+        self._enforce_retention()
+
+    @staticmethod
+    def _truncate_torn_tail(path):
+        """Cut off a partially written last line (no trailing newline)."""
+        with open(path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+
+    @staticmethod
+    def _count_lines(path):
+        with open(path, "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    def _open_active(self):
+        path = os.path.join(self.directory, segment_name(self._seq, False))
+        self._file = open(path, "ab")
+
+    def _sync(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, alert):
+        """Append a single alert to the journal."""
+        self.append_many([alert])
+
+    def append_many(self, alerts):
+        """Append several alerts, rotating segments as they fill up."""
+        for alert in alerts:
+            line = json.dumps(alert, ensure_ascii=False) + "\n"
+            self._file.write(line.encode("utf-8"))
+            self._count += 1
+            if self._count >= self.segment_max_alerts:
+                self._rotate()
+        self._sync()
+
+    def _rotate(self):
+        """Seal the active segment with an atomic rename and start a new one."""
+        self._sync()
+        self._file.close()
+        active_path = os.path.join(self.directory, segment_name(self._seq, False))
+        sealed_path = os.path.join(self.directory, segment_name(self._seq, True))
+        os.replace(active_path, sealed_path)
+        self._seq += 1
+        self._count = 0
+        self._open_active()
+        self._enforce_retention()
+        if self.on_seal is not None:
+            self.on_seal(self._seq - 1, sealed_path)
+
+    def _enforce_retention(self):
+        """Delete the oldest sealed segments beyond `max_segments`."""
+        sealed = [s for s in list_segments(self.directory) if s[2]]
+        for _, path, _ in sealed[:max(0, len(sealed) - self.max_segments)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        if self._file and not self._file.closed:
+            self._sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# =====================================================
+# Journal readers
+# =====================================================
+
+class JournalReader:
+    """
+    Follows the journal like `tail -f`: remembers which segment and byte
+    offset it has read up to, and only parses newly appended lines.
+    """
+
+    def __init__(self, directory=JOURNAL_DIR):
+        self.directory = directory
+        self._seq = None     # Segment currently being followed
+        self._offset = 0     # Byte offset inside that segment
+        self.bytes_read = 0  # Total bytes consumed (exported as a metric)
+
+    def read_new(self):
+        """Return the alerts appended since the previous call, oldest first."""
+        segments = list_segments(self.directory)
+        if not segments:
+            return []
+
+        seqs = [seq for seq, _, _ in segments]
+        # Start from the oldest segment, or skip ahead if ours was deleted by retention
+        if self._seq is None or self._seq < seqs[0]:
+            self._seq, self._offset = seqs[0], 0
+
+        new = []
+        while True:
+            path = find_segment(self._seq, self.directory)
+            if path is not None:
+                records, offset = read_records(path, self._offset)
+                self.bytes_read += offset - self._offset
+                self._offset = offset
+                new.extend(records)
+
+            # Move on only once the segment we just read was sealed (or
+            # deleted) and a newer one exists. A segment sealed after our
+            # read is finished on the next call, from the same offset.
+            later = [seq for seq in seqs if seq > self._seq]
+            if not later or (path is not None and path.endswith(ACTIVE_SUFFIX)):
+                return new
+            self._seq, self._offset = later[0], 0
+
+
+def iter_alerts(directory=JOURNAL_DIR):
+    """Yield every complete alert in the journal, oldest first."""
+    for seq, _, _ in list_segments(directory):
+        path = find_segment(seq, directory)
+        if path:
+            records, _ = read_records(path)
+            yield from records
@@ -0,0 +1,458 @@
+# =====================================================
+# alert_store.py
+# Shared in-process alert store for the Mini-SIEM dashboard.
+# Follows the alert journal (or SQLite table) like `tail -f`: only alerts
+# appended since the previous refresh are read and parsed.
+# Severity, type and IP counters are kept up to date as alerts arrive,
+# and per-field indexes serve filtered, paginated queries:
+#   - hash indexes: severity/type/ip (+ host/user/file parsed from the log
+#     line, + threat intel tags) -> increasing list of alert ids
+#   - time index: epoch seconds per alert, bisected for time ranges
+#   - ranked IP counter: top-k IPs without scanning every IP
+#   - time-series rollups (rollups.py) for the charts
+#   - top-k / distinct-IP sketches per time bucket (sketches.py), saved to
+#     disk so the long-term statistics survive restarts
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import calendar
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from alert_journal import JOURNAL_DIR, MAX_SEGMENTS, SEGMENT_MAX_ALERTS, JournalReader
+from log_parser import parse_alert
+from rollups import Rollups
+from sketches import SourceSketches
+
+# Keep roughly what the journal keeps on disk (sealed segments + the active one)
+MAX_STORE_ALERTS = SEGMENT_MAX_ALERTS * (MAX_SEGMENTS + 1)
+SKETCH_SAVE_INTERVAL = 60  # Seconds between sketch snapshots while alerts keep arriving
+
+INDEXED_FIELDS = ("severity", "type", "ip", "host", "user", "file", "intel")  # Fields with a hash index
+PARSED_FIELDS = ("host", "user", "file")  # Copied onto the alert from its parsed `log` line
+
+# Repeated values are interned so a million alerts share one copy of each string
+INTERNED_FIELDS = ("time", "severity", "type", "ip", "description", "intel") + PARSED_FIELDS
+
+
+def parse_time(text):
+    """
+    Convert "YYYY-MM-DD HH:MM:SS" (or ISO with "T") to epoch seconds.
+    The string is treated as UTC; only differences and ordering matter here.
+    Raises ValueError on malformed input.
+    """
+    try:
+        return calendar.timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                                int(text[11:13]), int(text[14:16]), int(text[17:19]), 0, 0, 0))
+    except (TypeError, IndexError, ValueError):
+        raise ValueError(f"invalid time: {text!r}") from None
+
+
+class _Window:
+    """
+    Append-only list that drops items from the front in amortized O(1).
+    Dropped slots are only reclaimed once they make up half the list.
+    """
+    __slots__ = ("items", "head")
+
+    def __init__(self):
+        self.items = []
+        self.head = 0
+
+    def append(self, item):
+        self.items.append(item)
+
+    def popleft(self):
+        item = self.items[self.head]
+        self.head += 1
+        if self.head >= 1024 and self.head * 2 >= len(self.items):
+            del self.items[:self.head]
+            self.head = 0
+        return item
+
+    def __getitem__(self, i):
+        return self.items[self.head + i] if i >= 0 else self.items[i]
+
+    def __len__(self):
+        return len(self.items) - self.head
+
+    def bisect_left(self, x):
+        """Index (relative to the window) of the first item >= x."""
+        return bisect_left(self.items, x, self.head) - self.head
+
+    def bisect_right(self, x):
+        """Index (relative to the window) of the first item > x."""
+        return bisect_right(self.items, x, self.head) - self.head
+
+
+class _RankedCounter:
+    """
+    Counter for top-k queries in O(k), with O(1) increments and decrements.
+    Keys with the same count share a bucket; buckets form a linked list
+    sorted by count (the "stream summary" layout used by Space-Saving).
+    """
+
+    class _Bucket:
+        __slots__ = ("count", "keys", "lower", "higher")
+
+        def __init__(self, count, lower, higher):
+            self.count = count
+            self.keys = {}   # Used as an insertion-ordered set
+            self.lower = lower
+            self.higher = higher
+
+    def __init__(self):
+        self._buckets = {}  # key -> bucket
+        self._lowest = None
+        self._highest = None
+
+    def _insert_after(self, lower, count):
+        """Create a bucket for `count` directly above `lower` (None = at the bottom)."""
+        higher = lower.higher if lower else self._lowest
+        bucket = self._Bucket(count, lower, higher)
+        if lower:
+            lower.higher = bucket
+        else:
+            self._lowest = bucket
+        if higher:
+            higher.lower = bucket
+        else:
+            self._highest = bucket
+        return bucket
+
+    def _unlink(self, bucket):
+        if bucket.lower:
+            bucket.lower.higher = bucket.higher
+        else:
+            self._lowest = bucket.higher
+        if bucket.higher:
+            bucket.higher.lower = bucket.lower
+        else:
+            self._highest = bucket.lower
+
+    def add(self, key, delta):
+        """Change the count of `key` by +1 or -1; keys reaching 0 are removed."""
+        old = self._buckets.get(key)
+        count = (old.count if old else 0) + delta
+        if delta > 0:
+            target = old.higher if old else self._lowest
+            if target is None or target.count != count:
+                target = self._insert_after(old, count)
+        elif count > 0:
+            target = old.lower
+            if target is None or target.count != count:
+                target = self._insert_after(old.lower, count)
+        else:
+            target = None
+
+        if old:
+            del old.keys[key]
+            if not old.keys:
+                self._unlink(old)
+        if target:
+            target.keys[key] = None
+            self._buckets[key] = target
+        else:
+            del self._buckets[key]
+
+    def most_common(self, n):
+        """Return the `n` keys with the highest counts as (key, count) pairs."""
+        result = []
+        bucket = self._highest
+        while bucket and len(result) < n:
+            for key in bucket.keys:
+                result.append((key, bucket.count))
+                if len(result) == n:
+                    break
+            bucket = bucket.lower
+        return result
+
+    def __getitem__(self, key):
+        bucket = self._buckets.get(key)
+        return bucket.count if bucket else 0
+
+    def __contains__(self, key):
+        return key in self._buckets
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AlertStore:
+    """
+    Incrementally loaded view of the alert journal.
+    - refresh() reads only alerts appended since the previous call
+    - counters are updated per new alert instead of recounted per request
+    - every alert gets an increasing `id`; severity/type/ip map to id lists
+    - alert times are kept as a sorted epoch array for time-range bisection
+    - the oldest alerts are evicted once `max_alerts` is reached
+    """
+
+    def __init__(self, directory=JOURNAL_DIR, max_alerts=MAX_STORE_ALERTS, enrich=None, source=None,
+                 sketch_path=None):
+        # Where new alerts come from: anything with read_new() (journal by default,
+        # see storage.open_reader() for SQLite); None for a store fed via ingest()
+        if source is None and directory is not None:
+            source = JournalReader(directory)
+        self.source = source
+        self.max_alerts = max_alerts
+        self.enrich = enrich            # Optional callback run once per new alert
+        self.alerts = _Window()         # Oldest first; alert `id` = position + first id
+        self.severities = Counter()
+        self.types = Counter()
+        self.ips = _RankedCounter()
+        self.index = {field: {} for field in INDEXED_FIELDS}  # field -> value -> _Window of ids
+        self.times = _Window()          # Epoch seconds per alert, parallel to `alerts`
+        self.rollups = Rollups()        # Per-minute/hour/day counts; outlive evicted alerts
+        # Top IPs / unique IPs per time bucket, kept in a snapshot file at `sketch_path`
+        self.sketch_path = sketch_path
+        if sketch_path and os.path.exists(sketch_path):
+            self.sketches = SourceSketches.load(sketch_path)
+        else:
+            self.sketches = SourceSketches()
+        # Alerts before this second, and the first `_sketched_at_end` alerts with an
+        # IP in it, are already in the snapshot; re-reading the journal must not
+        # count them twice, nor skip later alerts that share the last second
+        self._sketched_through = self.sketches.latest
+        self._sketched_at_end = self.sketches.latest_count
+        self._sketches_saved = time.monotonic()
+        self.version = 0                # Number of alerts ingested so far (= newest id)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # Notified when new alerts arrive
+
+    # -----------------------------
+    # Ingest
+    # -----------------------------
+    def refresh(self):
+        """Read newly appended alerts from the source. Returns how many were added."""
+        with self._lock:
+            if self.source is None:
+                return 0
+            records = self.source.read_new()
+            for alert in records:
+                self._add(alert)
+            if records:
+                self._changed.notify_all()
+                if self.sketch_path and time.monotonic() - self._sketches_saved >= SKETCH_SAVE_INTERVAL:
+                    self._save_sketches()
+            return len(records)
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the store has moved past `version` (or the timeout expires)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def ingest(self, alerts):
+        """Add alerts that did not come from the journal (e.g. benchmarks or other sources)."""
+        with self._lock:
+            for alert in alerts:
+                self._add(alert)
+            if alerts:
+                self._changed.notify_all()
+
+    def _add(self, alert):
+        if self.enrich:
+            self.enrich(alert)
+        parsed = parse_alert(alert)
+        for field in PARSED_FIELDS:
+            if field in parsed and field not in alert:
+                alert[field] = parsed[field]
+        for field in INTERNED_FIELDS:
+            value = alert.get(field)
+            if type(value) is str:
+                alert[field] = sys.intern(value)
+        self.version += 1
+        alert["id"] = self.version
+        self.alerts.append(alert)
+
+        # The time index must stay sorted: a missing, malformed or out-of-order
+        # time is filed under the previous alert's time
+        last = self.times[-1] if len(self.times) else 0
+        try:
+            epoch = max(parse_time(alert.get("time")), last)
+        except ValueError:
+            epoch = last
+        self.times.append(epoch)
+        self.rollups.add(epoch, alert)
+        ip = alert.get("ip")
+        if ip:
+            if self._sketched_through is None or epoch > self._sketched_through:
+                self.sketches.add(epoch, ip)
+            elif epoch == self._sketched_through:
+                if self._sketched_at_end:
+                    self._sketched_at_end -= 1
+                else:
+                    self.sketches.add(epoch, ip)
+
+        self._count(alert, 1)
+        for field, postings in self.index.items():
+            value = alert.get(field)
+            if value:
+                ids = postings.get(value)
+                if ids is None:
+                    ids = postings[value] = _Window()
+                ids.append(alert["id"])
+        while len(self.alerts) > self.max_alerts:
+            self.times.popleft()
+            self._evict(self.alerts.popleft())
+
+    def _evict(self, alert):
+        self._count(alert, -1)
+        # The evicted alert is the oldest, so its id is first in every list it is in
+        for field, postings in self.index.items():
+            value = alert.get(field)
+            if value:
+                ids = postings[value]
+                ids.popleft()
+                if not len(ids):
+                    del postings[value]
+
+    def _count(self, alert, delta):
+        self.severities[alert.get("severity")] += delta
+        self.types[alert.get("type")] += delta
+        ip = alert.get("ip")
+        if ip:
+            self.ips.add(ip, delta)
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def _get(self, alert_id):
+        """Return the alert with the given id (must still be in the store)."""
+        return self.alerts[alert_id - (self.version - len(self.alerts) + 1)]
+
+    def newest(self, limit=None):
+        """Return up to `limit` alerts, newest first."""
+        alerts, _ = self.since(0, limit)
+        alerts.reverse()
+        return alerts
+
+    def since(self, version, limit=None):
+        """
+        Return (alerts, version): alerts ingested after `version`, oldest first.
+        Only the newest `limit` are returned if more have arrived.
+        """
+        with self._lock:
+            missed = min(max(self.version - version, 0), len(self.alerts))
+            if limit is not None:
+                missed = min(missed, limit)
+            return [self.alerts[i] for i in range(len(self.alerts) - missed, len(self.alerts))], self.version
+
+    def _id_range(self, start, end, cursor):
+        """Translate time bounds and a cursor into a half-open id range [lo, hi)."""
+        first_id = self.version - len(self.alerts) + 1
+        lo = first_id + (self.times.bisect_left(parse_time(start)) if start else 0)
+        hi = first_id + (self.times.bisect_right(parse_time(end)) if end else len(self.times))
+        if cursor is not None:
+            hi = min(hi, cursor)
+        return lo, hi
+
+    @staticmethod
+    def _active_filters(**filters):
+        return {field: value for field, value in filters.items() if value}
+
+    def query(self, severity=None, type=None, ip=None, host=None, user=None, file=None, intel=None,
+              start=None, end=None, cursor=None, limit=50):
+        """
+        Return (alerts, next_cursor) for alerts matching every given filter, newest first.
+        - severity/type/ip/host/user/file/intel are exact matches served from the hash indexes
+        - start/end bound the "YYYY-MM-DD HH:MM:SS" time (inclusive), via the time index
+        - cursor is the `next_cursor` of the previous page (only ids below it are returned)
+        next_cursor is None on the last page. Raises ValueError for malformed times.
+        """
+        filters = self._active_filters(severity=severity, type=type, ip=ip, host=host, user=user, file=file,
+                                       intel=intel)
+
+        with self._lock:
+            if not len(self.alerts):
+                return [], None
+            lo, hi = self._id_range(start, end, cursor)
+
+            # Walk the shortest matching id list inside [lo, hi); other filters are checked per alert
+            if filters:
+                lists = [self.index[field].get(value) for field, value in filters.items()]
+                if any(ids is None for ids in lists):
+                    return [], None
+                ids = min(lists, key=len)
+                candidates = (ids[i] for i in range(ids.bisect_left(hi) - 1, ids.bisect_left(lo) - 1, -1))
+            else:
+                candidates = range(hi - 1, lo - 1, -1)
+
+            page = []
+            for alert_id in candidates:
+                alert = self._get(alert_id)
+                if any(alert.get(field) != value for field, value in filters.items()):
+                    continue
+                page.append(alert)
+                if len(page) > limit:
+                    break
+
+            if len(page) > limit:
+                page.pop()
+                return page, page[-1]["id"]
+            return page, None
+
+    def count(self, severity=None, type=None, ip=None, host=None, user=None, file=None, intel=None,
+              start=None, end=None):
+        """
+        Count alerts matching the filters. With at most one field filter
+        this is two binary searches, e.g. "alerts from IP X in the last hour".
+        """
+        filters = self._active_filters(severity=severity, type=type, ip=ip, host=host, user=user, file=file,
+                                       intel=intel)
+
+        with self._lock:
+            if not len(self.alerts):
+                return 0
+            lo, hi = self._id_range(start, end, None)
+            if not filters:
+                return max(hi - lo, 0)
+            lists = [self.index[field].get(value) for field, value in filters.items()]
+            if any(ids is None for ids in lists):
+                return 0
+            ids = min(lists, key=len)
+            first, last = ids.bisect_left(lo), ids.bisect_left(hi)
+            if len(filters) == 1:
+                return max(last - first, 0)
+            return sum(1 for i in range(first, last)
+                       if all(self._get(ids[i]).get(field) == value for field, value in filters.items()))
+
+    def series(self, window, by="severity"):
+        """Chart-ready counts for the last `window` seconds (see Rollups.series)."""
+        with self._lock:
+            return self.rollups.series(window, by)
+
+    def top_ips(self, n=5):
+        """Return the `n` most frequent IPs held in the store as exact (ip, count) pairs."""
+        with self._lock:
+            return self.ips.most_common(n)
+
+    def sources(self, window=None, n=10):
+        """
+        Estimated top `n` IPs and number of distinct IPs over the last `window`
+        seconds (None = all history), from the sketches (see SourceSketches.summary).
+        Unlike top_ips() this includes alerts already evicted from the store.
+        """
+        with self._lock:
+            return self.sketches.summary(window, n)
+
+    # -----------------------------
+    # Sketch snapshots
+    # -----------------------------
+    def _save_sketches(self):
+        self.sketches.save(self.sketch_path)
+        self._sketches_saved = time.monotonic()
+
+    def save_sketches(self):
+        """Write the sketch snapshot now (e.g. at shutdown). Does nothing without a sketch_path or data."""
+        with self._lock:
+            if self.sketch_path and self.sketches.latest is not None:
+                self._save_sketches()
+
+    def __len__(self):
+        return len(self.alerts)
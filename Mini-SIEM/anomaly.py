@@ -0,0 +1,177 @@
+# =====================================================
+# anomaly.py
+# Streaming rate-anomaly detection for Mini-SIEM.
+# Counts events per key (IP, host) in fixed time buckets and compares each
+# key's count with an exponentially weighted baseline of its own history
+# (or, for keys without enough history, of all keys). Memory stays bounded
+# however many distinct keys appear:
+#   - rarely seen keys only touch a fixed-size count-min sketch
+#   - keys busy enough to matter are promoted to a bounded LRU of baselines
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import math
+from array import array
+from collections import OrderedDict
+
+# =====================================================
+# Count-min sketch
+# =====================================================
+
+class CountMinSketch:
+    """
+    Approximate counts for any number of keys in width * depth counters.
+    Estimates never undercount; with conservative update they overcount
+    by at most about total / width with high probability.
+    """
+
+    def __init__(self, width=1 << 16, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = array("I", bytes(4 * width * depth))
+
+    def _slots(self, key):
+        # Double hashing: depth independent-enough rows from two hashes
+        h1 = hash(key)
+        h2 = hash((key, 0x9E3779B9)) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Count `key` and return its new estimate."""
+        table = self.table
+        slots = self._slots(key)
+        estimate = min(table[i] for i in slots) + count
+        # Conservative update: only raise counters that are below the new estimate
+        for i in slots:
+            if table[i] < estimate:
+                table[i] = min(estimate, 0xFFFFFFFF)
+        return estimate
+
+    def estimate(self, key):
+        table = self.table
+        return min(table[i] for i in self._slots(key))
+
+    def clear(self):
+        self.table = array("I", bytes(4 * self.width * self.depth))
+
+    @property
+    def nbytes(self):
+        return self.table.itemsize * len(self.table)
+
+# =====================================================
+# Detector
+# =====================================================
+
+# Per-key state list indexes (a list is smaller and faster than an object)
+_BUCKET, _COUNT, _MEAN, _SQUARES, _SEEN, _LIMIT = range(6)
+
+
+class RateAnomalyDetector:
+    """
+    Flags keys whose event count in the current `interval`-second bucket is
+    far above their exponentially weighted moving average.
+    - alpha: EWMA weight of the newest bucket
+    - threshold: standard deviations above the mean that count as anomalous
+    - min_count: never flag fewer events than this in one bucket
+    - track_count: events in one bucket before a key gets its own baseline
+    - warmup: buckets of history before a key is judged against itself
+      (until then the baseline of all tracked keys is used)
+    - max_keys: tracked keys kept; the least recently seen are dropped first
+    Each key is flagged at most once per bucket.
+    """
+
+    def __init__(self, interval=60, alpha=0.3, threshold=4.0, min_count=20, track_count=5, warmup=3,
+                 max_keys=100_000, sketch_width=1 << 16, sketch_depth=4):
+        self.interval = interval
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_count = min_count
+        self.track_count = track_count
+        self.warmup = warmup
+        self.max_keys = max_keys
+        self.sketch = CountMinSketch(sketch_width, sketch_depth)
+        # key -> [bucket, count, mean, mean of squares, buckets seen, limit for this bucket]
+        self.state = OrderedDict()
+        self.bucket = None           # Bucket the sketch is counting
+        # Baseline over all tracked keys, for keys without their own history yet
+        self.pop_mean = 0.0
+        self.pop_squares = 0.0
+        self.pop_alpha = 0.01
+
+    def _fold(self, entry, bucket):
+        """Close the key's finished bucket into its averages and move it to `bucket`."""
+        count, a = entry[_COUNT], self.alpha
+        if entry[_SEEN]:
+            entry[_MEAN] += a * (count - entry[_MEAN])
+            entry[_SQUARES] += a * (count * count - entry[_SQUARES])
+        else:
+            entry[_MEAN], entry[_SQUARES] = float(count), float(count * count)
+        pa = self.pop_alpha
+        self.pop_mean += pa * (count - self.pop_mean)
+        self.pop_squares += pa * (count * count - self.pop_squares)
+
+        # Buckets without any event are zeros: each one only decays the averages
+        gap = bucket - entry[_BUCKET] - 1
+        if gap > 0:
+            decay = (1 - a) ** min(gap, 100)
+            entry[_MEAN] *= decay
+            entry[_SQUARES] *= decay
+        entry[_SEEN] += 1 + max(gap, 0)
+        entry[_BUCKET], entry[_COUNT], entry[_LIMIT] = bucket, 0, None
+
+    def baseline(self, key):
+        """(mean, standard deviation) a key's bucket count is compared with."""
+        entry = self.state.get(key)
+        if entry is not None and entry[_SEEN] >= self.warmup:
+            mean, squares = entry[_MEAN], entry[_SQUARES]
+        else:
+            mean, squares = self.pop_mean, self.pop_squares
+        return mean, math.sqrt(max(squares - mean * mean, 0.0))
+
+    def limit(self, key):
+        """Smallest bucket count that is anomalous for `key` right now."""
+        mean, sd = self.baseline(key)
+        # Poisson-like floor so near-constant baselines do not flag tiny wobbles
+        return max(self.min_count, mean + self.threshold * max(sd, math.sqrt(mean), 1.0))
+
+    def observe(self, key, ts):
+        """
+        Count one event for `key` at epoch second `ts`. Returns None, or a dict
+        (count, expected, limit) the first time the key is anomalous in this bucket.
+        """
+        bucket = int(ts) // self.interval
+        if self.bucket is None or bucket > self.bucket:
+            self.sketch.clear()  # Only the current bucket is needed for promotion
+            self.bucket = bucket
+
+        state = self.state
+        entry = state.get(key)
+        if entry is None:
+            estimate = self.sketch.add(key)
+            if estimate < self.track_count:
+                return None
+            entry = state[key] = [bucket, estimate, 0.0, 0.0, 0, None]
+            if len(state) > self.max_keys:
+                state.popitem(last=False)
+        else:
+            if bucket > entry[_BUCKET]:
+                # Recency is only updated once per bucket; cheaper than on every event
+                state.move_to_end(key)
+                self._fold(entry, bucket)
+            entry[_COUNT] += 1  # Late events count towards the key's current bucket
+
+        count = entry[_COUNT]
+        if count < self.min_count:
+            return None
+        limit = entry[_LIMIT]
+        if limit is None:
+            # The baseline only changes between buckets, so compute the limit once per bucket
+            limit = entry[_LIMIT] = self.limit(key)
+        if count < limit:
+            return None
+        entry[_LIMIT] = math.inf  # Flag once per bucket
+        return {"count": count, "expected": self.baseline(key)[0], "limit": limit}
+
+    def __len__(self):
+        return len(self.state)
@@ -0,0 +1,569 @@
+# =====================================================
+# archive.py
+# Columnar long-term archive for Mini-SIEM.
+# Sealed journal segments are compacted, a hundred at a time, into one
+# read-only archive file, so months of alerts fit on disk and a search
+# for one IP over a month only touches the files that can contain it.
+# Layout: magic, JSON header, then 8-byte aligned columns:
+#   bloom             per-file bloom filter over every source IP
+#   time              int64 epoch per row, never decreasing
+#   severity, type,   dictionary codes (uint8/16/32, 0 = missing),
+#   host, ip_text     the dictionaries are in the header
+#   ip                IPv4 packed into a uint32 (0 = not IPv4, see ip_text)
+#   log, extra        zlib blocks of JSON lines, 4096 rows per block
+# The header also holds the file's min/max time, so a search skips files
+# outside its time range or whose bloom filter rules the IP out.
+# Usage:  python archive.py compact [--force]
+#         python archive.py search --ip 10.0.0.5 --start 2025-11-01 --end 2025-11-30
+#         python archive.py stats
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import json
+import math
+import mmap
+import os
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+from alert_journal import JOURNAL_DIR, list_segments, read_records
+from alert_store import parse_time
+from correlation import key_value
+from sketches import hash64
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+ARCHIVE_DIR = os.environ.get("MINI_SIEM_ARCHIVE", "alerts_archive")  # "" turns compaction off
+SEGMENTS_PER_FILE = 100      # Sealed journal segments per archive file (~100k alerts)
+BLOCK_ROWS = 4096            # Rows per compressed block of log lines
+BLOOM_BITS_PER_IP = 10       # With 7 hashes: ~1 % false positives
+BLOOM_HASHES = 7
+COMPRESS_LEVEL = 6
+
+MAGIC = b"MSIEMAR1"
+_HEADER = struct.Struct("<8sI")   # magic, length of the JSON header that follows
+_ALIGN = 8
+_NAME_RE = re.compile(r"^archive-(\d{8})-(\d{8})\.col$")
+
+CODED_FIELDS = ("severity", "type", "host")   # Dictionary-encoded and searchable
+_COLUMN_FIELDS = ("time", "severity", "type", "ip", "log")  # Stored in columns; the rest go to `extra`
+
+
+def archive_name(first_seq, last_seq):
+    return f"archive-{first_seq:08d}-{last_seq:08d}.col"
+
+
+def format_time(epoch):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch))
+
+
+def pack_ipv4(ip):
+    """'10.0.0.5' -> 167772165; None for anything that is not a dotted IPv4 address (or 0.0.0.0)."""
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big") or None
+    except (OSError, TypeError):
+        return None
+
+
+def _code_type(size):
+    """Smallest array typecode that holds codes 0..size."""
+    return "B" if size < 256 else "H" if size < 65536 else "I"
+
+
+def _bloom_positions(key, bits):
+    """Bit positions for `key`: double hashing from one stable 64-bit hash."""
+    h = hash64(key)
+    h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+    return [(h1 + i * h2) % bits for i in range(BLOOM_HASHES)]
+
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % _ALIGN))
+
+# =====================================================
+# Writing one archive file
+# =====================================================
+
+def _text_blocks(values):
+    """JSON lines in zlib blocks of BLOCK_ROWS rows -> (block end offsets, compressed bytes)."""
+    offsets = array("Q", [0])
+    blocks = []
+    total = 0
+    for start in range(0, len(values), BLOCK_ROWS):
+        text = "\n".join(values[start:start + BLOCK_ROWS])
+        block = zlib.compress(text.encode("utf-8"), COMPRESS_LEVEL)
+        blocks.append(block)
+        total += len(block)
+        offsets.append(total)
+    return offsets, b"".join(blocks)
+
+
+def write_archive(path, alerts, first_seq=0, last_seq=0):
+    """
+    Write `alerts` (oldest first) as one archive file, atomically.
+    Returns the header (rows, min_time, max_time, ...).
+    """
+    rows = len(alerts)
+    codes = {field: {} for field in CODED_FIELDS + ("ip_text",)}   # field -> {value: code}
+    columns = {field: [] for field in CODED_FIELDS + ("ip_text",)}
+    times = array("q")
+    ips = array("I")
+    logs, extras = [], []
+    last = 0
+    for alert in alerts:
+        # Sorted like the store's time index: unparsable or out-of-order times use the previous one
+        original = alert.get("time")
+        try:
+            last = max(parse_time(original), last)
+        except ValueError:
+            pass
+        times.append(last)
+        extra = {k: v for k, v in alert.items() if k not in _COLUMN_FIELDS}
+        if original != format_time(last):
+            extra["time"] = original   # Kept as written (also when missing: None)
+
+        for field in CODED_FIELDS:
+            value = key_value(alert, field) if field == "host" else alert.get(field)
+            if type(value) is not str:
+                if value is not None and field != "host":
+                    extra[field] = value
+                value = None
+            table = codes[field]
+            code = table.get(value) if value is not None else 0
+            if code is None:
+                code = table[value] = len(table) + 1
+            columns[field].append(code)
+
+        ip = alert.get("ip")
+        packed = pack_ipv4(ip)
+        ips.append(packed or 0)
+        text_code = 0
+        if packed is None and ip is not None:
+            if type(ip) is not str:
+                extra["ip"] = ip
+            else:
+                table = codes["ip_text"]
+                text_code = table.get(ip)
+                if text_code is None:
+                    text_code = table[ip] = len(table) + 1
+        columns["ip_text"].append(text_code)
+
+        logs.append(json.dumps(alert.get("log"), ensure_ascii=False))
+        extras.append(json.dumps(extra, ensure_ascii=False) if extra else "")
+
+    # Bloom filter over every distinct source IP in the file
+    distinct = {ip for ip in (alert.get("ip") for alert in alerts) if type(ip) is str}
+    bits = max(64, math.ceil(len(distinct) * BLOOM_BITS_PER_IP / 8) * 8)
+    bloom = bytearray(bits // 8)
+    for ip in distinct:
+        for bit in _bloom_positions(ip, bits):
+            bloom[bit >> 3] |= 1 << (bit & 7)
+
+    data = [("bloom", "B", bytes(bloom)), ("time", "q", times.tobytes()), ("ip", "I", ips.tobytes())]
+    for field, values in columns.items():
+        typecode = _code_type(len(codes[field]))
+        data.append((field, typecode, array(typecode, values).tobytes()))
+    for field, values in (("log", logs), ("extra", extras)):
+        offsets, blob = _text_blocks(values)
+        data.append((field + ".blocks", "Q", offsets.tobytes()))
+        data.append((field, "B", blob))
+
+    header = {
+        "byteorder": sys.byteorder, "rows": rows, "first_seq": first_seq, "last_seq": last_seq,
+        "min_time": times[0] if rows else 0, "max_time": times[-1] if rows else 0,
+        "block_rows": BLOCK_ROWS, "bloom": [bits, BLOOM_HASHES], "written": time.time(),
+        "dicts": {field: list(table) for field, table in codes.items()},
+        "columns": [[name, typecode, len(raw)] for name, typecode, raw in data],
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for _, _, raw in data:
+            _pad(f)
+            f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return header
+
+# =====================================================
+# Reading one archive file
+# =====================================================
+
+class ArchiveFile:
+    """One mapped archive file. Columns are read in place; log blocks are decompressed on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not an alert archive")
+        offset = _HEADER.size
+        header = json.loads(self._map[offset:offset + length])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path}: written on a {header['byteorder']}-endian machine")
+        offset += length
+        self.header = header
+        self.rows = header["rows"]
+        self.first_seq, self.last_seq = header["first_seq"], header["last_seq"]
+        self.min_time, self.max_time = header["min_time"], header["max_time"]
+        self.bloom_bits = header["bloom"][0]
+        self.dicts = header["dicts"]
+        self._codes = {}   # field -> {value: code}, built on first use
+
+        view = memoryview(self._map)
+        self.columns = {}  # name -> (offset in the file, typecode, view cast to that type)
+        for name, typecode, size in header["columns"]:
+            offset += -offset % _ALIGN
+            self.columns[name] = (offset, typecode, view[offset:offset + size].cast(typecode))
+            offset += size
+        self.times = self.columns["time"][2]
+
+    def may_contain_ip(self, ip):
+        """False when the bloom filter proves `ip` is not in this file."""
+        bloom = self.columns["bloom"][2]
+        return all(bloom[bit >> 3] >> (bit & 7) & 1 for bit in _bloom_positions(ip, self.bloom_bits))
+
+    def code(self, field, value):
+        """Dictionary code of `value` in `field`, or None if no row has it."""
+        codes = self._codes.get(field)
+        if codes is None:
+            codes = self._codes[field] = {v: i + 1 for i, v in enumerate(self.dicts[field])}
+        return codes.get(value)
+
+    def row_range(self, start=None, end=None):
+        """Rows [lo, hi) whose time is within [start, end] (epochs, inclusive)."""
+        lo = bisect_left(self.times, start) if start is not None else 0
+        hi = bisect_right(self.times, end) if end is not None else self.rows
+        return lo, hi
+
+    def find_rows(self, column, value, lo, hi):
+        """
+        Rows in [lo, hi) where `column` == `value`, newest first. Searches the
+        raw column bytes with mmap.rfind, so rows that differ cost no Python work.
+        """
+        offset, typecode, values = self.columns[column]
+        width = values.itemsize
+        pattern = array(typecode, [value]).tobytes()
+        start, stop = offset + lo * width, offset + hi * width
+        while stop > start:
+            position = self._map.rfind(pattern, start, stop)
+            if position < 0:
+                return
+            if (position - offset) % width:
+                stop = position + width - 1   # Straddles two values; look further back
+                continue
+            yield (position - offset) // width
+            stop = position
+
+    def _text(self, field, i, blocks):
+        """JSON-decoded value of text column `field` in row `i`; `blocks` caches decompressed blocks."""
+        block = i // self.header["block_rows"]
+        lines = blocks.get((field, block))
+        if lines is None:
+            offset, _, _ = self.columns[field]
+            ends = self.columns[field + ".blocks"][2]
+            raw = self._map[offset + ends[block]:offset + ends[block + 1]]
+            lines = blocks[field, block] = zlib.decompress(raw).decode("utf-8").split("\n")
+        line = lines[i % self.header["block_rows"]]
+        return json.loads(line) if line else None
+
+    def alerts(self, rows):
+        """Rebuild the alert dicts stored in `rows`."""
+        blocks = {}
+        result = []
+        for i in rows:
+            alert = {"time": format_time(self.times[i])}
+            for field in ("severity", "type"):
+                code = self.columns[field][2][i]
+                if code:
+                    alert[field] = self.dicts[field][code - 1]
+            packed = self.columns["ip"][2][i]
+            if packed:
+                alert["ip"] = socket.inet_ntoa(packed.to_bytes(4, "big"))
+            else:
+                code = self.columns["ip_text"][2][i]
+                if code:
+                    alert["ip"] = self.dicts["ip_text"][code - 1]
+            log = self._text("log", i, blocks)
+            if log is not None:
+                alert["log"] = log
+            extra = self._text("extra", i, blocks)
+            if extra:
+                alert.update(extra)
+                if alert.get("time", "") is None:
+                    del alert["time"]   # The original alert had no time
+            result.append(alert)
+        return result
+
+    def close(self):
+        self._map.close()
+
+# =====================================================
+# The archive directory: search and stats
+# =====================================================
+
+def parse_bound(text, end=False):
+    """Search bound -> epoch. A date alone means the start (or with end=True, the end) of that day."""
+    if text and len(text) == 10:
+        text += " 23:59:59" if end else " 00:00:00"
+    return parse_time(text)
+
+
+def parse_cursor(cursor):
+    """'<first_seq>:<row>' -> (first_seq, row)."""
+    try:
+        seq, row = cursor.split(":")
+        return int(seq), int(row)
+    except (AttributeError, ValueError):
+        raise ValueError(f"invalid cursor: {cursor!r}") from None
+
+
+class Archive:
+    """
+    All archive files in one directory. refresh() picks up files written by
+    the compactor (in this or another process) since the last call.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self.files = []           # ArchiveFile, oldest first
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Map new archive files. Returns how many were added."""
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if _NAME_RE.match(name))
+        except (FileNotFoundError, TypeError):
+            return 0
+        with self._lock:
+            known = {os.path.basename(f.path): f for f in self.files}
+            if list(known) == names:
+                return 0
+            files = []
+            for name in names:
+                archive_file = known.get(name)
+                if archive_file is None:
+                    try:
+                        archive_file = ArchiveFile(os.path.join(self.directory, name))
+                    except (OSError, ValueError):
+                        continue
+                files.append(archive_file)
+            added = len(files) - len(set(known) & set(names))
+            self.files = files
+            return added
+
+    def search(self, ip=None, start=None, end=None, severity=None, type=None, host=None, cursor=None,
+               limit=50):
+        """
+        Archived alerts matching every given filter, newest first.
+        start/end: "YYYY-MM-DD[ HH:MM:SS]", inclusive. Paging: pass the returned
+        cursor back to continue. Returns (alerts, next_cursor, stats), where
+        stats counts the files scanned and skipped by time, bloom filter or dictionary.
+        Raises ValueError on a malformed bound or cursor.
+        """
+        lo_time = parse_bound(start) if start else None
+        hi_time = parse_bound(end, end=True) if end else None
+        after = parse_cursor(cursor) if cursor else None
+        # Most selective first: the first filter picks the candidate rows
+        filters = {field: value for field, value in (("host", host), ("type", type), ("severity", severity))
+                   if value}
+        stats = {"files": len(self.files), "scanned": 0, "skipped_time": 0, "skipped_bloom": 0,
+                 "skipped_dict": 0}
+        found = []   # (file, row), newest first
+        for archive_file in reversed(self.files):
+            if after and archive_file.first_seq > after[0]:
+                continue
+            if (lo_time is not None and archive_file.max_time < lo_time
+                    or hi_time is not None and archive_file.min_time > hi_time):
+                stats["skipped_time"] += 1
+                continue
+            if ip and not archive_file.may_contain_ip(ip):
+                stats["skipped_bloom"] += 1
+                continue
+            tests = [(field, archive_file.code(field, value)) for field, value in filters.items()]
+            if ip:
+                packed = pack_ipv4(ip)
+                tests.insert(0, ("ip", packed) if packed else ("ip_text", archive_file.code("ip_text", ip)))
+            if any(code is None for _, code in tests):
+                stats["skipped_dict"] += 1
+                continue
+
+            stats["scanned"] += 1
+            lo, hi = archive_file.row_range(lo_time, hi_time)
+            if after and archive_file.first_seq == after[0]:
+                hi = min(hi, after[1])
+            if tests:
+                # Candidates from the first (most selective) filter, then check the rest in place
+                (column, code), rest = tests[0], [(archive_file.columns[f][2], c) for f, c in tests[1:]]
+                rows = archive_file.find_rows(column, code, lo, hi)
+                rows = (i for i in rows if all(values[i] == c for values, c in rest))
+            else:
+                rows = range(hi - 1, lo - 1, -1)
+            for i in rows:
+                found.append((archive_file, i))
+                if len(found) > limit:
+                    break
+            if len(found) > limit:
+                break
+
+        next_cursor = None
+        if len(found) > limit:
+            found.pop()
+            last_file, last_row = found[-1]
+            next_cursor = f"{last_file.first_seq}:{last_row}"
+        alerts = []
+        i = 0
+        while i < len(found):   # Decode runs of rows from the same file together
+            archive_file = found[i][0]
+            j = i
+            while j < len(found) and found[j][0] is archive_file:
+                j += 1
+            alerts.extend(archive_file.alerts([row for _, row in found[i:j]]))
+            i = j
+        return alerts, next_cursor, stats
+
+    def stats(self):
+        """Size and time span of the archive."""
+        rows = sum(f.rows for f in self.files)
+        size = sum(f.size for f in self.files)
+        return {
+            "files": len(self.files), "rows": rows, "bytes": size,
+            "bytes_per_alert": round(size / rows, 1) if rows else None,
+            "first": format_time(self.files[0].min_time) if self.files else None,
+            "last": format_time(self.files[-1].max_time) if self.files else None,
+            "archived_through": self.files[-1].last_seq if self.files else 0,
+        }
+
+# =====================================================
+# Compaction (journal segments -> archive files)
+# =====================================================
+
+def archived_through(archive_dir=ARCHIVE_DIR):
+    """Sequence number of the newest journal segment already archived (0 if none)."""
+    try:
+        names = os.listdir(archive_dir)
+    except FileNotFoundError:
+        return 0
+    return max((int(match.group(2)) for match in map(_NAME_RE.match, names) if match), default=0)
+
+
+def compact(journal_dir=JOURNAL_DIR, archive_dir=ARCHIVE_DIR, force=False):
+    """
+    Archive the sealed journal segments newer than the archive, SEGMENTS_PER_FILE
+    per file. A smaller last group is only written with force=True.
+    Restart-safe: progress is the newest segment number in the archive file names.
+    Returns the paths written.
+    """
+    through = archived_through(archive_dir)
+    pending = [(seq, path) for seq, path, sealed in list_segments(journal_dir) if sealed and seq > through]
+    written = []
+    for start in range(0, len(pending), SEGMENTS_PER_FILE):
+        group = pending[start:start + SEGMENTS_PER_FILE]
+        if len(group) < SEGMENTS_PER_FILE and not force:
+            break
+        alerts = []
+        for _, path in group:
+            try:
+                records, _ = read_records(path)
+            except FileNotFoundError:
+                continue   # Removed by journal retention in the meantime
+            alerts.extend(records)
+        if not alerts:
+            continue
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(archive_dir, archive_name(group[0][0], group[-1][0]))
+        write_archive(path, alerts, group[0][0], group[-1][0])
+        written.append(path)
+    return written
+
+
+class ArchiveCompactor:
+    """
+    Runs compact() on a background thread whenever notify() is called, so the
+    writer that seals a segment never waits for compression. Set
+    AlertJournal.on_seal to notify().
+    """
+
+    def __init__(self, journal_dir=JOURNAL_DIR, archive_dir=ARCHIVE_DIR):
+        self.journal_dir = journal_dir
+        self.archive_dir = archive_dir
+        self.written = 0
+        self._wake = threading.Event()
+        self._thread = None
+
+    def notify(self, *args):
+        self._wake.set()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="archive-compactor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.written += len(compact(self.journal_dir, self.archive_dir))
+            except (OSError, ValueError) as e:
+                print(f"[Mini-SIEM] Archive compaction failed: {e}", file=sys.stderr)
+
+# =====================================================
+# Command line
+# =====================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mini-SIEM columnar alert archive")
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="archive directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("compact", help="archive sealed journal segments")
+    p.add_argument("--journal", default=JOURNAL_DIR)
+    p.add_argument("--force", action="store_true", help="also archive a last, partial group")
+
+    p = sub.add_parser("search", help="search archived alerts, newest first")
+    for name in ("ip", "start", "end", "severity", "type", "host", "cursor"):
+        p.add_argument(f"--{name}")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--json", action="store_true", help="print NDJSON instead of a table")
+
+    sub.add_parser("stats", help="size and time span of the archive")
+
+    args = parser.parse_args(argv)
+    if args.command == "compact":
+        written = compact(args.journal, args.archive, args.force)
+        print(f"[Mini-SIEM] wrote {len(written)} archive file(s) to {args.archive}")
+    elif args.command == "search":
+        began = time.perf_counter()
+        alerts, next_cursor, stats = Archive(args.archive).search(
+            args.ip, args.start, args.end, args.severity, args.type, args.host, args.cursor, args.limit)
+        elapsed = time.perf_counter() - began
+        for alert in alerts:
+            if args.json:
+                print(json.dumps(alert, ensure_ascii=False))
+            else:
+                print(f"{alert.get('time')}  [{alert.get('severity')}] {alert.get('type')} - {alert.get('ip')}")
+        print(f"[Mini-SIEM] {len(alerts)} alerts in {elapsed * 1e3:.1f} ms; {stats['scanned']} of "
+              f"{stats['files']} files scanned" + (f"; next page: --cursor {next_cursor}" if next_cursor else ""),
+              file=sys.stderr)
+    else:
+        for key, value in Archive(args.archive).stats().items():
+            print(f"  {key:<18} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+# =====================================================
+# benchmark.py
+# Micro-benchmarks for Mini-SIEM internals.
+# Run e.g.:  python benchmark.py store --alerts 1000000
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from log_generator import EVENTS
+
+# =====================================================
+# Synthetic data
+# =====================================================
+
+def synthetic_alerts(n, seed=42, start="2025-11-01 00:00:00", per_second=10, ip_pool=20_000):
+    """
+    Quickly build `n` alert dicts with increasing timestamps.
+    Lighter than make_alert() so that millions can be created in seconds.
+    """
+    rng = random.Random(seed)
+    types = list(EVENTS)
+    ips = [f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(ip_pool)]
+    t0 = time.mktime(time.strptime(start, "%Y-%m-%d %H:%M:%S"))
+    stamp, stamp_second = None, None
+    for i in range(n):
+        second = int(t0 + i // per_second)
+        if second != stamp_second:
+            stamp, stamp_second = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second)), second
+        event_type = types[rng.randrange(len(types))]
+        # A few IPs are much noisier than the rest, as in real traffic
+        ip = ips[int(rng.paretovariate(1.2)) % ip_pool]
+        yield {
+            "time": stamp,
+            "severity": EVENTS[event_type],
+            "type": event_type,
+            "ip": ip,
+            "log": f"{stamp} HOST=web01 EVENT={event_type.replace(' ', '_').upper()} ip={ip}",
+        }
+
+
+def timed(label, fn, repeat=1):
+    """Run `fn` `repeat` times and print the average duration."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<45} {elapsed * 1e6:>12.1f} µs")
+    return result
+
+# =====================================================
+# Alert store (indexes, time range, top-k)
+# =====================================================
+
+def bench_store(args):
+    from alert_store import AlertStore
+
+    print(f"[store] building {args.alerts:,} synthetic alerts")
+    alerts = list(synthetic_alerts(args.alerts))
+
+    if args.memory:
+        tracemalloc.start()
+    store = AlertStore(directory=None, max_alerts=args.alerts)
+    start = time.perf_counter()
+    store.ingest(alerts)
+    elapsed = time.perf_counter() - start
+    print(f"  ingest: {args.alerts / elapsed:,.0f} alerts/s ({elapsed:.2f} s)")
+    if args.memory:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  store memory (indexes + interning): {current / args.alerts:,.0f} bytes/alert")
+    del alerts
+
+    newest = store.newest(1)[0]
+    busy_ip = store.top_ips(1)[0][0]
+    last_hour = time.strftime("%Y-%m-%d %H:%M:%S",
+                              time.localtime(time.mktime(time.strptime(newest["time"], "%Y-%m-%d %H:%M:%S")) - 3600))
+
+    print("[store] queries (average of 100 runs)")
+    timed("top_ips(5)", lambda: store.top_ips(5), 100)
+    timed("count(ip=busiest, last hour)", lambda: store.count(ip=busy_ip, start=last_hour), 100)
+    timed("query(ip=busiest, last hour, limit=50)", lambda: store.query(ip=busy_ip, start=last_hour), 100)
+    timed("query(severity=Critical, limit=50)", lambda: store.query(severity="Critical"), 100)
+    timed("query(type+ip, limit=50)", lambda: store.query(type="Failed login", ip=busy_ip), 100)
+    timed("count(last hour)", lambda: store.count(start=last_hour), 100)
+
+    # The pre-index dashboard approach, for comparison
+    from collections import Counter
+    timed("baseline: Counter over all IPs", lambda: Counter(a["ip"] for a in store.newest()).most_common(5))
+
+# =====================================================
+# Correlation engine
+# =====================================================
+
+def bench_correlation(args):
+    from correlation import CorrelationEngine
+
+    # A small IP pool makes bursts and sequences common, so the rules do real work
+    alerts = list(synthetic_alerts(args.events, ip_pool=args.ips, per_second=args.rate))
+    engine = CorrelationEngine()
+    start = time.perf_counter()
+    derived = sum(1 for _ in engine.process_many(alerts))
+    elapsed = time.perf_counter() - start
+    tracked = sum(len(rule.state) for rule in engine.rules)
+    print(f"[correlation] {args.events:,} events in {elapsed:.2f} s "
+          f"-> {args.events / elapsed:,.0f} events/s, {derived:,} derived alerts, {tracked:,} tracked keys")
+
+# =====================================================
+# Rate anomaly detector
+# =====================================================
+
+def bench_anomaly(args):
+    from anomaly import RateAnomalyDetector
+
+    # Keys and timestamps only, so the detector itself is what gets measured
+    rng = random.Random(11)
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(args.keys)]
+    events = [(keys[int(rng.paretovariate(1.1)) % args.keys], i / args.rate) for i in range(args.events)]
+
+    tracemalloc.start()
+    detector = RateAnomalyDetector(max_keys=args.max_keys)
+    sketch_bytes = detector.sketch.nbytes
+    baseline, _ = tracemalloc.get_traced_memory()
+    observe = detector.observe
+    start = time.perf_counter()
+    flagged = sum(1 for key, ts in events if observe(key, ts))
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracked = len(detector)
+    print(f"[anomaly] {args.events:,} events over {args.keys:,} keys in {elapsed:.2f} s "
+          f"-> {args.events / elapsed:,.0f} events/s (with tracemalloc on), {flagged:,} flagged")
+    print(f"  tracked keys: {tracked:,} (max {args.max_keys:,}); sketch: {sketch_bytes / 1024:,.0f} KiB")
+    if tracked:
+        print(f"  memory per tracked key: {(current - baseline) / tracked:,.0f} bytes")
+
+    detector = RateAnomalyDetector(max_keys=args.max_keys)
+    observe = detector.observe
+    start = time.perf_counter()
+    for key, ts in events:
+        observe(key, ts)
+    elapsed = time.perf_counter() - start
+    print(f"  without tracemalloc: {args.events / elapsed:,.0f} events/s")
+
+# =====================================================
+# Top-k / distinct-count sketches vs exact counting
+# =====================================================
+
+def bench_sketches(args):
+    from collections import Counter
+
+    from sketches import SourceSketches
+
+    # Half the events from a few noisy IPs, half spread over a large population (a scan)
+    rng = random.Random(5)
+    t0 = 1_700_000_000
+    picks = (int(rng.paretovariate(1.0)) if rng.random() < 0.5 else rng.randrange(args.ips)
+             for _ in range(args.events))
+    events = [(t0 + i * 86400 * args.days // args.events, f"10.{k >> 16 & 255}.{k >> 8 & 255}.{k & 255}")
+              for i, k in enumerate(picks)]
+
+    for label, make, add in (
+        ("exact Counter", Counter, lambda counter, epoch, ip: counter.update((ip,))),
+        ("sketches", SourceSketches, lambda sketches, epoch, ip: sketches.add(epoch, ip)),
+    ):
+        state = make()
+        start = time.perf_counter()
+        for epoch, ip in events:
+            add(state, epoch, ip)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()  # Second pass for memory; tracing slows the loop down
+        state = make()
+        for epoch, ip in events:
+            add(state, epoch, ip)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"[sketches] {label:<14} {args.events / elapsed:>10,.0f} events/s, {current / 1e6:,.1f} MB")
+
+    exact = Counter(ip for _, ip in events)
+    print(f"  exact: {len(exact):,} unique, top {exact.most_common(1)[0]}")
+    sketches = state
+    for window in ("1h", "24h", "7d", None):
+        seconds = window and {"1h": 3600, "24h": 86400, "7d": 7 * 86400}[window]
+        sketches.summary(seconds, 10)  # First query merges the finished buckets
+        summary = timed(f"summary({window or 'all'}) cached", lambda: sketches.summary(seconds, 10), 20)
+        print(f"    ~{summary['unique']:,} unique of {summary['events']:,} events, top {summary['top'][0]}")
+
+# =====================================================
+# Event generation (scalar vs NumPy)
+# =====================================================
+
+def bench_generator(args):
+    import log_generator
+
+    random.seed(1)
+    log_generator.reset_active_hosts()
+    n_scalar = min(args.events, 200_000)  # The scalar path is sampled and extrapolated
+    start = time.perf_counter()
+    for _ in range(n_scalar):
+        log_generator.make_alert("2025-11-01 00:00:00")
+    scalar_rate = n_scalar / (time.perf_counter() - start)
+    print(f"[generator] make_alert():        {scalar_rate:>12,.0f} events/s")
+
+    start = time.perf_counter()
+    log_generator.make_alerts_bulk(args.events, seed=1)
+    elapsed = time.perf_counter() - start
+    print(f"[generator] make_alerts_bulk():  {args.events / elapsed:>12,.0f} events/s "
+          f"({args.events:,} in {elapsed:.2f} s, {args.events / elapsed / scalar_rate:.1f}x faster)")
+
+# =====================================================
+# Log parser
+# =====================================================
+
+def bench_parser(args):
+    import log_generator
+    from log_parser import _TOKEN_RE, parse_log
+
+    random.seed(1)
+    lines = [log_generator.make_alert("2025-11-01 00:00:00")["log"] for _ in range(args.lines)]
+
+    def regex_only(line):
+        return {m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3)
+                for m in _TOKEN_RE.finditer(line)}
+
+    for label, fn in (("regex tokenizer only", regex_only), ("parse_log (split fast path)", parse_log)):
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        elapsed = time.perf_counter() - start
+        print(f"[parser] {label:<30} {args.lines / elapsed:>12,.0f} lines/s")
+
+# =====================================================
+# Storage backends (legacy JSON file vs journal vs SQLite)
+# =====================================================
+
+def bench_storage(args):
+    from alert_journal import AlertJournal, iter_alerts
+    from storage import SqliteAlertDB
+
+    alerts = list(synthetic_alerts(args.alerts))
+    busy_ip = alerts[0]["ip"]
+    batches = [alerts[i:i + args.batch] for i in range(0, len(alerts), args.batch)]
+    tmp = tempfile.mkdtemp(prefix="siem-bench-")
+
+    # The original design: load the whole alerts.json, append, rewrite it
+    json_path = os.path.join(tmp, "alerts.json")
+
+    def json_insert():
+        for batch in batches:
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+            except FileNotFoundError:
+                stored = []
+            stored.extend(batch)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f, ensure_ascii=False)
+
+    def json_query():
+        with open(json_path, "r", encoding="utf-8") as f:
+            return [a for a in json.load(f) if a["ip"] == busy_ip][-50:]
+
+    journal_dir = os.path.join(tmp, "journal")
+
+    def journal_insert():
+        with AlertJournal(journal_dir, fsync=args.fsync) as journal:
+            for batch in batches:
+                journal.append_many(batch)
+
+    def journal_query():
+        return [a for a in iter_alerts(journal_dir) if a["ip"] == busy_ip][-50:]
+
+    db = SqliteAlertDB(os.path.join(tmp, "alerts.sqlite3"), max_rows=None,
+                       synchronous="NORMAL" if args.fsync else "OFF")
+
+    def sqlite_insert():
+        for batch in batches:
+            db.append_many(batch)
+
+    print(f"[storage] {args.alerts:,} alerts in batches of {args.batch:,}")
+    for label, insert, query in (("JSON file (load + rewrite)", json_insert, json_query),
+                                 ("NDJSON journal", journal_insert, journal_query),
+                                 ("SQLite (WAL)", sqlite_insert, lambda: db.query(ip=busy_ip))):
+        start = time.perf_counter()
+        insert()
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<28} insert {args.alerts / elapsed:>12,.0f} alerts/s")
+        timed(f"{label}: newest 50 for one IP", query, 5)
+    db.close()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+# =====================================================
+# Columnar archive: compaction, size and historical search
+# =====================================================
+
+def bench_archive(args):
+    from itertools import islice
+
+    from alert_journal import SEGMENT_MAX_ALERTS
+    from archive import SEGMENTS_PER_FILE, Archive, archive_name, pack_ipv4, parse_bound, write_archive
+
+    per_file = SEGMENTS_PER_FILE * SEGMENT_MAX_ALERTS
+    needle = "192.0.2.77"                  # A rare IP: a burst of 20 events three quarters into the span
+    burst = range(args.events * 3 // 4, args.events * 3 // 4 + 20 * 50, 50)
+    tmp = tempfile.mkdtemp(prefix="siem-archive-")
+    stream = synthetic_alerts(args.events, per_second=args.per_second, ip_pool=args.ips)
+    written = compaction = ndjson_bytes = 0
+    ndjson_scan = None
+    print(f"[archive] {args.events:,} events, {per_file:,} per file, {args.per_second}/s of log time")
+    while written < args.events:
+        chunk = list(islice(stream, per_file))
+        for i in (i - written for i in burst if written <= i < written + len(chunk)):
+            chunk[i]["ip"] = needle
+            chunk[i]["log"] = chunk[i]["log"].rsplit("ip=", 1)[0] + "ip=" + needle
+        if ndjson_scan is None:
+            # The same events as NDJSON, and what finding one IP's rows in them costs:
+            # grep every line, parse the candidates to check the field
+            text = "".join(json.dumps(a, ensure_ascii=False) + "\n" for a in chunk)
+            ndjson_bytes = len(text.encode("utf-8")) / len(chunk)
+            start = time.perf_counter()
+            [i for i, line in enumerate(text.splitlines()) if needle in line and json.loads(line)["ip"] == needle]
+            ndjson_scan = (time.perf_counter() - start) / len(chunk)
+        seq = written // SEGMENT_MAX_ALERTS + 1
+        start = time.perf_counter()
+        write_archive(os.path.join(tmp, archive_name(seq, seq + SEGMENTS_PER_FILE - 1)), chunk, seq,
+                      seq + SEGMENTS_PER_FILE - 1)
+        compaction += time.perf_counter() - start
+        written += len(chunk)
+
+    archive = Archive(tmp)
+    stats = archive.stats()
+    print(f"  compaction: {written / compaction:,.0f} events/s; {stats['files']:,} files, "
+          f"{stats['bytes'] / 1e6:,.0f} MB")
+    print(f"  size: {stats['bytes_per_alert']:.1f} bytes/event vs {ndjson_bytes:.1f} as NDJSON "
+          f"({ndjson_bytes / stats['bytes_per_alert']:.1f}x smaller)")
+
+    # One month in the middle of the span (or all of it, if shorter)
+    first, last = parse_bound(stats["first"]), parse_bound(stats["last"])
+    middle, half = (first + last) // 2, min(15 * 86400, (last - first) // 2 + 1)
+    start, end = (time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(t)) for t in (middle - half, middle + half))
+    print(f"[archive] one IP from {start} to {end}")
+    lo_time, hi_time = parse_bound(start), parse_bound(end, end=True)
+    packed = pack_ipv4(needle)
+
+    # The same question three ways: which rows hold this IP in the window (row numbers only)
+    def pruned():
+        rows = []
+        for f in archive.files:
+            if f.max_time < lo_time or f.min_time > hi_time or not f.may_contain_ip(needle):
+                continue
+            lo, hi = f.row_range(lo_time, hi_time)
+            rows.extend((f.first_seq, i) for i in f.find_rows("ip", packed, lo, hi))
+        return rows
+
+    def unpruned():
+        return [(f.first_seq, i) for f in archive.files for i in f.find_rows("ip", packed, 0, f.rows)
+                if lo_time <= f.times[i] <= hi_time]
+
+    hits = timed("IP column, files pruned by time + bloom", pruned, 5)
+    full = timed("IP column of every file, then time check", unpruned, 3)
+    assert full == hits
+    print(f"  {'NDJSON grep + parse (extrapolated)':<45} {ndjson_scan * written * 1e6:>12.1f} µs")
+    print(f"    {len(hits)} rows")
+    # End to end, including decompressing and decoding the alerts it returns
+    alerts, _, found = timed("archive.search() with decoding",
+                             lambda: archive.search(ip=needle, start=start, end=end, limit=1000), 5)
+    print(f"    {len(alerts)} alerts; files scanned {found['scanned']}, skipped by time "
+          f"{found['skipped_time']}, by bloom {found['skipped_bloom']} (of {found['files']})")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+# =====================================================
+# Threat intel prefix index
+# =====================================================
+
+def bench_intel(args):
+    from threat_intel import ThreatIntel, build_index
+
+    rng = random.Random(7)
+    entries = [(f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}"
+                f"/{rng.choice((16, 20, 24, 28, 32, 32, 32))}", f"list{i % 8}") for i in range(args.ranges)]
+    entries += [(f"2001:db8:{rng.randint(0, 0xffff):x}::/48", "v6") for _ in range(args.ranges // 10)]
+    tmp = tempfile.mkdtemp(prefix="siem-bench-")
+    path = os.path.join(tmp, "intel.bin")
+
+    start = time.perf_counter()
+    n4, n6, _ = build_index(entries, path)
+    print(f"[intel] built {len(entries):,} ranges -> {n4:,} IPv4 + {n6:,} IPv6 intervals "
+          f"in {time.perf_counter() - start:.2f} s ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    start = time.perf_counter()
+    intel = ThreatIntel(path)
+    print(f"[intel] open (mmap): {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+    ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}"
+           for _ in range(args.lookups)]
+    for label, sample in (("IPv4", ips), ("IPv6", [f"2001:db8:{rng.randint(0, 0xffff):x}::1"
+                                                   for _ in range(args.lookups // 10)])):
+        start = time.perf_counter()
+        hits = sum(1 for ip in sample if intel.lookup(ip))
+        elapsed = time.perf_counter() - start
+        print(f"[intel] {label} lookup: {elapsed / len(sample) * 1e6:.2f} µs ({hits:,}/{len(sample):,} listed)")
+    intel.close()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+# =====================================================
+# Dashboard page rendering (uncached vs cached vs 304)
+# =====================================================
+
+def bench_dashboard(args):
+    from flask import render_template_string
+
+    import web_dashboard
+    from alert_store import AlertStore
+
+    web_dashboard.store = AlertStore(directory=None, enrich=web_dashboard.describe)
+    web_dashboard.store.ingest(list(synthetic_alerts(args.alerts)))
+    web_dashboard.store.refresh = lambda: 0  # Keep the data fixed while measuring
+    app = web_dashboard.app
+
+    def uncached():
+        # The previous route: recompile the template and render every request
+        alerts, version = web_dashboard.store.since(0, web_dashboard.DISPLAY_LIMIT)
+        alerts.reverse()
+        return render_template_string(web_dashboard.TEMPLATE, alerts=alerts, stats=web_dashboard.build_stats(),
+                                      version=version, display_limit=web_dashboard.DISPLAY_LIMIT,
+                                      chart_window=web_dashboard.CHART_WINDOW)
+    app.add_url_rule("/uncached", "uncached", uncached)
+
+    client = app.test_client()
+    etag = client.get("/").headers["ETag"]
+    print(f"[dashboard] {args.alerts:,} alerts in the store, {args.requests:,} requests each")
+    for label, path, headers in (("uncached render", "/uncached", {}),
+                                 ("cached page (200)", "/", {}),
+                                 ("conditional GET (304)", "/", {"If-None-Match": etag})):
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            client.get(path, headers=headers)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<25} {args.requests / elapsed:>10,.0f} requests/s")
+
+# =====================================================
+# Command line
+# =====================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Mini-SIEM benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("store", help="alert store ingest and indexed queries")
+    p.add_argument("--alerts", type=int, default=1_000_000)
+    p.add_argument("--memory", action="store_true", help="measure memory per alert (slower)")
+    p.set_defaults(func=bench_store)
+
+    p = sub.add_parser("correlation", help="streaming correlation engine throughput")
+    p.add_argument("--events", type=int, default=1_000_000)
+    p.add_argument("--ips", type=int, default=500, help="distinct source IPs")
+    p.add_argument("--rate", type=int, default=1000, help="synthetic events per second of log time")
+    p.set_defaults(func=bench_correlation)
+
+    p = sub.add_parser("anomaly", help="rate anomaly detector: events/s and memory per tracked key")
+    p.add_argument("--events", type=int, default=1_000_000)
+    p.add_argument("--keys", type=int, default=200_000, help="distinct keys (IPs)")
+    p.add_argument("--rate", type=int, default=1000, help="events per second of log time")
+    p.add_argument("--max-keys", type=int, default=100_000, help="tracked key limit")
+    p.set_defaults(func=bench_anomaly)
+
+    p = sub.add_parser("sketches", help="top-k / unique IP sketches vs an exact Counter")
+    p.add_argument("--events", type=int, default=1_000_000)
+    p.add_argument("--ips", type=int, default=1_000_000, help="size of the IP population")
+    p.add_argument("--days", type=int, default=30, help="days of log time the events span")
+    p.set_defaults(func=bench_sketches)
+
+    p = sub.add_parser("generator", help="scalar vs vectorized event synthesis")
+    p.add_argument("--events", type=int, default=1_000_000)
+    p.set_defaults(func=bench_generator)
+
+    p = sub.add_parser("parser", help="log line parsing throughput")
+    p.add_argument("--lines", type=int, default=200_000)
+    p.set_defaults(func=bench_parser)
+
+    p = sub.add_parser("storage", help="insert and query rates: JSON file vs journal vs SQLite")
+    p.add_argument("--alerts", type=int, default=50_000)
+    p.add_argument("--batch", type=int, default=1000, help="alerts per write")
+    p.add_argument("--fsync", action="store_true", help="sync to disk on every write")
+    p.set_defaults(func=bench_storage)
+
+    p = sub.add_parser("archive", help="columnar archive: compaction rate, size and one-IP search")
+    p.add_argument("--events", type=int, default=100_000_000)
+    p.add_argument("--per-second", type=int, default=10, help="events per second of log time")
+    p.add_argument("--ips", type=int, default=200_000, help="distinct source IPs")
+    p.set_defaults(func=bench_archive)
+
+    p = sub.add_parser("intel", help="threat intel index build, open and lookup time")
+    p.add_argument("--ranges", type=int, default=1_000_000)
+    p.add_argument("--lookups", type=int, default=200_000)
+    p.set_defaults(func=bench_intel)
+
+    p = sub.add_parser("dashboard", help="dashboard requests/s: uncached vs cached vs 304")
+    p.add_argument("--alerts", type=int, default=10_000)
+    p.add_argument("--requests", type=int, default=200)
+    p.set_defaults(func=bench_dashboard)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
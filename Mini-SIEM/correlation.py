@@ -0,0 +1,234 @@
+# =====================================================
+# correlation.py
+# Streaming correlation engine for Mini-SIEM.
+# Consumes the alert feed one event at a time and keeps small sliding-window
+# state per IP / per user to detect patterns that single events cannot show:
+# brute-force logins, scan followed by exploit, lateral movement followed
+# by exfiltration, and event rates far above an IP's or host's usual level
+# (anomaly.py). Matches are emitted as new (derived) alerts.
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import re
+from collections import OrderedDict, deque
+
+from alert_store import parse_time
+from anomaly import RateAnomalyDetector
+
+MAX_KEYS = 100_000  # Tracked IPs/users per rule; least recently seen are dropped first
+
+_USER_RE = re.compile(r"\buser=(\S+)")
+
+# =====================================================
+# Helpers
+# =====================================================
+
+def key_value(alert, key):
+    """Return the value used to group events: an alert field, or the user/host in its log line."""
+    if key == "user":
+        match = _USER_RE.search(alert.get("log", ""))
+        return match.group(1) if match else None
+    if key == "host" and "host" not in alert:
+        log = alert.get("log", "")
+        start = log.find("HOST=")  # Faster than a regex; HOST= is near the start of the line
+        if start < 0:
+            return None
+        end = log.find(" ", start)
+        return log[start + 5:end if end >= 0 else None] or None
+    return alert.get(key)
+
+
+def derived_alert(rule, alert, detail):
+    """Build a correlation alert in the same shape as make_alert()."""
+    return {
+        "time": alert.get("time"),
+        "severity": rule.severity,
+        "type": rule.output_type,
+        "ip": alert.get("ip"),
+        "log": f"{alert.get('time')} HOST=siem EVENT=CORRELATION rule={rule.name} {rule.key}={detail}",
+        "rule": rule.name,
+    }
+
+
+class _BoundedState(OrderedDict):
+    """Per-key state with LRU eviction once `max_keys` entries exist."""
+
+    def __init__(self, max_keys):
+        super().__init__()
+        self.max_keys = max_keys
+
+    def put(self, key, value):
+        """Store `value` for `key` as the most recently used entry."""
+        if key in self:
+            self.move_to_end(key)
+        self[key] = value
+        if len(self) > self.max_keys:
+            self.popitem(last=False)
+
+# =====================================================
+# Rules
+# =====================================================
+
+class ThresholdRule:
+    """Fire when `count` events of `event_type` share a key within `window` seconds."""
+
+    def __init__(self, name, event_type, count, window, output_type, severity="High", key="ip",
+                 max_keys=MAX_KEYS):
+        self.name = name
+        self.trigger_types = {event_type}
+        self.count = count
+        self.window = window
+        self.output_type = output_type
+        self.severity = severity
+        self.key = key
+        self.state = _BoundedState(max_keys)
+
+    def feed(self, alert, ts):
+        value = key_value(alert, self.key)
+        if not value:
+            return None
+        # Only the latest `count` timestamps matter, so memory per key is fixed
+        times = self.state.get(value)
+        if times is None:
+            times = deque(maxlen=self.count)
+        self.state.put(value, times)
+        times.append(ts)
+        if len(times) == self.count and ts - times[0] <= self.window:
+            times.clear()  # Start over so one burst is reported once
+            return derived_alert(self, alert, f"{value} count={self.count} window={self.window}s")
+        return None
+
+
+class SequenceRule:
+    """Fire when an event in `then` follows an event in `first` for the same key within `window` seconds."""
+
+    def __init__(self, name, first, then, window, output_type, severity="Critical", key="ip",
+                 max_keys=MAX_KEYS):
+        self.name = name
+        self.first = set(first)
+        self.then = set(then)
+        self.trigger_types = self.first | self.then
+        self.window = window
+        self.output_type = output_type
+        self.severity = severity
+        self.key = key
+        self.state = _BoundedState(max_keys)
+
+    def feed(self, alert, ts):
+        value = key_value(alert, self.key)
+        if not value:
+            return None
+        event_type = alert.get("type")
+        if event_type in self.then:
+            started = self.state.pop(value, None)
+            if started is not None and ts - started <= self.window:
+                return derived_alert(self, alert, f"{value} after={int(ts - started)}s")
+        if event_type in self.first:
+            self.state.put(value, ts)
+        return None
+
+
+class RateRule:
+    """
+    Fire when a key's event rate is anomalous (see anomaly.RateAnomalyDetector).
+    Looks at every event type, so it has no trigger_types.
+    """
+
+    trigger_types = None
+
+    def __init__(self, name, output_type, severity="High", key="ip", **detector_options):
+        self.name = name
+        self.output_type = output_type
+        self.severity = severity
+        self.key = key
+        self.detector = RateAnomalyDetector(**detector_options)
+
+    @property
+    def state(self):
+        return self.detector.state
+
+    def feed(self, alert, ts):
+        value = key_value(alert, self.key)
+        if not value:
+            return None
+        hit = self.detector.observe(value, ts)
+        if hit is None:
+            return None
+        return derived_alert(self, alert, f"{value} count={hit['count']} expected={hit['expected']:.1f} "
+                                          f"window={self.detector.interval}s")
+
+
+EXPLOIT_TYPES = ("SQL Injection attempt", "XSS attempt", "LFI / Path traversal", "Command injection attempt")
+
+
+def default_rules():
+    """The rule set used by the generator and the ingestion server."""
+    return [
+        ThresholdRule("brute-force-ip", "Failed login", count=5, window=60,
+                      output_type="Brute force attempt", severity="High", key="ip"),
+        ThresholdRule("brute-force-user", "Failed login", count=10, window=300,
+                      output_type="Brute force attempt", severity="High", key="user"),
+        SequenceRule("login-after-failures", first=["Failed login"], then=["Successful login"], window=300,
+                     output_type="Successful login after suspicious attempts"),
+        SequenceRule("scan-then-exploit", first=["Port scan detected", "Scanner user-agent detected"],
+                     then=EXPLOIT_TYPES, window=600, output_type="Multi-stage attack"),
+        SequenceRule("lateral-then-exfiltration", first=["Lateral movement"], then=["Exfiltration"],
+                     window=3600, output_type="Lateral movement followed by exfiltration"),
+        RateRule("ip-rate-anomaly", output_type="High request rate", severity="High", key="ip",
+                 interval=60, min_count=30),
+        RateRule("host-rate-anomaly", output_type="Unusual traffic", severity="Medium", key="host",
+                 interval=60, min_count=200),
+    ]
+
+# =====================================================
+# Engine
+# =====================================================
+
+class CorrelationEngine:
+    """
+    Route each alert to the rules that care about its type and collect their output.
+    Events no rule is interested in cost a single dict lookup. Rules without
+    trigger_types (rate anomalies) see every event.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = default_rules() if rules is None else rules
+        self._every = [rule for rule in self.rules if rule.trigger_types is None]
+        self._by_type = {}
+        for rule in self.rules:
+            for event_type in rule.trigger_types or ():
+                self._by_type.setdefault(event_type, []).append(rule)
+        if self._every:
+            for rules in self._by_type.values():
+                rules.extend(self._every)
+        self._last_time = (None, 0)  # Cache: consecutive alerts often share a timestamp
+        self.processed = 0
+        self.emitted = 0
+
+    def process(self, alert):
+        """Feed one alert; returns a (usually empty) list of derived alerts."""
+        self.processed += 1
+        rules = self._by_type.get(alert.get("type"), self._every)
+        if not rules:
+            return []
+
+        text = alert.get("time")
+        if text != self._last_time[0]:
+            try:
+                self._last_time = (text, parse_time(text))
+            except ValueError:
+                return []
+        ts = self._last_time[1]
+
+        derived = []
+        for rule in rules:
+            result = rule.feed(alert, ts)
+            if result:
+                derived.append(result)
+        self.emitted += len(derived)
+        return derived
+
+    def process_many(self, alerts):
+        """Feed several alerts and yield every derived alert."""
+        for alert in alerts:
+            yield from self.process(alert)
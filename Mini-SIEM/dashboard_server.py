@@ -0,0 +1,165 @@
+# =====================================================
+# dashboard_server.py
+# Production serving mode for the Mini-SIEM dashboard (Linux/macOS).
+# One loader (this process) follows the journal with the AlertStore and
+# publishes a memory-mapped snapshot (snapshot.py) whenever new alerts
+# arrive. N pre-forked worker processes share one listening socket and
+# serve every request from that snapshot, so the work scales over CPU
+# cores instead of queueing behind one interpreter lock.
+# Usage:  python dashboard_server.py --workers 4 [--host 0.0.0.0] [--port 5000]
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+import web_dashboard
+from rollups import FIELDS, parse_window
+from snapshot import SNAPSHOT_ALERTS, SNAPSHOT_FILE, SnapshotStore, write_snapshot
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+# Chart / top-IP windows precomputed for the workers (others are counted from the snapshot when it covers them)
+SNAPSHOT_WINDOWS = tuple(os.environ.get("MINI_SIEM_SNAPSHOT_WINDOWS", "1h,24h,7d,30d").split(","))
+MAX_SOURCES = 100                              # Top IPs kept per window (the /api/sources maximum)
+SNAPSHOT_INTERVAL = 1.0                        # Minimum seconds between snapshots
+
+# =====================================================
+# Loader
+# =====================================================
+
+def snapshot_extra(store):
+    """Counters and chart data the workers cannot compute from the snapshot's alerts alone."""
+    windows = sorted({parse_window(w) for w in SNAPSHOT_WINDOWS + (web_dashboard.CHART_WINDOW,)})
+    return {
+        "held": len(store),
+        "severities": {str(k): v for k, v in store.severities.items()},
+        "windows": windows,
+        "series": {f"{w}|{by}": store.series(w, by) for w in windows for by in FIELDS},
+        "sources": {str(w): store.sources(w, MAX_SOURCES) for w in windows + [None]},
+    }
+
+
+def publish(store, path=SNAPSHOT_FILE, limit=SNAPSHOT_ALERTS):
+    """Write the store's newest alerts and statistics to the snapshot file. Returns its size."""
+    alerts, version = store.since(0, limit)
+    return write_snapshot(path, alerts, version, snapshot_extra(store))
+
+# =====================================================
+# Workers
+# =====================================================
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass  # One line per request costs more than serving a cached page
+
+
+_inherited = []  # Loader objects a worker keeps alive but never uses (see _run_worker)
+
+
+def _run_worker(sock, host, port, path, quiet):
+    """Body of a forked worker: serve the app from the snapshot until killed."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl-C is handled by the loader
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # The loader's store holds its storage reader, with SQLite an open connection.
+    # A connection must not be used or closed on both sides of fork(): dropping the
+    # store here would close it in this process. Workers read the snapshot instead,
+    # and exports open their own connection after the fork.
+    _inherited.append(web_dashboard.store)
+    web_dashboard.store = SnapshotStore(path)
+    web_dashboard.page_cache = web_dashboard.PageCache()
+    server = make_server(host, port, web_dashboard.app, threaded=True, fd=sock.fileno(),
+                         request_handler=_QuietHandler if quiet else None)
+    try:
+        server.serve_forever()
+    finally:
+        # Skip atexit handlers inherited from the loader (they would save its sketches)
+        os._exit(0)
+
+
+def _fork_worker(sock, host, port, path, quiet):
+    gc.freeze()  # Keep the loader's objects out of GC passes so forked pages stay shared
+    pid = os.fork()
+    if pid == 0:
+        _run_worker(sock, host, port, path, quiet)
+    return pid
+
+# =====================================================
+# Main loop
+# =====================================================
+
+def serve(host="127.0.0.1", port=5000, workers=None, path=SNAPSHOT_FILE, quiet=False):
+    """Run the loader and `workers` worker processes (default: one per CPU) until interrupted."""
+    workers = workers or os.cpu_count() or 1
+    store = web_dashboard.store
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.set_inheritable(True)
+
+    # The first snapshot exists before any worker starts, so none serves an empty page
+    store.refresh()
+    publish(store, path)
+    published = store.version
+    children = {_fork_worker(sock, host, port, path, quiet) for _ in range(workers)}
+    print(f"[Mini-SIEM] Serving http://{host}:{sock.getsockname()[1]}/ with {workers} workers "
+          f"(snapshot: {path}, {len(store):,} alerts loaded)")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    last_write = time.monotonic()
+    try:
+        while not stopping:
+            store.refresh()
+            if store.version != published and time.monotonic() - last_write >= SNAPSHOT_INTERVAL:
+                publish(store, path)
+                published, last_write = store.version, time.monotonic()
+            # Replace workers that died (crash, OOM kill) so capacity stays constant
+            while children:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+                if not pid:
+                    break
+                children.discard(pid)
+                if not stopping:
+                    children.add(_fork_worker(sock, host, port, path, quiet))
+            time.sleep(web_dashboard.POLL_INTERVAL)
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        sock.close()
+        store.save_sketches()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Mini-SIEM dashboard with several worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--snapshot", default=SNAPSHOT_FILE, help="shared snapshot file")
+    parser.add_argument("--quiet", action="store_true", help="no access log")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.snapshot, args.quiet)
+
+
+if __name__ == "__main__":
+    main()
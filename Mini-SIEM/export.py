@@ -0,0 +1,260 @@
+# =====================================================
+# export.py
+# Streaming alert export for offline analysis.
+# Filtered alerts are written as NDJSON, CSV or Parquet in small chunks,
+# optionally gzip-compressed on the fly, so memory use stays the same
+# whether one alert or a hundred million are exported. The same chunk
+# generator backs the command line and the dashboard's /api/export route.
+# Usage:  python export.py --format csv --gzip -o alerts.csv.gz --severity Critical
+#         python export.py --format parquet -o alerts.parquet --source archive --ip 10.0.0.5
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import csv
+import io
+import json
+import sys
+import zlib
+
+try:
+    import pyarrow as pa            # Optional: only needed for Parquet export
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from alert_store import parse_time
+from archive import ARCHIVE_DIR, Archive, parse_bound
+from correlation import key_value
+from storage import iter_stored
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+CHUNK_BYTES = 64 * 1024     # NDJSON/CSV bytes buffered before a chunk is handed out
+ROW_GROUP = 10_000          # Alerts per Parquet row group (the unit of buffering for Parquet)
+ARCHIVE_PAGE = 1000         # Alerts fetched per archive search page
+GZIP_LEVEL = 6
+
+COLUMNS = ("time", "severity", "type", "ip", "log")   # CSV/Parquet columns; other fields go to `extra`
+FORMATS = {                                           # format -> (content type, file extension)
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _require_pyarrow():
+    if pq is None:
+        raise RuntimeError("Parquet export needs PyArrow: pip install pyarrow")
+    return pq
+
+# =====================================================
+# Selecting alerts
+# =====================================================
+
+def matches(severity=None, type=None, ip=None, host=None, start=None, end=None):
+    """
+    Return a function alert -> bool for the given filters (all optional).
+    start/end are "YYYY-MM-DD[ HH:MM:SS]", inclusive. Raises ValueError on a bad bound.
+    """
+    fields = [(field, value) for field, value in (("severity", severity), ("type", type), ("ip", ip))
+              if value]
+    lo = parse_bound(start) if start else None
+    hi = parse_bound(end, end=True) if end else None
+
+    def test(alert):
+        if any(alert.get(field) != value for field, value in fields):
+            return False
+        if host and key_value(alert, "host") != host:
+            return False
+        if lo is not None or hi is not None:
+            try:
+                epoch = parse_time(alert.get("time"))
+            except ValueError:
+                return False
+            if lo is not None and epoch < lo or hi is not None and epoch > hi:
+                return False
+        return True
+    return test
+
+
+def _archive_pages(archive, filters):
+    cursor = None
+    while True:
+        alerts, cursor, _ = archive.search(cursor=cursor, limit=ARCHIVE_PAGE, **filters)
+        yield from alerts
+        if cursor is None:
+            return
+
+
+def select(source="store", target=None, **filters):
+    """
+    Return an iterator over the alerts matching `filters`, read one at a time.
+    - source="store": the journal or SQLite database (`target`, default: the configured one), oldest first
+    - source="archive": the columnar archive (`target`, default ARCHIVE_DIR), newest first, using its indexes
+    Raises ValueError on an unknown source or a malformed filter, before anything is read.
+    """
+    test = matches(**filters)
+    if source == "archive":
+        return _archive_pages(Archive(target or ARCHIVE_DIR), filters)
+    if source == "store":
+        return (alert for alert in iter_stored(target) if test(alert))
+    raise ValueError(f"unknown source: {source!r}")
+
+# =====================================================
+# Writers: each yields bytes chunks
+# =====================================================
+
+def _row(alert):
+    """Alert -> CSV/Parquet row: the COLUMNS, then the other fields as one JSON object (or None)."""
+    extra = {k: v for k, v in alert.items() if k not in COLUMNS}
+    return [alert.get(column) for column in COLUMNS] + [json.dumps(extra, ensure_ascii=False) if extra else None]
+
+
+def ndjson_chunks(alerts):
+    buffer, size = [], 0
+    for alert in alerts:
+        line = json.dumps(alert, ensure_ascii=False) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def csv_chunks(alerts):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS + ("extra",))
+    for alert in alerts:
+        writer.writerow(_row(alert))
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Drain:
+    """Write-only file object that hands what ParquetWriter wrote so far to the caller."""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_chunks(alerts, compression="snappy"):
+    """Parquet file in row groups of ROW_GROUP alerts. `compression` is the codec inside the file."""
+    _require_pyarrow()
+    schema = pa.schema([(column, pa.string()) for column in COLUMNS + ("extra",)])
+    drain = _Drain()
+    writer = pq.ParquetWriter(drain, schema, compression=compression)
+
+    def flush(rows):
+        # Written column by column; strings repeat a lot, so Parquet dictionary-encodes them
+        columns = [[None if value is None else str(value) for value in column] for column in zip(*rows)]
+        writer.write_table(pa.Table.from_arrays([pa.array(c, pa.string()) for c in columns], schema=schema))
+        return drain.take()
+
+    rows = []
+    for alert in alerts:
+        rows.append(_row(alert))
+        if len(rows) >= ROW_GROUP:
+            yield flush(rows)
+            rows = []
+    if rows:
+        yield flush(rows)
+    writer.close()
+    yield drain.take()   # Footer
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """Compress a stream of chunks into one gzip stream, chunk by chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)   # wbits=31: gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(alerts, fmt="ndjson", compress=False):
+    """
+    Encode `alerts` (any iterable) as `fmt` and yield non-empty bytes chunks.
+    compress: gzip the NDJSON/CSV stream; Parquet uses its own gzip codec per column instead.
+    Raises ValueError for an unknown format, RuntimeError for Parquet without PyArrow.
+    """
+    if fmt == "ndjson":
+        chunks = ndjson_chunks(alerts)
+    elif fmt == "csv":
+        chunks = csv_chunks(alerts)
+    elif fmt == "parquet":
+        _require_pyarrow()
+        return (chunk for chunk in parquet_chunks(alerts, "gzip" if compress else "snappy") if chunk)
+    else:
+        raise ValueError(f"unknown format: {fmt!r} (use {', '.join(FORMATS)})")
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return (chunk for chunk in chunks if chunk)
+
+
+def file_name(fmt, compress=False):
+    """Suggested download name, e.g. alerts.csv.gz."""
+    return f"alerts.{FORMATS[fmt][1]}" + (".gz" if compress and fmt != "parquet" else "")
+
+# =====================================================
+# Command line
+# =====================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Mini-SIEM alerts as NDJSON, CSV or Parquet")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="gzip NDJSON/CSV (Parquet: gzip codec)")
+    parser.add_argument("-o", "--output", help="output file (default: standard output)")
+    parser.add_argument("--source", choices=("store", "archive"), default="store")
+    parser.add_argument("--input", help="journal directory, SQLite file or archive directory to read")
+    for name in ("severity", "type", "ip", "host", "start", "end"):
+        parser.add_argument(f"--{name}")
+    args = parser.parse_args(argv)
+    filters = {name: getattr(args, name) for name in ("severity", "type", "ip", "host", "start", "end")}
+
+    alerts = select(args.source, args.input, **filters)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        for chunk in export_chunks(alerts, args.format, args.gzip):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print(f"[Mini-SIEM] exported {written:,} bytes of {args.format}" + (" (gzip)" if args.gzip else ""),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
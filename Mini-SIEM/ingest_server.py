@@ -0,0 +1,426 @@
+# =====================================================
+# ingest_server.py
+# Syslog ingestion daemon for Mini-SIEM.
+# Listens on UDP and TCP syslog and on a local Unix socket, turns each
+# line into the same alert dict make_alert() produces, runs it through
+# the correlation engine and commits alerts to storage in batches.
+# Source IPs found in the threat intel index (threat_intel.py) are tagged.
+# Usage:  python ingest_server.py [--udp 0.0.0.0:5514] [--tcp 0.0.0.0:5514] [--unix mini_siem.sock]
+# Load test:  python syslog_sender.py --udp 127.0.0.1:5514 --count 100000
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import asyncio
+import os
+import re
+import socket
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from correlation import CorrelationEngine
+from log_generator import EVENTS
+from log_parser import parse_log
+from metrics import Histogram, Registry, start_metrics_server
+from storage import open_writer, storage_label
+from threat_intel import INTEL_FILE, open_intel
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+DEFAULT_UDP = "0.0.0.0:5514"     # 514 needs root; most forwarders can target any port
+DEFAULT_TCP = "0.0.0.0:5514"
+DEFAULT_UNIX = "mini_siem.sock"
+
+QUEUE_SIZE = 50_000      # Parsed alerts waiting for the writer; the backpressure point
+BATCH_SIZE = 1000        # Alerts per storage commit
+FLUSH_INTERVAL = 0.25    # Seconds a partial batch may wait before it is committed
+MAX_LINE = 64 * 1024     # Longer TCP/Unix lines are dropped
+UDP_RCVBUF = 4 * 1024 * 1024  # Kernel buffer for bursts; overflow there cannot be counted here
+STATS_INTERVAL = 10      # Seconds between counter printouts
+
+# =====================================================
+# Parsing: syslog line -> alert dict
+# =====================================================
+
+# RFC 5424: <PRI>1 TIMESTAMP HOST APP PROCID MSGID [SD] MSG
+_RFC5424_RE = re.compile(r"^<(\d{1,3})>1 (\S+) (\S+) (\S+) (\S+) (\S+) (-|\[.*?\]) ?(.*)$")
+# RFC 3164: <PRI>Mmm dd hh:mm:ss HOST TAG: MSG
+_RFC3164_RE = re.compile(r"^<(\d{1,3})>([A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d) (\S+) (.*)$")
+_PRI_RE = re.compile(r"^<(\d{1,3})>(.*)$")
+_IP_RE = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
+
+# EVENT=... code written by make_log() -> event type
+EVENT_CODES = {event_type.replace(" ", "_").upper(): event_type for event_type in EVENTS}
+EVENT_CODES.update({
+    "FILE_CHANGE": "Sensitive file modified",
+    "RANSOMWARE": "Ransomware encrypt",
+    "EXFILTRATION": "Exfiltration",
+})
+
+# EVENT=HTTP_REQUEST is an ordinary request unless its URL carries an injection
+# like the generator's "id=1 OR 1=1" (a tautology) or a UNION SELECT
+HTTP_REQUEST_TYPE = "HTTP request"     # Not in EVENTS, so it is stored as Info
+_SQLI_RE = re.compile(r"\b(?:or|and)\s+'?(\w+)'?\s*=\s*'?\1\b|\bunion\s+(?:all\s+)?select\b", re.IGNORECASE)
+
+# Free-text messages from ordinary daemons (checked in order, case-sensitive)
+KEYWORDS = (
+    ("Failed password", "Failed login"),
+    ("authentication failure", "Failed login"),
+    ("Invalid user", "Failed login"),
+    ("Accepted password", "Successful login"),
+    ("Accepted publickey", "Successful login"),
+    ("useradd", "New user created"),
+    ("sudo:", "Privileged escalation"),
+)
+
+# Syslog severity (PRI % 8) -> Mini-SIEM severity for messages we cannot classify
+SYSLOG_SEVERITY = ("Critical", "Critical", "Critical", "High", "Medium", "Info", "Info", "Info")
+UNCLASSIFIED_TYPE = "Syslog message"
+
+
+def parse_syslog(line):
+    """
+    Split a syslog line into (pri, host, message).
+    Handles RFC 5424, RFC 3164 and bare lines (pri and host are then None).
+    """
+    match = _RFC5424_RE.match(line)
+    if match:
+        host = match.group(3)
+        return int(match.group(1)), (None if host == "-" else host), match.group(8)
+    match = _RFC3164_RE.match(line)
+    if match:
+        return int(match.group(1)), match.group(3), match.group(4)
+    match = _PRI_RE.match(line)
+    if match:
+        return int(match.group(1)), None, match.group(2)
+    return None, None, line
+
+
+def classify(fields, message):
+    """Return the event type for a parsed message, or None if unknown."""
+    code = fields.get("event")
+    if code:
+        if code == "LOGIN":
+            return "Failed login" if fields.get("status") == "failed" else "Successful login"
+        if code.upper() == "HTTP_REQUEST":
+            return "SQL Injection attempt" if _SQLI_RE.search(fields.get("url", "")) else HTTP_REQUEST_TYPE
+        event_type = EVENT_CODES.get(code.upper())
+        if event_type:
+            return event_type
+    for keyword, event_type in KEYWORDS:
+        if keyword in message:
+            return event_type
+    return None
+
+
+def line_to_alert(line, peer=None, received=None):
+    """
+    Turn one syslog line into an alert dict (time, severity, type, ip, log).
+    - time: the Mini-SIEM timestamp inside the message, else the receive time
+    - type/severity: EVENT= code or keyword, classified with the EVENTS table
+    - ip: ip= field, else the first IPv4 address in the message, else the sender
+    Returns None for empty lines.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    pri, host, message = parse_syslog(line)
+    fields = parse_log(message)
+
+    event_type = classify(fields, message)
+    if event_type is None:
+        event_type = UNCLASSIFIED_TYPE
+        severity = SYSLOG_SEVERITY[pri % 8] if pri is not None else "Info"
+    else:
+        severity = EVENTS.get(event_type, "Info")
+
+    ip = fields.get("ip")
+    if not ip:
+        match = _IP_RE.search(message)
+        ip = match.group(0) if match else peer
+
+    timestamp = fields.get("time") or time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(received))
+    if host and "host" not in fields:
+        message = f"{message} HOST={host}"
+    return {"time": timestamp, "severity": severity, "type": event_type, "ip": ip, "log": message}
+
+# =====================================================
+# Server
+# =====================================================
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        peer = addr[0] if isinstance(addr, tuple) else None
+        # One datagram may carry several newline-separated messages
+        for line in data.decode("utf-8", "replace").splitlines():
+            self.server.offer(line, peer, "udp")
+
+
+class IngestServer:
+    """
+    Receives syslog lines and commits them to storage in batches.
+    - UDP cannot be slowed down, so when the queue is full datagrams are dropped
+      (and counted); TCP and Unix connections simply stop being read until the
+      writer catches up, which pushes back on the sender through the socket
+    - one writer task drains the queue in batches of up to `batch_size`;
+      storage writes run in a worker thread so receiving never blocks on disk
+    """
+
+    def __init__(self, writer, engine=None, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, intel=None):
+        self.writer = writer                      # Anything with append_many(alerts)
+        self.engine = engine                      # Optional CorrelationEngine
+        self.intel = intel                        # Optional ThreatIntel index
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.received = Counter()                 # Lines received per source (udp/tcp/unix)
+        self.dropped = Counter()                  # Lines dropped per reason
+        self.written = 0                          # Alerts committed (including derived)
+        self.derived = 0                          # Alerts raised by the correlation engine
+        self.tagged = 0                           # Alerts whose IP is on a blocklist
+        self.batches = 0
+        self.commit_seconds = Histogram("siem_ingest_commit_seconds", "Time to commit one batch to storage")
+        self._executor = ThreadPoolExecutor(max_workers=1)  # Keeps writes in order
+        self._servers = []
+        self._transports = []
+        self._writer_task = None
+
+    # -----------------------------
+    # Receiving
+    # -----------------------------
+    def offer(self, line, peer, source):
+        """Queue a line without waiting (UDP). Returns False if it was dropped."""
+        self.received[source] += 1
+        alert = line_to_alert(line, peer)
+        if alert is None:
+            self.dropped["empty"] += 1
+            return False
+        try:
+            self.queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            self.dropped["queue_full"] += 1
+            return False
+        return True
+
+    async def _handle_stream(self, reader, writer, source):
+        peername = writer.get_extra_info("peername")
+        peer = peername[0] if isinstance(peername, tuple) else None
+        skipping = False  # Inside an oversized line that is being discarded
+        try:
+            while True:
+                try:
+                    raw = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:
+                    raw = e.partial  # Connection closed; keep a final unterminated line
+                    if not raw:
+                        break
+                except asyncio.LimitOverrunError as e:
+                    await reader.readexactly(e.consumed)  # Discard what is buffered so far
+                    if not skipping:
+                        self.received[source] += 1
+                        self.dropped["too_long"] += 1
+                    skipping = True
+                    continue
+                if skipping:
+                    skipping = False  # This was the tail of the oversized line
+                    continue
+                self.received[source] += 1
+                alert = line_to_alert(raw.decode("utf-8", "replace"), peer)
+                if alert is None:
+                    self.dropped["empty"] += 1
+                else:
+                    await self.queue.put(alert)  # Waits while the queue is full: backpressure
+                if reader.at_eof():
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, udp=None, tcp=None, unix=None):
+        """Start the listeners that were given as (host, port) / socket path, and the writer task."""
+        loop = asyncio.get_running_loop()
+        if udp:
+            transport, _ = await loop.create_datagram_endpoint(lambda: _UdpProtocol(self), local_addr=udp)
+            try:
+                transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RCVBUF)
+            except OSError:
+                pass  # Keep the system default
+            self._transports.append(transport)
+        if tcp:
+            self._servers.append(await asyncio.start_server(
+                lambda r, w: self._handle_stream(r, w, "tcp"), *tcp, limit=MAX_LINE))
+        if unix:
+            if os.path.exists(unix):
+                os.remove(unix)  # Left behind by a previous run
+            self._servers.append(await asyncio.start_unix_server(
+                lambda r, w: self._handle_stream(r, w, "unix"), unix, limit=MAX_LINE))
+        self._writer_task = asyncio.create_task(self._write_loop())
+
+    def addresses(self):
+        """Bound addresses, e.g. to find the port chosen for port 0."""
+        found = [t.get_extra_info("sockname") for t in self._transports]
+        for server in self._servers:
+            found.extend(sock.getsockname() for sock in server.sockets)
+        return found
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    async def _next_batch(self):
+        """Up to `batch_size` alerts; a None in the queue (see close()) ends the batch early."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _commit(self, batch):
+        if self.intel is not None:
+            tag = self.intel.tag
+            self.tagged += sum(1 for alert in batch if tag(alert))
+        if self.engine is not None:
+            derived = list(self.engine.process_many(batch))
+            self.derived += len(derived)
+            batch.extend(derived)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        await loop.run_in_executor(self._executor, self.writer.append_many, batch)
+        self.commit_seconds.observe(time.perf_counter() - started)
+        self.written += len(batch)
+        self.batches += 1
+
+    async def _write_loop(self):
+        while True:
+            batch = await self._next_batch()
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            if batch:
+                try:
+                    await self._commit(batch)
+                except Exception as e:
+                    # A full disk or a locked database must not stop the writer:
+                    # nothing would drain the queue and TCP senders would block forever
+                    self.dropped["write_error"] += len(batch)
+                    print(f"[Mini-SIEM] Could not write {len(batch)} alerts: {e!r}", file=sys.stderr)
+            if stop:
+                return
+
+    async def close(self):
+        """Stop listening, commit everything still queued and stop the writer."""
+        for transport in self._transports:
+            transport.close()
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        if self._writer_task:
+            if not self._writer_task.done():
+                await self.queue.put(None)  # Queued behind the remaining alerts
+            await self._writer_task
+        self._executor.shutdown(wait=True)
+
+    def metrics(self):
+        """A Registry exposing the counters in Prometheus format."""
+        registry = Registry()
+        registry.counter("siem_ingest_received_total", "Lines received", ("source",), fn=lambda: dict(self.received))
+        registry.counter("siem_ingest_dropped_total", "Lines dropped", ("reason",), fn=lambda: dict(self.dropped))
+        registry.counter("siem_ingest_written_total", "Alerts committed to storage", fn=lambda: self.written)
+        registry.counter("siem_ingest_derived_total", "Alerts raised by correlation", fn=lambda: self.derived)
+        registry.counter("siem_ingest_tagged_total", "Alerts tagged by threat intel", fn=lambda: self.tagged)
+        registry.gauge("siem_ingest_queue_depth", "Parsed alerts waiting for the writer", fn=self.queue.qsize)
+        registry.gauge("siem_ingest_queue_capacity", "Size of the ingest queue", fn=lambda: self.queue.maxsize)
+        registry.add(self.commit_seconds)
+        return registry
+
+    def stats(self):
+        return {
+            "received": sum(self.received.values()),
+            "by_source": dict(self.received),
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "derived": self.derived,
+            "tagged": self.tagged,
+            "batches": self.batches,
+            "dropped": dict(self.dropped),
+        }
+
+# =====================================================
+# Command line
+# =====================================================
+
+def parse_address(text):
+    """'0.0.0.0:5514' -> ('0.0.0.0', 5514). Raises ValueError."""
+    host, sep, port = text.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"invalid address: {text!r} (expected HOST:PORT)")
+    return host or "0.0.0.0", int(port)
+
+
+async def serve(args):
+    writer = open_writer(args.output)
+    intel = open_intel(args.intel)
+    server = IngestServer(writer, engine=None if args.no_correlate else CorrelationEngine(),
+                          queue_size=args.queue_size, batch_size=args.batch_size, intel=intel)
+    await server.start(udp=parse_address(args.udp) if args.udp else None,
+                       tcp=parse_address(args.tcp) if args.tcp else None,
+                       unix=args.unix or None)
+    if args.metrics:
+        await start_metrics_server(server.metrics(), *parse_address(args.metrics))
+    print(f"[Mini-SIEM] Ingesting on {', '.join(map(str, server.addresses()))} "
+          f"- writing to {storage_label(args.output)}"
+          + (f" - threat intel: {len(intel):,} ranges" if intel else ""))
+    try:
+        previous, last = 0, time.perf_counter()
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            now = time.perf_counter()
+            stats = server.stats()
+            rate = (stats["received"] - previous) / (now - last)
+            previous, last = stats["received"], now
+            print(f"[Mini-SIEM] {rate:,.0f} lines/s  {stats}")
+    finally:
+        await server.close()
+        print(f"[Mini-SIEM] Final counters: {server.stats()}")
+        writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mini-SIEM syslog ingestion server")
+    parser.add_argument("--udp", default=DEFAULT_UDP, help='UDP listen address ("" to disable)')
+    parser.add_argument("--tcp", default=DEFAULT_TCP, help='TCP listen address ("" to disable)')
+    parser.add_argument("--unix", default=DEFAULT_UNIX if hasattr(socket, "AF_UNIX") else "",
+                        help='Unix socket path ("" to disable)')
+    parser.add_argument("--output", help="journal directory or .sqlite3 file (default: configured storage)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--no-correlate", action="store_true", help="skip the correlation engine")
+    parser.add_argument("--intel", default=INTEL_FILE, help="threat intel index (used if it exists)")
+    parser.add_argument("--metrics", default="127.0.0.1:9105", help='Prometheus /metrics address ("" to disable)')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
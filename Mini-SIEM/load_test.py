@@ -0,0 +1,151 @@
+# =====================================================
+# load_test.py
+# Load test for the multi-process dashboard (dashboard_server.py).
+# Seeds a temporary journal, starts the server with each requested
+# number of workers, hammers it from several client processes with
+# keep-alive connections, and reports requests/s and latency per
+# worker count. Run it on a machine with at least as many cores as the
+# largest worker count plus the clients, or the numbers only show contention.
+# Usage:  python load_test.py --workers 1 2 4 8 --clients 16 --duration 10
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from alert_journal import AlertJournal
+from benchmark import synthetic_alerts
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATHS = ("/", "/api/alerts?limit=50", "/api/alerts?severity=Critical&limit=20",
+                 "/api/stats?window=24h", "/api/sources?window=24h")
+
+# =====================================================
+# Server under test
+# =====================================================
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(directory, port, workers):
+    """Start dashboard_server.py in `directory` (which holds the journal) and wait until it answers."""
+    process = subprocess.Popen([sys.executable, os.path.join(HERE, "dashboard_server.py"), "--workers",
+                                str(workers), "--port", str(port), "--quiet"],
+                               cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/api/alerts?limit=1")
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("dashboard_server.py did not start")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+# =====================================================
+# Clients
+# =====================================================
+
+def client(port, paths, duration, start_at):
+    """One client process: requests in a loop over one keep-alive connection. Returns (ok, errors, latencies)."""
+    while time.time() < start_at:
+        time.sleep(0.001)  # All clients begin together
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    ok = errors = 0
+    latencies = []
+    end = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < end:
+        path = paths[i % len(paths)]
+        i += 1
+        began = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        latencies.append(time.perf_counter() - began)
+    connection.close()
+    return ok, errors, latencies
+
+
+def run_load(port, paths, clients, duration):
+    start_at = time.time() + 0.5
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.starmap(client, [(port, paths, duration, start_at)] * clients)
+    ok = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    latencies = sorted(latency for r in results for latency in r[2])
+    return ok, errors, latencies
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+# =====================================================
+# Command line
+# =====================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput of the multi-process dashboard by worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per worker count")
+    parser.add_argument("--alerts", type=int, default=100_000, help="alerts seeded into the journal")
+    parser.add_argument("--path", action="append", dest="paths", help="URL path to request (repeatable)")
+    args = parser.parse_args(argv)
+    paths = args.paths or list(DEFAULT_PATHS)
+
+    directory = tempfile.mkdtemp(prefix="siem-load-")
+    try:
+        with AlertJournal(os.path.join(directory, "alerts_journal")) as journal:
+            journal.append_many(list(synthetic_alerts(args.alerts)))
+        print(f"[load] {args.alerts:,} alerts, {args.clients} clients, {args.duration:g} s per run, "
+              f"{os.cpu_count()} CPUs")
+        print(f"  {'workers':>7} {'requests/s':>12} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        baseline = None
+        for workers in args.workers:
+            port = free_port()
+            process = start_server(directory, port, workers)
+            try:
+                ok, errors, latencies = run_load(port, paths, args.clients, args.duration)
+            finally:
+                stop_server(process)
+            rate = ok / args.duration
+            baseline = baseline or rate
+            print(f"  {workers:>7} {rate:>12,.0f} {rate / baseline:>7.2f}x "
+                  f"{percentile(latencies, 0.5) * 1e3:>8.1f} {percentile(latencies, 0.99) * 1e3:>8.1f} {errors:>7}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
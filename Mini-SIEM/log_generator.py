@@ -1,20 +1,27 @@
 # =====================================================
 # log_generator.py
 # Generates continuous dummy security events for Mini-SIEM.
-# Each event is written directly to alerts.json for visualization.
+# Each event is appended to the configured alert storage (journal or SQLite).
+# Modes: live (default), batch (load testing) and replay (recorded files).
 # Developed by Jørgen A. Fjellstad - 2025
 # =====================================================
 
+import argparse
+import gc
 import json
+import multiprocessing
 import random
 import time
-import os
+from collections import deque
 
-# -----------------------------
-# Basic settings
-# -----------------------------
-ALERTS_FILE = "alerts.json"  # Output file for alerts
-MAX_ALERTS = 400             # Keep only the latest 400 alerts
+try:
+    import numpy as np  # Optional: only needed for vectorized batch generation
+except ImportError:
+    np = None
+
+from alert_store import parse_time
+from correlation import CorrelationEngine
+from storage import iter_stored, open_writer, storage_label
 
 # -----------------------------
 # Event types and severity levels
@@ -49,7 +56,15 @@ EVENTS = {
 # IP generation (realistic internal and external sources)
 # =====================================================
 
-_ACTIVE_HOSTS = []  # Stores recently used IPs for reuse
+MAX_ACTIVE_HOSTS = 40
+_ACTIVE_HOSTS = deque(maxlen=MAX_ACTIVE_HOSTS)  # Stores recently used IPs for reuse
+_ACTIVE_SET = set()                              # Same IPs, for O(1) membership checks
+
+
+def reset_active_hosts():
+    """Forget recently used IPs (used to make seeded output reproducible)."""
+    _ACTIVE_HOSTS.clear()
+    _ACTIVE_SET.clear()
 
 def random_ip(internal_prob=0.45, reuse_prob=0.25):
     """
@@ -89,20 +104,21 @@ def random_ip(internal_prob=0.45, reuse_prob=0.25):
         ]
         ip = f"{random.choice(subnets)}{random.randint(1,254)}"
 
-    # Keep small list of active IPs for reuse
-    if ip not in _ACTIVE_HOSTS:
+    # Keep small list of active IPs for reuse (the deque drops the oldest itself)
+    if ip not in _ACTIVE_SET:
+        if len(_ACTIVE_HOSTS) == MAX_ACTIVE_HOSTS:
+            _ACTIVE_SET.discard(_ACTIVE_HOSTS[0])
         _ACTIVE_HOSTS.append(ip)
-        if len(_ACTIVE_HOSTS) > 40:
-            _ACTIVE_HOSTS.pop(0)
+        _ACTIVE_SET.add(ip)
     return ip
 
 # =====================================================
 # Log message formatting
 # =====================================================
 
-def make_log(event_type, ip):
+def make_log(event_type, ip, timestamp=None):
     """Create a log message string for the given event type."""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = timestamp or time.strftime("%Y-%m-%d %H:%M:%S")
 
     if event_type == "Failed login":
         user = random.choice(["admin", "root", "guest"])
@@ -121,38 +137,22 @@ def make_log(event_type, ip):
         # Generic format for other events
         return f"{timestamp} HOST=web01 EVENT={event_type.replace(' ', '_').upper()} ip={ip}"
 
-# =====================================================
-# Read/write operations for alerts.json
-# =====================================================
-
-def load_alerts():
-    """Read previous alerts from disk if available."""
-    if os.path.exists(ALERTS_FILE):
-        try:
-            with open(ALERTS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
-
-def save_alerts(alerts):
-    """Write alerts to disk (only the latest MAX_ALERTS)."""
-    alerts = alerts[-MAX_ALERTS:]
-    with open(ALERTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(alerts, f, ensure_ascii=False, indent=2)
-
 # =====================================================
 # Generate and store one alert
 # =====================================================
 
-def make_alert():
-    """Return a complete alert dictionary (one event)."""
+def make_alert(timestamp=None):
+    """
+    Return a complete alert dictionary (one event).
+    `timestamp` ("YYYY-MM-DD HH:MM:SS") defaults to the current time.
+    """
+    timestamp = timestamp or time.strftime("%Y-%m-%d %H:%M:%S")
     event_type = random.choice(list(EVENTS.keys()))
     severity = EVENTS[event_type]
     ip = random_ip()
-    log_entry = make_log(event_type, ip)
+    log_entry = make_log(event_type, ip, timestamp)
     return {
-        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "time": timestamp,
         "severity": severity,
         "type": event_type,
         "ip": ip,
@@ -160,17 +160,404 @@ def make_alert():
     }
 
 # =====================================================
-# Main program loop
+# Vectorized generation (NumPy): a million events at a time
 # =====================================================
-if __name__ == "__main__":
-    print("[Mini-SIEM] Live generator running - writing to alerts.json")
+
+PRIVATE_WEIGHTS = (0.5, 0.35, 0.15)  # 10.x, 192.168.x, 172.16-31.x (same as random_ip)
+PUBLIC_SUBNETS = ("3.5.140.", "52.95.110.", "104.16.132.", "34.96.152.",
+                  "185.199.108.", "157.240.0.", "45.77.0.", "88.198.51.")
+LOGIN_USERS = ("admin", "root", "guest")
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Vectorized generation needs NumPy: pip install numpy")
+    return np
+
+
+def _pack(prefix):
+    """'185.199.108.' (1-3 leading octets) -> that prefix as a 32-bit integer."""
+    octets = [int(o) for o in prefix.strip(".").split(".")]
+    return sum(o << (24 - 8 * i) for i, o in enumerate(octets))
+
+
+PUBLIC_BASES = np.array([_pack(s) for s in PUBLIC_SUBNETS], dtype=np.uint32) if np is not None else None
+OCTETS = np.array([str(i) for i in range(256)]) if np is not None else None
+
+
+def bulk_packed_ips(rng, n, internal_prob=0.45, reuse_prob=0.25):
+    """
+    Draw `n` IPv4 addresses as 32-bit integers, with the same distribution as
+    random_ip(): 45% internal (weighted private ranges), otherwise a public
+    subnet, and a 25% chance of reusing one of the last MAX_ACTIVE_HOSTS
+    distinct addresses that were added to the active list.
+    """
+    _require_numpy()
+    internal = rng.random(n) < internal_prob
+    private_range = np.searchsorted(np.cumsum(PRIVATE_WEIGHTS), rng.random(n))
+    a = rng.integers(0, 256, n, dtype=np.uint32)
+    b = rng.integers(0, 256, n, dtype=np.uint32)
+    host = rng.integers(1, 255, n, dtype=np.uint32)
+    o172 = rng.integers(16, 32, n, dtype=np.uint32)
+    subnet = rng.integers(0, len(PUBLIC_SUBNETS), n)
+
+    fresh = PUBLIC_BASES[subnet] | host
+    ten, c192, c172 = (internal & (private_range == k) for k in range(3))
+    fresh[ten] = (10 << 24) | (a[ten] << 16) | (b[ten] << 8) | host[ten]
+    fresh[c192] = (192 << 24) | (168 << 16) | (a[c192] << 8) | host[c192]
+    fresh[c172] = (172 << 24) | (o172[c172] << 16) | (a[c172] << 8) | host[c172]
+
+    reuse = rng.random(n) < reuse_prob
+    reuse[:1] = False  # Nothing to reuse yet
+    fresh_rows = np.flatnonzero(~reuse)
+    values = fresh[fresh_rows]
+
+    # random_ip() adds a fresh address to the active list unless it is already
+    # there: the first time it is seen, or again once MAX_ACTIVE_HOSTS newer
+    # addresses have pushed it out (counted here by first sightings)
+    key = (values.astype(np.uint64) << 32) | np.arange(len(values), dtype=np.uint64)
+    key.sort()                                   # By address, then draw order
+    order = (key & 0xFFFFFFFF).astype(np.intp)
+    same = values[order][1:] == values[order][:-1]
+    previous = np.full(len(values), -1)
+    previous[order[1:][same]] = order[:-1][same]
+    first = previous < 0
+    first_seen = np.cumsum(first)
+    added = first | (~first & (first_seen - first_seen[previous] >= MAX_ACTIVE_HOSTS))
+
+    # Each reusing row picks uniformly among the last MAX_ACTIVE_HOSTS additions before it
+    is_added = np.zeros(n, dtype=bool)
+    is_added[fresh_rows[added]] = True
+    added_rows = np.flatnonzero(is_added)
+    added_before = np.cumsum(is_added) - is_added
+    reusing = np.flatnonzero(reuse)
+    window = np.minimum(added_before[reusing], MAX_ACTIVE_HOSTS)
+    back = rng.integers(0, window)
+    fresh[reusing] = fresh[added_rows[added_before[reusing] - 1 - back]]
+    return fresh
+
+
+def format_ips(packed):
+    """Dotted-quad strings for 32-bit addresses; each distinct address is formatted (and stored) once."""
+    _require_numpy()
+    unique, inverse = np.unique(packed, return_inverse=True)
+    text = OCTETS[unique >> 24]
+    for shift in (16, 8, 0):
+        text = np.char.add(np.char.add(text, "."), OCTETS[(unique >> shift) & 255])
+    return np.array(text.tolist(), dtype=object)[inverse.ravel()].tolist()
+
+
+def bulk_ips(rng, n, internal_prob=0.45, reuse_prob=0.25):
+    """Draw `n` IP strings with the same distribution as random_ip() (see bulk_packed_ips())."""
+    return format_ips(bulk_packed_ips(rng, n, internal_prob, reuse_prob))
+
+
+def bulk_timestamps(n, start_epoch, spacing):
+    """Format `n` timestamps; each distinct second is formatted only once."""
+    _require_numpy()
+    seconds = np.floor(start_epoch + np.arange(n) * spacing).astype(np.int64)
+    unique, inverse = np.unique(seconds, return_inverse=True)
+    stamps = [time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(s)) for s in unique.tolist()]
+    return np.array(stamps, dtype=object)[inverse.ravel()].tolist()
+
+
+def _log_templates(types):
+    """
+    (middles, suffixes) such that a log line is time + middle + ip + suffix,
+    as make_log() writes it. Index t is event type t; failed logins, whose
+    line names the user, use len(types) + user index.
+    """
+    middles, suffixes = [], []
+    for event_type in types:
+        if event_type == "SQL Injection attempt":
+            middle, suffix = " HOST=web01 EVENT=HTTP_REQUEST url='/product.php?id=1 OR 1=1' ip=", " ua='sqlmap/1.6'"
+        elif event_type == "Sensitive file modified":
+            middle, suffix = " HOST=app01 EVENT=FILE_CHANGE file=/etc/passwd user=apache action=modified ip=", ""
+        elif event_type == "Ransomware encrypt":
+            middle, suffix = " HOST=file01 EVENT=RANSOMWARE file=/data/payroll.xlsx user=root ip=", ""
+        elif event_type == "Exfiltration":
+            middle, suffix = " HOST=web01 EVENT=EXFILTRATION to=", " bytes="   # The ip slot holds the destination
+        else:
+            middle, suffix = f" HOST=web01 EVENT={event_type.replace(' ', '_').upper()} ip=", ""
+        middles.append(middle)
+        suffixes.append(suffix)
+    for user in LOGIN_USERS:
+        middles.append(f" HOST=web01 EVENT=LOGIN user={user} ip=")
+        suffixes.append(" status=failed reason=invalid_password")
+    return np.array(middles, dtype=object), np.array(suffixes, dtype=object)
+
+
+def make_alerts_bulk(n, seed=None, start_epoch=None, spacing=None):
+    """
+    Vectorized counterpart of make_alert(): event types, IP octets, reuse
+    decisions and timestamps are drawn as NumPy arrays; addresses and seconds
+    are formatted once per distinct value and log lines are joined from shared
+    per-type templates. Returns a list of `n` alert dictionaries.
+    """
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    start_epoch = time.time() if start_epoch is None else start_epoch
+    spacing = DEFAULT_SPACING if spacing is None else spacing
+
+    types = list(EVENTS)
+    type_idx = rng.integers(0, len(types), n)
+    users = rng.integers(0, len(LOGIN_USERS), n)
+
+    # One address stream like random_ip()'s: an exfiltration row draws its
+    # source and then its destination, so both come from the same active hosts
+    exfil = type_idx == types.index("Exfiltration")
+    position = np.arange(n) + np.cumsum(exfil) - exfil
+    packed = bulk_packed_ips(rng, n + int(exfil.sum()))
+    ips = format_ips(packed[position])
+    sizes = rng.integers(100_000, 5_000_001, int(exfil.sum()))
+
+    # Per-row pieces as object arrays: each template string exists once and rows share it
+    template = np.where(type_idx == types.index("Failed login"), len(types) + users, type_idx)
+    middles, suffixes = _log_templates(types)
+    middle, suffix = middles[template], suffixes[template]
+    slot = np.array(ips, dtype=object)
+    slot[exfil] = format_ips(packed[position[exfil] + 1])
+    suffix[exfil] = [" bytes=" + size for size in sizes.astype(str).tolist()]
+    stamps = bulk_timestamps(n, start_epoch, spacing)
+    severities = [EVENTS[t] for t in types]
+
+    # The lists hold only strings and flat dicts, so cyclic GC passes over them are wasted work
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        logs = [f"{ts}{m}{ip}{s}" for ts, m, ip, s in zip(stamps, middle.tolist(), slot.tolist(), suffix.tolist())]
+        return [{"time": ts, "severity": severities[ti], "type": types[ti], "ip": ip, "log": log}
+                for ti, ip, ts, log in zip(type_idx.tolist(), ips, stamps, logs)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+# =====================================================
+# Batch mode: generate N events as fast as possible (or at a target rate)
+# =====================================================
+
+BATCH_SIZE = 1000             # Alerts written per journal append (one fsync each)
+DEFAULT_SPACING = 0.001       # Seconds of log time between batch events without --rate
+
+
+def generate_chunk(seed, chunk, size, start_epoch, spacing, vectorized=False):
+    """
+    Generate alerts [chunk * size, chunk * size + size) deterministically.
+    Each chunk is seeded on its own, so output is identical for any worker count.
+    """
+    if vectorized:
+        return make_alerts_bulk(size, seed=[seed, chunk], start_epoch=start_epoch + chunk * size * spacing,
+                                spacing=spacing)
+    random.seed(f"{seed}:{chunk}")
+    reset_active_hosts()
+    first = chunk * size
+    alerts = []
+    for i in range(first, first + size):
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_epoch + i * spacing))
+        alerts.append(make_alert(stamp))
+    return alerts
+
+
+def _generate_chunk_args(args):
+    return generate_chunk(*args)
+
+
+def open_output(path):
+    """
+    Return (write_many, close) for a plain NDJSON file, an SQLite database
+    (.sqlite3/.db) or a journal directory. Without a path the configured
+    storage backend is used (see storage.py).
+    """
+    if path and path.endswith((".ndjson", ".jsonl")):
+        f = open(path, "a", encoding="utf-8")
+
+        def write_many(alerts):
+            f.write("".join(json.dumps(a, ensure_ascii=False) + "\n" for a in alerts))
+        return write_many, f.close
+
+    writer = open_writer(path)
+    return writer.append_many, writer.close
+
+
+def run_batch(count, rate=None, seed=None, workers=1, output=None, start=None,
+              batch_size=BATCH_SIZE, correlate=True, vectorized=False):
+    """
+    Write `count` generated alerts in batches.
+    - rate: target events per second (None = as fast as possible)
+    - seed: makes the output reproducible (together with `start`)
+    - workers: generate chunks in a multiprocessing pool
+    - vectorized: generate each chunk with NumPy (make_alerts_bulk)
+    Returns the number of alerts written (including derived alerts).
+    """
+    seed = random.randrange(2**32) if seed is None else seed
+    start_epoch = time.time() if start is None else time.mktime(time.strptime(start, "%Y-%m-%d %H:%M:%S"))
+    spacing = 1.0 / rate if rate else DEFAULT_SPACING
+    if rate:
+        # Smaller batches keep a throttled stream smooth (about 10 writes per second)
+        batch_size = max(1, min(batch_size, int(rate) // 10))
+
+    write_many, close = open_output(output)
+    engine = CorrelationEngine() if correlate else None
+    # Every chunk has the same size so event i always comes from the same seeded
+    # chunk; the surplus of the last chunk is cut off below
+    chunks = [(seed, c, batch_size, start_epoch, spacing, vectorized)
+              for c in range((count + batch_size - 1) // batch_size)]
+
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        batches = pool.imap(_generate_chunk_args, chunks)
+    else:
+        batches = map(_generate_chunk_args, chunks)
+
+    written = 0
+    generated = 0
+    began = time.perf_counter()
+    try:
+        for alerts in batches:
+            alerts = alerts[:count - generated]
+            generated += len(alerts)
+            if engine:
+                alerts = alerts + list(engine.process_many(alerts))
+            write_many(alerts)
+            written += len(alerts)
+            if rate:
+                # Sleep until the schedule catches up with what has been written
+                delay = began + generated / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        if pool:
+            pool.terminate()
+        close()
+    return written
+
+# =====================================================
+# Replay mode: stream a recorded file back at 1x / 10x / max speed
+# =====================================================
+
+def read_recording(path):
+    """Yield alerts from an NDJSON file, an SQLite database or a journal directory, oldest first."""
+    if not path.endswith((".ndjson", ".jsonl")):
+        yield from iter_stored(path)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def run_replay(path, speed=1.0, output=None, batch_size=BATCH_SIZE):
+    """
+    Write the alerts in `path` to the output, keeping their original spacing
+    divided by `speed`. speed=None replays as fast as possible in batches.
+    Returns the number of alerts replayed.
+    """
+    write_many, close = open_output(output)
+    replayed = 0
+    batch = []
+    first_ts = began = None  # First valid alert time, and when it was written
+    try:
+        for alert in read_recording(path):
+            if speed:
+                try:
+                    ts = parse_time(alert.get("time"))
+                except ValueError:
+                    ts = None  # Written right away; only valid times set the pace
+                if ts is not None and first_ts is None:
+                    first_ts, began = ts, time.perf_counter()
+                delay = 0 if ts is None else began + (ts - first_ts) / speed - time.perf_counter()
+                if delay > 0:
+                    # Flush what is due before waiting for the next event
+                    if batch:
+                        write_many(batch)
+                        batch = []
+                    time.sleep(delay)
+            batch.append(alert)
+            replayed += 1
+            if len(batch) >= batch_size:
+                write_many(batch)
+                batch = []
+        if batch:
+            write_many(batch)
+    finally:
+        close()
+    return replayed
+
+# =====================================================
+# Live mode: one event every few seconds
+# =====================================================
+
+def run_live():
+    print(f"[Mini-SIEM] Live generator running - writing to {storage_label()}")
+    # Opening the journal repairs any segment left half-written by a crash
+    journal = open_writer()
+    engine = CorrelationEngine()  # Turns patterns across events into derived alerts
     try:
         while True:
             alert = make_alert()
-            alerts = load_alerts()
-            alerts.append(alert)
-            save_alerts(alerts)
+            journal.append(alert)
             print(f"[{alert['severity']}] {alert['type']} - {alert['ip']} - {alert['time']}")
+            for derived in engine.process(alert):
+                journal.append(derived)
+                print(f"[{derived['severity']}] {derived['type']} (correlated) - {derived['ip']} - {derived['time']}")
             time.sleep(random.uniform(2.0, 5.0))
     except KeyboardInterrupt:
         print("\nStopped.")
+    finally:
+        journal.close()
+
+# =====================================================
+# Command line
+# =====================================================
+
+def parse_speed(value):
+    """'1x', '10', 'max' -> 1.0, 10.0, None."""
+    value = value.lower()
+    if value == "max":
+        return None
+    return float(value[:-1] if value.endswith("x") else value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mini-SIEM event generator")
+    sub = parser.add_subparsers(dest="mode")
+
+    p = sub.add_parser("batch", help="generate N events as fast as possible or at a target rate")
+    p.add_argument("--count", type=int, required=True, help="number of events to generate")
+    p.add_argument("--rate", type=float, help="target events per second (default: max)")
+    p.add_argument("--seed", type=int, help="random seed for reproducible output")
+    p.add_argument("--start", help='first timestamp, "YYYY-MM-DD HH:MM:SS" (default: now)')
+    p.add_argument("--workers", type=int, default=1, help="generator processes")
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    p.add_argument("--output", help="journal directory, .sqlite3 or .ndjson file (default: configured storage)")
+    p.add_argument("--no-correlate", action="store_true", help="skip the correlation engine")
+    p.add_argument("--vectorized", action="store_true", help="generate with NumPy (much faster)")
+
+    p = sub.add_parser("replay", help="stream a recorded .ndjson file, database or journal directory back")
+    p.add_argument("recording")
+    p.add_argument("--speed", type=parse_speed, default=1.0, help="1x, 10x, ... or max")
+    p.add_argument("--output", help="journal directory, .sqlite3 or .ndjson file (default: configured storage)")
+
+    args = parser.parse_args(argv)
+
+    if args.mode == "batch":
+        began = time.perf_counter()
+        written = run_batch(args.count, rate=args.rate, seed=args.seed, workers=args.workers,
+                            output=args.output, start=args.start, batch_size=args.batch_size,
+                            correlate=not args.no_correlate, vectorized=args.vectorized)
+        elapsed = time.perf_counter() - began
+        print(f"[Mini-SIEM] Wrote {written:,} alerts in {elapsed:.2f} s ({written / elapsed:,.0f}/s)")
+    elif args.mode == "replay":
+        began = time.perf_counter()
+        replayed = run_replay(args.recording, speed=args.speed, output=args.output)
+        print(f"[Mini-SIEM] Replayed {replayed:,} alerts in {time.perf_counter() - began:.2f} s")
+    else:
+        run_live()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nStopped.")
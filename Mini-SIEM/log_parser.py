@@ -0,0 +1,96 @@
+# =====================================================
+# log_parser.py
+# Structured parser for the raw `log` field of Mini-SIEM alerts.
+# Turns lines such as
+#   2025-11-01 10:00:00 HOST=web01 EVENT=LOGIN user=admin ip=10.0.0.5 status=failed
+# into typed fields: {"time": ..., "host": "web01", "event": "LOGIN", ...}.
+# Usage:  python log_parser.py [FILE ...]   (reads stdin without files)
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import json
+import re
+import sys
+
+# key=value or key='quoted value with spaces'
+_TOKEN_RE = re.compile(r"(\w+)=(?:'([^']*)'|(\S+))")
+
+INT_FIELDS = ("bytes", "port", "pid", "count")  # Converted to int when numeric
+
+
+def _convert(fields):
+    for key in INT_FIELDS:
+        value = fields.get(key)
+        if value is not None and value.isdigit():
+            fields[key] = int(value)
+    return fields
+
+
+def parse_log(line):
+    """
+    Parse one log line into a dict. Keys are lower-cased; a leading
+    "YYYY-MM-DD HH:MM:SS" timestamp becomes "time". Tokens without "=" are ignored.
+    """
+    fields = {}
+    rest = line
+    # Fixed-width timestamp prefix: cheaper to check by position than by regex
+    if len(line) >= 19 and line[4] == "-" and line[10] == " " and line[13] == ":":
+        fields["time"] = line[:19]
+        rest = line[20:]
+
+    if "'" not in rest:
+        # Fast path: no quoted values, a plain split is enough
+        for token in rest.split():
+            key, sep, value = token.partition("=")
+            if sep and key:
+                fields[key.lower()] = value
+    else:
+        for match in _TOKEN_RE.finditer(rest):
+            quoted = match.group(2)
+            fields[match.group(1).lower()] = quoted if quoted is not None else match.group(3)
+    return _convert(fields)
+
+
+def parse_alert(alert):
+    """Parse the `log` field of an alert dict."""
+    return parse_log(alert.get("log", ""))
+
+
+def parse_stream(lines):
+    """
+    Yield parsed fields for each input line. Lines may be raw log lines or
+    alert NDJSON records (the `log` field is parsed and the alert fields kept).
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                alert = json.loads(line)
+            except ValueError:
+                continue
+            fields = parse_alert(alert)
+            fields.update({k: v for k, v in alert.items() if k != "log"})
+            yield fields
+        else:
+            yield parse_log(line)
+
+
+def main(argv=None):
+    paths = sys.argv[1:] if argv is None else argv
+    out = sys.stdout
+    try:
+        if not paths:
+            for fields in parse_stream(sys.stdin):
+                out.write(json.dumps(fields, ensure_ascii=False) + "\n")
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                for fields in parse_stream(f):
+                    out.write(json.dumps(fields, ensure_ascii=False) + "\n")
+    except BrokenPipeError:
+        pass  # e.g. piped into `head`
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# =====================================================
+# rollups.py
+# Pre-aggregated time-series counts for the Mini-SIEM charts.
+# Every alert increments a per-minute, per-hour and per-day ring buffer,
+# keyed by severity and by type. Charts ask for a window ("24h", "7d")
+# and get at most MAX_POINTS buckets back, however much data is behind them.
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import time
+
+# (bucket size in seconds, number of buckets kept)
+LEVELS = (
+    (60, 24 * 60),        # 1 day of minutes
+    (3600, 31 * 24),      # 31 days of hours
+    (86400, 400),         # ~13 months of days
+)
+MAX_POINTS = 120          # Upper bound on points per series in one response
+FIELDS = ("severity", "type")
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_window(text):
+    """'90s', '15m', '24h', '7d', '2w' or plain seconds -> seconds. Raises ValueError."""
+    text = str(text).strip().lower()
+    try:
+        if text and text[-1] in _UNITS:
+            seconds = int(text[:-1]) * _UNITS[text[-1]]
+        else:
+            seconds = int(text)
+    except ValueError:
+        seconds = 0
+    if seconds <= 0:
+        raise ValueError(f"invalid window: {text!r}")
+    return seconds
+
+
+class _Ring:
+    """Fixed number of time buckets; a slot is reset when a newer bucket reuses it."""
+
+    def __init__(self, resolution, slots):
+        self.resolution = resolution
+        self.slots = slots
+        self.buckets = [None] * slots   # Bucket number currently held by each slot
+        self.counts = [None] * slots    # Per slot: {field: {value: count}}
+
+    def add(self, epoch, values):
+        bucket = epoch // self.resolution
+        i = bucket % self.slots
+        if self.buckets[i] != bucket:
+            if self.buckets[i] is not None and self.buckets[i] > bucket:
+                return  # Older than anything this ring still holds
+            self.buckets[i] = bucket
+            self.counts[i] = {field: {} for field in FIELDS}
+        counts = self.counts[i]
+        for field, value in values:
+            per_value = counts[field]
+            per_value[value] = per_value.get(value, 0) + 1
+
+    def get(self, bucket):
+        i = bucket % self.slots
+        return self.counts[i] if self.buckets[i] == bucket else None
+
+    @property
+    def span(self):
+        return self.resolution * self.slots
+
+
+class Rollups:
+    """Per-minute / per-hour / per-day counts by severity and type."""
+
+    def __init__(self, levels=LEVELS):
+        self.rings = [_Ring(resolution, slots) for resolution, slots in levels]
+        self.latest = None  # Newest event time seen (epoch seconds)
+
+    def add(self, epoch, alert):
+        """Count one alert at `epoch` seconds."""
+        values = [(field, alert.get(field)) for field in FIELDS]
+        for ring in self.rings:
+            ring.add(epoch, values)
+        if self.latest is None or epoch > self.latest:
+            self.latest = epoch
+
+    def _points(self, window, end, max_points):
+        """(ring, first bucket, last bucket, buckets per point) that series() reads."""
+        ring = next((r for r in self.rings if r.span >= window), self.rings[-1])
+        last = end // ring.resolution
+        first = max(last - (window + ring.resolution - 1) // ring.resolution + 1, last - ring.slots + 1)
+        points = last - first + 1
+        step = max(1, -(-points // max_points))  # ceil division
+        first = last - ((points + step - 1) // step) * step + 1  # Align so the newest point is complete
+        return ring, first, last, step
+
+    def window_start(self, window, end, max_points=MAX_POINTS):
+        """First second counted by series(window, end=end): the window rounded out to whole buckets."""
+        ring, first, _, _ = self._points(window, end, max_points)
+        return first * ring.resolution
+
+    def series(self, window, by="severity", end=None, max_points=MAX_POINTS):
+        """
+        Return counts over the last `window` seconds (ending at `end`, default the
+        newest event) as {"labels", "series", "totals", "resolution", ...}.
+        The finest ring covering the window is used; neighbouring buckets are
+        merged so that at most `max_points` points are returned.
+        """
+        if by not in FIELDS:
+            raise ValueError(f"unknown field: {by!r}")
+        end = self.latest if end is None else end
+        result = {"window": window, "by": by, "resolution": None, "labels": [], "series": {}, "totals": {}}
+        if end is None:
+            return result
+
+        ring, first, last, step = self._points(window, end, max_points)
+        labels = []
+        points_counts = []  # One {value: count} per returned point
+        for start in range(first, last + 1, step):
+            labels.append(time.strftime("%Y-%m-%d %H:%M", time.gmtime(start * ring.resolution)))
+            merged = {}
+            for bucket in range(start, start + step):
+                counts = ring.get(bucket)
+                if counts:
+                    for value, count in counts[by].items():
+                        merged[value] = merged.get(value, 0) + count
+            points_counts.append(merged)
+
+        keys = {value for merged in points_counts for value in merged}
+        series = {value: [merged.get(value, 0) for merged in points_counts] for value in sorted(keys, key=str)}
+
+        result.update(resolution=ring.resolution * step, labels=labels, series=series,
+                      totals={value: sum(values) for value, values in series.items()})
+        return result
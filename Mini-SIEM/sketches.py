@@ -0,0 +1,409 @@
+# =====================================================
+# sketches.py
+# Bounded-memory source statistics for Mini-SIEM.
+# "Top IPs" and "unique sources" over months of traffic cannot keep every
+# IP, so they are estimated with two small, mergeable sketches:
+#   - Space-Saving: the heaviest hitters, with a known overcount per key
+#   - HyperLogLog: the number of distinct keys, within a few percent
+# SourceSketches keeps one pair per minute / hour / day (like rollups.py),
+# so any window is answered by merging a bounded number of buckets.
+# Sketches from several shards or saved snapshots can be merged.
+# Usage:  python sketches.py show alerts_sketches.json [--window 24h]
+#         python sketches.py merge a.json b.json -o merged.json
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import base64
+import hashlib
+import heapq
+import json
+import math
+import os
+from functools import lru_cache
+from operator import itemgetter
+
+from rollups import parse_window
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+SKETCH_FILE = os.environ.get("MINI_SIEM_SKETCHES", "alerts_sketches.json")  # Saved with the store
+
+# (bucket size in seconds, number of buckets kept)
+LEVELS = (
+    (60, 60),             # 1 hour of minutes
+    (3600, 7 * 24),       # 1 week of hours
+    (86400, 400),         # ~13 months of days
+)
+TOP_CAPACITY = 64         # Keys tracked per bucket by Space-Saving
+HLL_PRECISION = 11        # 2^11 registers per bucket: ~2.3 % standard error, 2 KB
+MAX_MERGE = 60            # Buckets merged per query at most; longer windows use a coarser level
+
+# =====================================================
+# Space-Saving (top-k)
+# =====================================================
+
+class SpaceSaving:
+    """
+    Heavy hitters in a bounded number of counters (Space-Saving with batched
+    evictions). Counts are kept in a plain dict; once it holds 2 * capacity
+    keys, all but the `capacity` largest are dropped in one pass, and
+    `floor` remembers the largest count dropped. A key that is not tracked
+    starts at floor + 1 with error = floor, so for every tracked key
+    count - error <= true count <= count, and no untracked key has been seen
+    more than floor times.
+    """
+
+    def __init__(self, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}    # key -> count (never below the true count)
+        self.errors = {}    # key -> possible overcount, only for keys added after an eviction
+        self.floor = 0
+        self.total = 0      # Events counted
+
+    def add(self, key):
+        self.total += 1
+        counts = self.counts
+        count = counts.get(key)
+        if count is not None:
+            counts[key] = count + 1
+            return
+        counts[key] = self.floor + 1
+        if self.floor:
+            self.errors[key] = self.floor
+        if len(counts) >= 2 * self.capacity:
+            self._truncate(self.capacity)
+
+    def _truncate(self, keep):
+        """Keep the `keep` largest counts; raise the floor to the largest one dropped."""
+        ranked = sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+        if len(ranked) > keep:
+            self.floor = max(self.floor, ranked[keep][1])
+            del ranked[keep:]
+        self.counts = dict(ranked)
+        self.errors = {key: error for key, error in self.errors.items() if key in self.counts}
+
+    def top(self, n=10):
+        """The `n` heaviest keys as (key, count, error) triples."""
+        errors = self.errors
+        return [(key, count, errors.get(key, 0))
+                for key, count in heapq.nlargest(n, self.counts.items(), key=itemgetter(1))]
+
+    def merge(self, other):
+        """
+        Add the counts of another summary. A key missing from one side may
+        still have been seen there up to that side's floor, which is added to
+        both its count and its error.
+        """
+        floor_a, floor_b = self.floor, other.floor
+        counts_a, counts_b = self.counts, other.counts
+        counts, errors = {}, {}
+        for key in counts_a.keys() | counts_b.keys():
+            counts[key] = counts_a.get(key, floor_a) + counts_b.get(key, floor_b)
+            error = (self.errors.get(key, 0) if key in counts_a else floor_a) + \
+                    (other.errors.get(key, 0) if key in counts_b else floor_b)
+            if error:
+                errors[key] = error
+        self.counts, self.errors = counts, errors
+        self.floor = floor_a + floor_b  # Bound for keys neither side tracks
+        self.total += other.total
+        if len(counts) > self.capacity:
+            self._truncate(self.capacity)
+        return self
+
+    def copy(self):
+        summary = SpaceSaving(self.capacity)
+        summary.counts, summary.errors = dict(self.counts), dict(self.errors)
+        summary.floor, summary.total = self.floor, self.total
+        return summary
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "total": self.total, "floor": self.floor,
+                "items": [[key, count, self.errors.get(key, 0)] for key, count in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data["capacity"])
+        summary.total, summary.floor = data["total"], data["floor"]
+        summary.counts = {key: count for key, count, _ in data["items"]}
+        summary.errors = {key: error for key, _, error in data["items"] if error}
+        return summary
+
+    def __len__(self):
+        return len(self.counts)
+
+# =====================================================
+# HyperLogLog (distinct count)
+# =====================================================
+
+@lru_cache(maxsize=4096)
+def hash64(key):
+    """
+    Stable 64-bit hash of a string. Python's hash() is salted per process,
+    which would make sketches saved or built elsewhere impossible to merge.
+    Cached: a few thousand noisy IPs make up most of the traffic.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Distinct count estimate in 2^precision one-byte registers, with a
+    standard error of about 1.04 / sqrt(2^precision). Merging two sketches
+    gives the sketch of the union of what both have seen.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision must be 4-16, got {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key):
+        self.add_hash(hash64(key))
+
+    def add_hash(self, h):
+        p = self.precision
+        rest_bits = 64 - p
+        i = h >> rest_bits
+        # Position of the first 1 bit in the remaining bits (rest_bits + 1 if all zero)
+        rank = rest_bits - (h & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[i]:
+            self.registers[i] = rank
+
+    def estimate(self):
+        registers = self.registers
+        m = len(registers)
+        # Registers hold small values, so count each value instead of summing 2^-r per register
+        harmonic = sum(registers.count(r) * 2.0 ** -r for r in range(max(registers) + 1))
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / harmonic
+        zeros = registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # Linear counting is more accurate for small counts
+        return raw
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision)
+        sketch.registers = bytearray(self.registers)
+        return sketch
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["precision"])
+        registers = base64.b64decode(data["registers"])
+        if len(registers) != len(sketch.registers):
+            raise ValueError("HyperLogLog registers do not match the precision")
+        sketch.registers = bytearray(registers)
+        return sketch
+
+# =====================================================
+# Per-time-bucket source statistics
+# =====================================================
+
+class SourceSketches:
+    """
+    Space-Saving + HyperLogLog pairs per minute, hour and day (ring buffers,
+    as in rollups.py) plus one pair for everything since the start.
+    Memory is bounded by the number of buckets, not by the number of IPs.
+    """
+
+    def __init__(self, levels=LEVELS, capacity=TOP_CAPACITY, precision=HLL_PRECISION):
+        self.levels = tuple(tuple(level) for level in levels)
+        self.capacity = capacity
+        self.precision = precision
+        self.rings = [[None] * slots for _, slots in self.levels]  # slot -> (bucket, SpaceSaving, HyperLogLog)
+        self.all_top = SpaceSaving(capacity * 4)
+        self.all_unique = HyperLogLog(max(precision, 14))
+        self.latest = None  # Newest event time counted (epoch seconds)
+        self.latest_count = 0  # Events counted at exactly `latest`
+        # (level, buckets) -> (newest bucket, merged sketches of the buckets before it).
+        # Finished buckets do not change, so a query only has to merge in the current one
+        self._closed = {}
+
+    def _new_slot(self, bucket):
+        return (bucket, SpaceSaving(self.capacity), HyperLogLog(self.precision))
+
+    def add(self, epoch, key):
+        """Count one event from `key` at `epoch` seconds."""
+        if self.latest is not None and epoch < self.latest:
+            self._closed.clear()  # A late event may land in a bucket that is already merged
+        h = hash64(key)
+        # Every bucket sketch has the same precision: find the register and its new value once
+        rest_bits = 64 - self.precision
+        register = h >> rest_bits
+        rank = rest_bits - (h & ((1 << rest_bits) - 1)).bit_length() + 1
+        for (resolution, slots), ring in zip(self.levels, self.rings):
+            bucket = epoch // resolution
+            slot = ring[bucket % slots]
+            if slot is None or slot[0] != bucket:
+                if slot is not None and slot[0] > bucket:
+                    continue  # Older than anything this ring still holds
+                slot = ring[bucket % slots] = self._new_slot(bucket)
+            slot[1].add(key)
+            registers = slot[2].registers
+            if rank > registers[register]:
+                registers[register] = rank
+        self.all_top.add(key)
+        self.all_unique.add_hash(h)
+        if self.latest is None or epoch > self.latest:
+            self.latest, self.latest_count = epoch, 1
+        elif epoch == self.latest:
+            self.latest_count += 1
+
+    def _level_for(self, window):
+        """Finest level that covers `window` in at most MAX_MERGE buckets (else the coarsest)."""
+        for level, (resolution, slots) in enumerate(self.levels):
+            needed = -(-window // resolution)  # ceil division
+            if needed <= min(slots, MAX_MERGE):
+                return level, needed
+        resolution, slots = self.levels[-1]
+        return len(self.levels) - 1, min(-(-window // resolution), slots)
+
+    def window_start(self, window, end):
+        """First second counted by summary(window, end=end): the window rounded out to whole buckets."""
+        level, needed = self._level_for(window)
+        resolution = self.levels[level][0]
+        return (end // resolution - needed + 1) * resolution
+
+    def summary(self, window=None, n=10, end=None):
+        """
+        Top `n` keys and the distinct-key estimate over the last `window`
+        seconds (ending at `end`, default the newest event), rounded out to
+        whole buckets; window None means everything counted so far.
+        Returns {"window", "resolution", "events", "unique", "top": [[key, count, error], ...]}.
+        """
+        result = {"window": window, "resolution": None, "events": 0, "unique": 0, "top": []}
+        if window is None:
+            top, unique = self.all_top, self.all_unique
+        else:
+            end = self.latest if end is None else end
+            if end is None:
+                return result
+            level, needed = self._level_for(window)
+            resolution, slots = self.levels[level]
+            ring = self.rings[level]
+            last = end // resolution
+            cached = self._closed.get((level, needed))
+            if cached is None or cached[0] != last:
+                top, unique = SpaceSaving(self.capacity), HyperLogLog(self.precision)
+                for bucket in range(last - needed + 1, last):
+                    slot = ring[bucket % slots]
+                    if slot is not None and slot[0] == bucket:
+                        top.merge(slot[1])
+                        unique.merge(slot[2])
+                cached = self._closed[(level, needed)] = (last, top, unique)
+            top, unique = cached[1].copy(), cached[2].copy()
+            slot = ring[last % slots]
+            if slot is not None and slot[0] == last:
+                top.merge(slot[1])
+                unique.merge(slot[2])
+            result["resolution"] = resolution
+        result.update(events=top.total, unique=round(unique.estimate()),
+                      top=[list(item) for item in top.top(n)])
+        return result
+
+    def merge(self, other):
+        """Add the counts of another SourceSketches (e.g. another shard). Returns self."""
+        if (other.levels, other.capacity, other.precision) != (self.levels, self.capacity, self.precision):
+            raise ValueError("cannot merge sketches with different settings")
+        self._closed.clear()
+        for ring, theirs in zip(self.rings, other.rings):
+            for i, slot in enumerate(theirs):
+                if slot is None:
+                    continue
+                mine = ring[i]
+                if mine is None or mine[0] < slot[0]:
+                    mine = ring[i] = self._new_slot(slot[0])
+                if mine[0] == slot[0]:
+                    mine[1].merge(slot[1])
+                    mine[2].merge(slot[2])
+        self.all_top.merge(other.all_top)
+        self.all_unique.merge(other.all_unique)
+        if other.latest is not None and (self.latest is None or other.latest > self.latest):
+            self.latest, self.latest_count = other.latest, other.latest_count
+        elif other.latest is not None and other.latest == self.latest:
+            self.latest_count += other.latest_count
+        return self
+
+    # -----------------------------
+    # Serialization
+    # -----------------------------
+    def to_dict(self):
+        return {
+            "levels": [list(level) for level in self.levels],
+            "capacity": self.capacity,
+            "precision": self.precision,
+            "latest": self.latest,
+            "latest_count": self.latest_count,
+            "all": [self.all_top.to_dict(), self.all_unique.to_dict()],
+            "rings": [[[slot[0], slot[1].to_dict(), slot[2].to_dict()] for slot in ring if slot is not None]
+                      for ring in self.rings],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketches = cls(data["levels"], data["capacity"], data["precision"])
+        sketches.latest = data["latest"]
+        sketches.latest_count = data.get("latest_count", 0)
+        sketches.all_top = SpaceSaving.from_dict(data["all"][0])
+        sketches.all_unique = HyperLogLog.from_dict(data["all"][1])
+        for (_, slots), ring, saved in zip(sketches.levels, sketches.rings, data["rings"]):
+            for bucket, top, unique in saved:
+                ring[bucket % slots] = (bucket, SpaceSaving.from_dict(top), HyperLogLog.from_dict(unique))
+        return sketches
+
+    def save(self, path=SKETCH_FILE):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp, path)  # A crash mid-write never leaves a truncated snapshot
+
+    @classmethod
+    def load(cls, path=SKETCH_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+# =====================================================
+# Command line
+# =====================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mini-SIEM source sketches")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("show", help="top sources and unique count from a saved snapshot")
+    p.add_argument("path", nargs="?", default=SKETCH_FILE)
+    p.add_argument("--window", help="e.g. 1h, 24h, 30d (default: everything)")
+    p.add_argument("-n", type=int, default=10)
+
+    p = sub.add_parser("merge", help="merge snapshots from several shards")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("-o", "--output", required=True)
+
+    args = parser.parse_args(argv)
+    if args.command == "show":
+        window = parse_window(args.window) if args.window else None
+        summary = SourceSketches.load(args.path).summary(window, args.n)
+        print(f"[Mini-SIEM] {summary['events']:,} events from ~{summary['unique']:,} unique sources")
+        for key, count, error in summary["top"]:
+            print(f"  {key:<40} {count:>10,}" + (f"  (up to {error:,} too high)" if error else ""))
+    else:
+        merged = SourceSketches.load(args.paths[0])
+        for path in args.paths[1:]:
+            merged.merge(SourceSketches.load(path))
+        merged.save(args.output)
+        print(f"[Mini-SIEM] merged {len(args.paths)} snapshots into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+# =====================================================
+# snapshot.py
+# Shared, memory-mapped alert snapshot for multi-process serving.
+# One loader process follows the journal with an AlertStore and writes
+# the newest alerts, plus the precomputed counters and chart data, to a
+# columnar snapshot file. Dashboard worker processes map that file
+# read-only, so N workers share one copy of the data in the page cache
+# instead of each re-reading and indexing the journal.
+# Layout: magic, JSON header, then 8-byte aligned columns:
+#   id, epoch         int64 per alert
+#   low-cardinality   uint32 dictionary codes per alert (0 = missing),
+#   fields            the dictionary itself is in the header
+#   other fields      uint64 offsets + one UTF-8 blob (e.g. the log line)
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from alert_store import parse_time
+from rollups import FIELDS, Rollups
+from sketches import SourceSketches
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+SNAPSHOT_FILE = os.environ.get("MINI_SIEM_SNAPSHOT", "alerts_snapshot.bin")
+SNAPSHOT_ALERTS = int(os.environ.get("MINI_SIEM_SNAPSHOT_ALERTS", 20_000))  # Newest alerts in each snapshot
+
+MAGIC = b"MSIEMSN1"
+_HEADER = struct.Struct("<8sI")   # magic, length of the JSON header that follows
+_ALIGN = 8
+
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % _ALIGN))
+
+# =====================================================
+# Writing
+# =====================================================
+
+def write_snapshot(path, alerts, version, extra=None):
+    """
+    Write `alerts` (oldest first, with consecutive ids ending at `version`)
+    and the JSON-serializable `extra` data to `path`, atomically.
+    Returns the size of the snapshot in bytes.
+    """
+    fields = {}  # field -> None, in order of first appearance
+    for alert in alerts:
+        for field in alert:
+            if field not in fields and field not in ("id", "epoch"):
+                fields[field] = None
+
+    columns = []          # (name, bytes)
+    layout = []           # per field: [name, "dict" | "blob", json-encoded, dictionary]
+    columns.append(("id", array("q", (alert["id"] for alert in alerts)).tobytes()))
+    last = 0
+    epochs = array("q")
+    for alert in alerts:
+        # Sorted like the store's time index: unparsable or out-of-order times use the previous one
+        try:
+            last = max(parse_time(alert.get("time")), last)
+        except ValueError:
+            pass
+        epochs.append(last)
+    columns.append(("epoch", epochs.tobytes()))
+
+    for field in fields:
+        values = [alert.get(field) for alert in alerts]
+        encoded = any(value is not None and type(value) is not str for value in values)
+        if encoded:
+            values = [None if value is None else json.dumps(value, ensure_ascii=False) for value in values]
+        distinct = set(values)
+        if len(distinct) <= max(len(values) // 2, 16):
+            # Few distinct values: a dictionary and one small code per alert
+            dictionary = sorted(value for value in distinct if value is not None)
+            code = {value: i + 1 for i, value in enumerate(dictionary)}
+            code[None] = 0
+            columns.append((field, array("I", (code[value] for value in values)).tobytes()))
+            layout.append([field, "dict", encoded, dictionary])
+        else:
+            blobs = [(value or "").encode("utf-8") for value in values]
+            offsets = array("Q", [0])
+            total = 0
+            for blob, value in zip(blobs, values):
+                # An offset with the top bit set marks a missing value
+                total += len(blob)
+                offsets.append(total | (1 << 63 if value is None else 0))
+            columns.append((field + ".offsets", offsets.tobytes()))
+            columns.append((field, b"".join(blobs)))
+            layout.append([field, "blob", encoded, None])
+
+    header = {"byteorder": sys.byteorder, "version": version, "rows": len(alerts), "written": time.time(),
+              "fields": layout, "columns": [[name, len(data)] for name, data in columns], "extra": extra or {}}
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for _, data in columns:
+            _pad(f)
+            f.write(data)
+        size = f.tell()
+    os.replace(tmp, path)  # Readers keep their mapping of the old file until they switch
+    return size
+
+# =====================================================
+# Reading
+# =====================================================
+
+class Snapshot:
+    """One mapped snapshot file. Immutable; replaced as a whole when a newer one appears."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not an alert snapshot")
+        offset = _HEADER.size
+        header = json.loads(self._map[offset:offset + length])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path}: written on a {header['byteorder']}-endian machine")
+        offset += length
+        self.version = header["version"]
+        self.rows = header["rows"]
+        self.written = header["written"]
+        self.extra = header["extra"]
+
+        view = memoryview(self._map)
+        self.columns = {}
+        for name, size in header["columns"]:
+            offset += -offset % _ALIGN
+            self.columns[name] = view[offset:offset + size]
+            offset += size
+        self.ids = self.columns["id"].cast("q")
+        self.epochs = self.columns["epoch"].cast("q")
+        self.fields = []   # (field, kind, json-encoded, dictionary, codes or offsets, blob)
+        for field, kind, encoded, dictionary in header["fields"]:
+            if kind == "dict":
+                self.fields.append((field, kind, encoded, dictionary, self.columns[field].cast("I"), None))
+            else:
+                self.fields.append((field, kind, encoded, None, self.columns[field + ".offsets"].cast("Q"),
+                                    self.columns[field]))
+        self._codes = {}  # field -> {value: code}, built on first use
+
+    @property
+    def first_id(self):
+        return self.version - self.rows + 1
+
+    def value(self, field_entry, i):
+        """Value of one field for row `i` (None if the alert did not have it)."""
+        field, kind, encoded, dictionary, data, blob = field_entry
+        if kind == "dict":
+            code = data[i]
+            if not code:
+                return None
+            value = dictionary[code - 1]
+        else:
+            end = data[i + 1]
+            if end >> 63:
+                return None
+            value = bytes(blob[data[i] & ~(1 << 63):end]).decode("utf-8")
+        return json.loads(value) if encoded else value
+
+    def alert(self, i):
+        """Rebuild the alert dict stored in row `i`."""
+        alert = {}
+        for entry in self.fields:
+            value = self.value(entry, i)
+            if value is not None:
+                alert[entry[0]] = value
+        alert["id"] = self.ids[i]
+        return alert
+
+    def matcher(self, field, value):
+        """
+        Return a function row -> bool testing field == value, or None when no
+        row can match (the value is not in the field's dictionary).
+        """
+        for entry in self.fields:
+            if entry[0] == field:
+                break
+        else:
+            return None
+        _, kind, encoded, dictionary, data, _ = entry
+        if kind == "dict" and not encoded:
+            codes = self._codes.get(field)
+            if codes is None:
+                codes = self._codes[field] = {v: i + 1 for i, v in enumerate(dictionary)}
+            code = codes.get(value)
+            if code is None:
+                return None
+            return lambda i: data[i] == code   # Integer compare, nothing decoded
+        return lambda i: self.value(entry, i) == value
+
+# =====================================================
+# Store interface for worker processes
+# =====================================================
+
+class SnapshotStore:
+    """
+    Read-only stand-in for AlertStore, backed by the newest snapshot file.
+    Offers what the dashboard routes use: version, since(), query(), series(),
+    sources(), severities, len(). refresh() switches to a newer snapshot.
+    Queries only see the alerts in the snapshot (the newest SNAPSHOT_ALERTS).
+    series() and sources() serve the windows the loader precomputed; other
+    windows are counted from the snapshot if its alerts cover them.
+    """
+
+    source = None   # Nothing is read from the journal in this process
+
+    def __init__(self, path=SNAPSHOT_FILE, check_interval=0.2):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self.snapshot = None
+        self.refresh()
+
+    def refresh(self):
+        """Map a newer snapshot if the loader has written one. Returns the number of new alerts."""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return 0
+        with self._lock:
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return 0
+            current = self.snapshot
+            if current is not None and (stat.st_ino, stat.st_mtime_ns) == (current.stat.st_ino,
+                                                                           current.stat.st_mtime_ns):
+                return 0
+            try:
+                snapshot = Snapshot(self.path)
+            except (OSError, ValueError):
+                return 0  # Replaced again while opening; the next check picks it up
+            # Requests still using the old mapping keep it alive until they finish
+            self.snapshot = snapshot
+            return snapshot.version - (current.version if current else 0)
+
+    def wait_for_change(self, version, timeout=None):
+        """Poll until the snapshot moves past `version` (or the timeout expires)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.version == version:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(self.check_interval)
+            self.refresh()
+        return self.version
+
+    @property
+    def version(self):
+        return self.snapshot.version if self.snapshot else 0
+
+    @property
+    def severities(self):
+        return self.snapshot.extra.get("severities", {}) if self.snapshot else {}
+
+    @property
+    def times(self):
+        return self.snapshot.epochs if self.snapshot else ()
+
+    def __len__(self):
+        return self.snapshot.extra.get("held", 0) if self.snapshot else 0
+
+    def since(self, version, limit=None):
+        """Same as AlertStore.since(), limited to the alerts in the snapshot."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return [], 0
+        missed = min(max(snapshot.version - version, 0), snapshot.rows)
+        if limit is not None:
+            missed = min(missed, limit)
+        return [snapshot.alert(i) for i in range(snapshot.rows - missed, snapshot.rows)], snapshot.version
+
+    def newest(self, limit=None):
+        alerts, _ = self.since(0, limit)
+        alerts.reverse()
+        return alerts
+
+    def query(self, severity=None, type=None, ip=None, host=None, user=None, file=None, intel=None,
+              start=None, end=None, cursor=None, limit=50):
+        """Same arguments and result as AlertStore.query(), scanning the snapshot's columns."""
+        filters = {field: value for field, value in dict(severity=severity, type=type, ip=ip, host=host,
+                                                         user=user, file=file, intel=intel).items() if value}
+        snapshot = self.snapshot
+        if snapshot is None or not snapshot.rows:
+            return [], None
+        lo = bisect_left(snapshot.epochs, parse_time(start)) if start else 0
+        hi = bisect_right(snapshot.epochs, parse_time(end)) if end else snapshot.rows
+        if cursor is not None:
+            hi = min(hi, cursor - snapshot.first_id)
+        tests = [snapshot.matcher(field, value) for field, value in filters.items()]
+        if any(test is None for test in tests):
+            return [], None
+
+        page = []
+        for i in range(hi - 1, lo - 1, -1):
+            if all(test(i) for test in tests):
+                page.append(snapshot.alert(i))
+                if len(page) > limit:
+                    break
+        if len(page) > limit:
+            page.pop()
+            return page, page[-1]["id"]
+        return page, None
+
+    @staticmethod
+    def _precomputed(snapshot, kind, key):
+        return (snapshot.extra if snapshot else {}).get(kind, {}).get(key)
+
+    @staticmethod
+    def _rows_from(snapshot, start, window):
+        """
+        Rows from second `start` on (None: all rows). Raises ValueError when
+        older alerts that did not fit in the snapshot could count as well.
+        """
+        if snapshot.first_id > 1 and (start is None or snapshot.epochs[0] >= start):
+            windows = ", ".join(f"{w}s" for w in snapshot.extra.get("windows", []))
+            asked = f"window {window}s" if window else "all history"
+            raise ValueError(f"{asked} reaches past the {snapshot.rows:,} alerts in the worker snapshot; "
+                             f"precomputed windows: {windows or 'none yet'} (MINI_SIEM_SNAPSHOT_WINDOWS)")
+        return range(bisect_left(snapshot.epochs, start) if start is not None else 0, snapshot.rows)
+
+    @staticmethod
+    def _field(snapshot, name):
+        return next((entry for entry in snapshot.fields if entry[0] == name), None)
+
+    def series(self, window, by="severity"):
+        """
+        Precomputed by the loader for its windows; any other window is counted
+        from the snapshot's own alerts when they reach back far enough.
+        """
+        if by not in FIELDS:
+            raise ValueError(f"unknown field: {by!r}")
+        snapshot = self.snapshot   # One mapping throughout, even if refresh() switches
+        found = self._precomputed(snapshot, "series", f"{window}|{by}")
+        if found is not None:
+            return found
+        rollups = Rollups()
+        if snapshot is None or not snapshot.rows:
+            return rollups.series(window, by)
+        end = snapshot.epochs[-1]
+        entries = [(field, self._field(snapshot, field)) for field in FIELDS]
+        for i in self._rows_from(snapshot, rollups.window_start(window, end), window):
+            rollups.add(snapshot.epochs[i], {field: entry and snapshot.value(entry, i) for field, entry in entries})
+        return rollups.series(window, by, end=end)
+
+    def sources(self, window=None, n=10):
+        """Like series(): precomputed windows, else counted from the snapshot's alerts."""
+        snapshot = self.snapshot
+        found = self._precomputed(snapshot, "sources", str(window))
+        if found is None:
+            sketches = SourceSketches()
+            if snapshot is not None and snapshot.rows:
+                start = sketches.window_start(window, snapshot.epochs[-1]) if window else None
+                entry = self._field(snapshot, "ip")
+                for i in self._rows_from(snapshot, start, window):
+                    ip = entry and snapshot.value(entry, i)
+                    if ip:
+                        sketches.add(snapshot.epochs[i], ip)
+            found = sketches.summary(window, n)
+        summary = dict(found)
+        summary["top"] = summary["top"][:n]
+        return summary
+
+    def save_sketches(self):
+        pass  # The loader owns the sketches
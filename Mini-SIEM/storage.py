@@ -0,0 +1,261 @@
+# =====================================================
+# storage.py
+# Pluggable alert storage for Mini-SIEM.
+# Two backends share the same small interface:
+#   - "journal": the append-only NDJSON segments in alert_journal.py
+#   - "sqlite":  one SQLite database in WAL mode, so a single writer and
+#                any number of readers work concurrently without locking
+#                each other out (readers never see a half-written batch)
+# The generator and the dashboard pick the backend from the environment:
+#   MINI_SIEM_STORAGE=sqlite  MINI_SIEM_DB=alerts.sqlite3
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import json
+import os
+import sqlite3
+
+from alert_journal import JOURNAL_DIR, AlertJournal, JournalReader, iter_alerts
+from alert_store import parse_time
+from archive import ARCHIVE_DIR, ArchiveCompactor
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+STORAGE_BACKEND = os.environ.get("MINI_SIEM_STORAGE", "journal")    # "journal" or "sqlite"
+SQLITE_PATH = os.environ.get("MINI_SIEM_DB", "alerts.sqlite3")      # Database file for "sqlite"
+SQLITE_MAX_ROWS = int(os.environ.get("MINI_SIEM_MAX_ROWS", 1_000_000))  # Retention by size
+SQLITE_MAX_AGE = int(os.environ.get("MINI_SIEM_MAX_AGE", 0)) or None    # Retention by age (seconds)
+
+SQLITE_SUFFIXES = (".sqlite3", ".sqlite", ".db")
+READ_BATCH = 10_000          # Rows fetched per query while reading
+
+COLUMNS = ("time", "severity", "type", "ip", "log")  # Stored as real columns; the rest go to `extra`
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    time     TEXT,
+    epoch    INTEGER,
+    severity TEXT,
+    type     TEXT,
+    ip       TEXT,
+    log      TEXT,
+    extra    TEXT
+);
+CREATE INDEX IF NOT EXISTS alerts_epoch ON alerts (epoch);
+CREATE INDEX IF NOT EXISTS alerts_severity ON alerts (severity, id);
+CREATE INDEX IF NOT EXISTS alerts_type ON alerts (type, id);
+CREATE INDEX IF NOT EXISTS alerts_ip ON alerts (ip, id);
+"""
+
+# =====================================================
+# SQLite backend
+# =====================================================
+
+def _row(alert):
+    """Alert dict -> tuple for the INSERT statement."""
+    try:
+        epoch = parse_time(alert.get("time"))
+    except ValueError:
+        epoch = None
+    extra = {k: v for k, v in alert.items() if k not in COLUMNS and k != "id"}
+    return (alert.get("time"), epoch, alert.get("severity"), alert.get("type"), alert.get("ip"),
+            alert.get("log"), json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def _alert(row):
+    """Database row (id, time, severity, type, ip, log, extra) -> alert dict."""
+    _, time_, severity, type_, ip, log, extra = row
+    alert = {"time": time_, "severity": severity, "type": type_, "ip": ip, "log": log}
+    if extra:
+        alert.update(json.loads(extra))
+    return alert
+
+
+class SqliteAlertDB:
+    """
+    Alert table in an SQLite database running in WAL mode.
+    - append_many() inserts a whole batch in one transaction
+    - retention deletes the oldest rows beyond `max_rows` and/or rows more
+      than `max_age` seconds older than the newest alert
+    - read_new() follows the table by id, like JournalReader follows segments
+    - query()/count() use the indexes on time, severity, type and ip
+    Open one instance per process (or thread group) and role: the writer and
+    each reader get their own connection.
+    """
+
+    def __init__(self, path=SQLITE_PATH, max_rows=SQLITE_MAX_ROWS, max_age=SQLITE_MAX_AGE,
+                 synchronous="NORMAL"):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self._last_id = 0  # Highest id returned by read_new()
+        # The dashboard refreshes from several request threads (one at a time,
+        # under the store lock), so the connection may not be tied to one thread
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL only syncs at checkpoints in WAL mode: a crash can lose the
+        # last batches but never corrupts the database
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.conn.executescript(_SCHEMA)
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    def append(self, alert):
+        """Insert a single alert."""
+        self.append_many([alert])
+
+    def append_many(self, alerts):
+        """Insert several alerts in one transaction, then apply retention."""
+        rows = [_row(alert) for alert in alerts]
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO alerts (time, epoch, severity, type, ip, log, extra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows)
+            self._enforce_retention()
+
+    def _enforce_retention(self):
+        if self.max_rows:
+            self.conn.execute("DELETE FROM alerts WHERE id <= (SELECT MAX(id) FROM alerts) - ?",
+                              (self.max_rows,))
+        if self.max_age:
+            # Relative to the newest alert rather than the clock, so replayed
+            # recordings are not deleted the moment they are written
+            self.conn.execute("DELETE FROM alerts WHERE epoch < (SELECT MAX(epoch) FROM alerts) - ?",
+                              (self.max_age,))
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+    def read_new(self, limit=None):
+        """
+        Return the alerts inserted since the previous call (at most `limit`), oldest first.
+        Like JournalReader.read_new(), a reader that is behind gets everything in one
+        call, so a dashboard starting on a large table is caught up by its first refresh.
+        """
+        alerts = []
+        while limit is None or len(alerts) < limit:
+            batch = READ_BATCH if limit is None else min(READ_BATCH, limit - len(alerts))
+            rows = self.conn.execute(
+                "SELECT id, time, severity, type, ip, log, extra FROM alerts WHERE id > ? ORDER BY id LIMIT ?",
+                (self._last_id, batch)).fetchall()
+            if rows:
+                self._last_id = rows[-1][0]
+                alerts.extend(_alert(row) for row in rows)
+            if len(rows) < batch:
+                break
+        return alerts
+
+    def iter_alerts(self):
+        """Yield every alert in the table, oldest first."""
+        last = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, time, severity, type, ip, log, extra FROM alerts WHERE id > ? ORDER BY id LIMIT ?",
+                (last, READ_BATCH)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            for row in rows:
+                yield _alert(row)
+
+    @staticmethod
+    def _where(severity=None, type=None, ip=None, start=None, end=None):
+        clauses, params = [], []
+        for column, value in (("severity", severity), ("type", type), ("ip", ip)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start:
+            clauses.append("epoch >= ?")
+            params.append(parse_time(start))
+        if end:
+            clauses.append("epoch <= ?")
+            params.append(parse_time(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, severity=None, type=None, ip=None, start=None, end=None, limit=50):
+        """Return up to `limit` matching alerts, newest first. Times as 'YYYY-MM-DD HH:MM:SS'."""
+        where, params = self._where(severity, type, ip, start, end)
+        rows = self.conn.execute(
+            f"SELECT id, time, severity, type, ip, log, extra FROM alerts{where} ORDER BY id DESC LIMIT ?",
+            params + [limit]).fetchall()
+        return [_alert(row) for row in rows]
+
+    def count(self, severity=None, type=None, ip=None, start=None, end=None):
+        """Number of matching alerts."""
+        where, params = self._where(severity, type, ip, start, end)
+        return self.conn.execute(f"SELECT COUNT(*) FROM alerts{where}", params).fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# =====================================================
+# Backend selection
+# =====================================================
+
+def is_sqlite_path(path):
+    return bool(path) and path.endswith(SQLITE_SUFFIXES)
+
+
+def _resolve(target, backend):
+    """Pick (backend, location): an explicit path wins over the configured backend."""
+    if target:
+        return ("sqlite" if is_sqlite_path(target) else "journal"), target
+    backend = backend or STORAGE_BACKEND
+    if backend == "sqlite":
+        return backend, SQLITE_PATH
+    if backend == "journal":
+        return backend, JOURNAL_DIR
+    raise ValueError(f"unknown storage backend: {backend!r}")
+
+
+def open_writer(target=None, backend=None):
+    """Return a writer with append()/append_many()/close() for a journal directory or SQLite file."""
+    backend, location = _resolve(target, backend)
+    if backend == "sqlite":
+        return SqliteAlertDB(location)
+    journal = AlertJournal(location)
+    if target is None and ARCHIVE_DIR:
+        # The configured journal is compacted into the columnar archive as segments are sealed
+        compactor = ArchiveCompactor(location, ARCHIVE_DIR)
+        journal.on_seal = compactor.notify
+        compactor.notify()  # Catch up on segments sealed while nothing was running
+    return journal
+
+
+def open_reader(target=None, backend=None):
+    """Return a reader with read_new() for AlertStore(source=...)."""
+    backend, location = _resolve(target, backend)
+    if backend == "sqlite":
+        return SqliteAlertDB(location)
+    return JournalReader(location)
+
+
+def iter_stored(target=None):
+    """Yield every alert in a journal directory or SQLite file (default: the configured storage), oldest first."""
+    backend, location = _resolve(target, None)
+    if backend == "sqlite":
+        with SqliteAlertDB(location, max_rows=None, max_age=None) as db:
+            yield from db.iter_alerts()
+    else:
+        yield from iter_alerts(location)
+
+
+def storage_label(target=None, backend=None):
+    """Human-readable location of the configured storage, for log messages."""
+    backend, location = _resolve(target, backend)
+    return f"{location} ({backend})"
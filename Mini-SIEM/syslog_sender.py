@@ -0,0 +1,105 @@
+# =====================================================
+# syslog_sender.py
+# Stand-in syslog source for load testing ingest_server.py.
+# Generates events with log_generator and sends them as RFC 5424
+# syslog lines over UDP, TCP or a Unix socket, as fast as possible
+# or at a target rate.
+# Usage:  python syslog_sender.py --udp 127.0.0.1:5514 --count 100000 [--rate 5000]
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import random
+import socket
+import time
+
+import log_generator
+from ingest_server import parse_address
+
+FACILITY = 4          # security/authorization messages
+SEVERITY_CODES = {"Critical": 2, "High": 3, "Medium": 4, "Info": 6}
+SEND_BATCH = 200      # Lines per TCP/Unix write (UDP sends one datagram per line)
+
+
+def to_syslog(alert):
+    """Format an alert as an RFC 5424 line carrying the Mini-SIEM log message."""
+    pri = FACILITY * 8 + SEVERITY_CODES.get(alert["severity"], 6)
+    stamp = alert["time"].replace(" ", "T")
+    return f"<{pri}>1 {stamp} web01 mini-siem - - - {alert['log']}\n"
+
+
+def generate(count, seed=None, vectorized=False):
+    """Yield `count` alerts from the generator (NumPy bulk mode when `vectorized`)."""
+    if vectorized:
+        yield from log_generator.make_alerts_bulk(count, seed=seed)
+        return
+    random.seed(seed)
+    log_generator.reset_active_hosts()
+    for _ in range(count):
+        yield log_generator.make_alert()
+
+
+def open_socket(udp=None, tcp=None, unix=None):
+    """Return (send(data), close) for the chosen transport."""
+    if udp:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        address = parse_address(udp)
+        return (lambda data: sock.sendto(data, address)), sock.close
+    if tcp:
+        sock = socket.create_connection(parse_address(tcp))
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(unix)
+    # sendall() blocks while the server applies backpressure
+    return sock.sendall, sock.close
+
+
+def send(alerts, udp=None, tcp=None, unix=None, rate=None):
+    """Send the alerts; returns the number of lines sent."""
+    send_data, close = open_socket(udp, tcp, unix)
+    batch = 1 if udp else SEND_BATCH
+    if rate:
+        batch = max(1, min(batch, int(rate // 10)))  # About 10 writes per second when throttled
+    sent = 0
+    pending = []
+    began = time.perf_counter()
+    try:
+        for alert in alerts:
+            pending.append(to_syslog(alert))
+            if len(pending) >= batch:
+                send_data("".join(pending).encode("utf-8"))
+                sent += len(pending)
+                pending = []
+                if rate:
+                    delay = began + sent / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        if pending:
+            send_data("".join(pending).encode("utf-8"))
+            sent += len(pending)
+    finally:
+        close()
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send generated events to the Mini-SIEM ingestion server")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--udp", help="HOST:PORT")
+    target.add_argument("--tcp", help="HOST:PORT")
+    target.add_argument("--unix", help="socket path")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--rate", type=float, help="events per second (default: max)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--vectorized", action="store_true", help="generate with NumPy")
+    args = parser.parse_args(argv)
+
+    began = time.perf_counter()
+    sent = send(generate(args.count, args.seed, args.vectorized),
+                udp=args.udp, tcp=args.tcp, unix=args.unix, rate=args.rate)
+    elapsed = time.perf_counter() - began
+    print(f"[Mini-SIEM] Sent {sent:,} events in {elapsed:.2f} s ({sent / elapsed:,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
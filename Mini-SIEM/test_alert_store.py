@@ -0,0 +1,157 @@
+from alert_journal import AlertJournal
+from alert_store import AlertStore
+
+# -------------------------------
+#  STORE TESTS
+# -------------------------------
+
+def make(i, severity="High", ip="10.0.0.1"):
+    return {"time": f"2025-01-01 00:00:{i:02d}", "severity": severity, "type": "XSS attempt", "ip": ip, "log": str(i)}
+
+
+def test_refresh_only_reads_new_alerts(tmp_path):
+    journal = AlertJournal(str(tmp_path), fsync=False)
+    store = AlertStore(str(tmp_path))
+    journal.append_many([make(0), make(1)])
+    assert store.refresh() == 2
+    assert store.refresh() == 0
+    journal.append(make(2, severity="Critical"))
+    assert store.refresh() == 1
+    assert [a["log"] for a in store.newest()] == ["2", "1", "0"]
+    assert store.severities["High"] == 2
+    assert store.severities["Critical"] == 1
+    assert store.version == 3
+    journal.close()
+
+
+def test_refresh_follows_rotation(tmp_path):
+    journal = AlertJournal(str(tmp_path), segment_max_alerts=2, fsync=False)
+    store = AlertStore(str(tmp_path))
+    journal.append(make(0))
+    store.refresh()
+    journal.append_many([make(i) for i in range(1, 7)])
+    store.refresh()
+    assert [a["log"] for a in store.newest()] == [str(i) for i in range(6, -1, -1)]
+    journal.close()
+
+
+def test_eviction_keeps_counters_in_sync(tmp_path):
+    journal = AlertJournal(str(tmp_path), fsync=False)
+    store = AlertStore(str(tmp_path), max_alerts=2)
+    journal.append_many([make(0, ip="1.1.1.1"), make(1, ip="2.2.2.2"), make(2, ip="2.2.2.2")])
+    store.refresh()
+    assert len(store) == 2
+    assert store.top_ips() == [("2.2.2.2", 2)]
+    assert "1.1.1.1" not in store.ips
+    journal.close()
+
+
+def test_enrich_runs_once_per_alert(tmp_path):
+    journal = AlertJournal(str(tmp_path), fsync=False)
+    seen = []
+    store = AlertStore(str(tmp_path), enrich=lambda a: seen.append(a["log"]))
+    journal.append(make(0))
+    store.refresh()
+    store.refresh()
+    assert seen == ["0"]
+    journal.close()
+
+
+def test_since_returns_only_newer_alerts(tmp_path):
+    journal = AlertJournal(str(tmp_path), fsync=False)
+    store = AlertStore(str(tmp_path))
+    journal.append_many([make(0), make(1)])
+    store.refresh()
+    version = store.version
+    journal.append_many([make(2), make(3), make(4)])
+    store.refresh()
+    alerts, new_version = store.since(version)
+    assert [a["log"] for a in alerts] == ["2", "3", "4"]
+    assert new_version == 5
+    alerts, _ = store.since(version, limit=2)
+    assert [a["log"] for a in alerts] == ["3", "4"]
+    assert store.since(new_version) == ([], 5)
+    assert store.wait_for_change(version, timeout=0) == 5
+    journal.close()
+
+
+def test_query_filters_and_paginates(tmp_path):
+    journal = AlertJournal(str(tmp_path), fsync=False)
+    store = AlertStore(str(tmp_path), max_alerts=8)
+    severities = ["High", "Critical"]
+    journal.append_many([make(i, severity=severities[i % 2], ip=f"10.0.0.{i % 3}") for i in range(12)])
+    store.refresh()  # alerts 0-3 are evicted, ids 5..12 remain
+
+    alerts, cursor = store.query(severity="Critical", limit=2)
+    assert [a["log"] for a in alerts] == ["11", "9"]
+    alerts, cursor = store.query(severity="Critical", limit=2, cursor=cursor)
+    assert [a["log"] for a in alerts] == ["7", "5"]
+    assert cursor is None
+
+    alerts, _ = store.query(severity="Critical", ip="10.0.0.2")
+    assert [a["log"] for a in alerts] == ["11", "5"]
+    alerts, _ = store.query(start="2025-01-01 00:00:06", end="2025-01-01 00:00:08")
+    assert [a["log"] for a in alerts] == ["8", "7", "6"]
+    assert store.query(ip="10.9.9.9") == ([], None)
+    journal.close()
+
+
+def test_count_uses_time_index(tmp_path):
+    store = AlertStore(str(tmp_path))
+    store.ingest([make(i, ip="1.1.1.1" if i % 2 else "2.2.2.2") for i in range(10)])
+    assert store.count(start="2025-01-01 00:00:04") == 6
+    assert store.count(ip="1.1.1.1", start="2025-01-01 00:00:04", end="2025-01-01 00:00:07") == 2
+    assert store.count(ip="1.1.1.1", severity="High") == 5
+    assert store.count(ip="9.9.9.9") == 0
+
+
+def test_top_ips_tracks_increments_and_evictions(tmp_path):
+    store = AlertStore(str(tmp_path), max_alerts=4)
+    ips = ["a", "b", "b", "c", "c", "c"]
+    store.ingest([make(i, ip=ip) for i, ip in enumerate(ips)])
+    # Only the last four remain: b, c, c, c
+    assert store.top_ips(5) == [("c", 3), ("b", 1)]
+    assert "a" not in store.ips
+
+
+def test_parsed_log_fields_are_indexed(tmp_path):
+    store = AlertStore(str(tmp_path))
+    alert = make(0)
+    alert["log"] = "2025-01-01 00:00:00 HOST=app01 EVENT=FILE_CHANGE file=/etc/passwd user=apache ip=10.0.0.1"
+    store.ingest([alert, make(1)])
+    alerts, _ = store.query(user="apache")
+    assert [a["id"] for a in alerts] == [1]
+    assert alerts[0]["host"] == "app01"
+    assert store.count(file="/etc/passwd") == 1
+
+
+def test_sketch_snapshot_outlives_the_store_without_double_counting(tmp_path):
+    journal = AlertJournal(str(tmp_path / "journal"))
+    journal.append_many([make(i, ip="1.1.1.1" if i < 6 else "2.2.2.2") for i in range(8)])
+    path = str(tmp_path / "sketches.json")
+    store = AlertStore(str(tmp_path / "journal"), max_alerts=3, sketch_path=path)
+    store.refresh()
+    assert store.sources()["top"][0] == ["1.1.1.1", 6, 0]  # Includes evicted alerts
+    store.save_sketches()
+
+    # A restarted store re-reads the same journal but keeps the saved counts
+    journal.append_many([make(10, ip="2.2.2.2")])
+    restarted = AlertStore(str(tmp_path / "journal"), sketch_path=path)
+    restarted.refresh()
+    assert restarted.sources()["top"] == [["1.1.1.1", 6, 0], ["2.2.2.2", 3, 0]]
+    assert restarted.sources()["unique"] == 2
+
+
+def test_alerts_in_the_last_sketched_second_are_counted_after_a_restart(tmp_path):
+    journal = AlertJournal(str(tmp_path / "journal"))
+    journal.append_many([make(1), make(2), make(2)])
+    path = str(tmp_path / "sketches.json")
+    store = AlertStore(str(tmp_path / "journal"), sketch_path=path)
+    store.refresh()
+    store.save_sketches()
+
+    # Two more alerts in the second the snapshot ends with
+    journal.append_many([make(2, ip="2.2.2.2"), make(2, ip="2.2.2.2")])
+    restarted = AlertStore(str(tmp_path / "journal"), sketch_path=path)
+    restarted.refresh()
+    assert restarted.sources()["top"] == [["10.0.0.1", 3, 0], ["2.2.2.2", 2, 0]]
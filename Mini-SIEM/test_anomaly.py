@@ -0,0 +1,57 @@
+import random
+
+from anomaly import CountMinSketch, RateAnomalyDetector
+
+# -------------------------------
+#  ANOMALY DETECTION TESTS
+# -------------------------------
+
+def test_count_min_sketch_never_undercounts():
+    sketch = CountMinSketch(width=64, depth=3)  # Small, so collisions are certain
+    rng = random.Random(1)
+    truth = {}
+    for _ in range(5000):
+        key = f"10.0.0.{rng.randint(0, 500)}"
+        truth[key] = truth.get(key, 0) + 1
+        sketch.add(key)
+    assert all(sketch.estimate(key) >= count for key, count in truth.items())
+    sketch.clear()
+    assert sketch.estimate("10.0.0.1") == 0
+
+
+def test_spike_is_flagged_once_per_bucket():
+    detector = RateAnomalyDetector(interval=60, min_count=20, track_count=2, warmup=3)
+    for minute in range(10):                      # Steady ~10 events per minute
+        for i in range(10):
+            assert detector.observe("1.2.3.4", minute * 60 + i) is None
+    ts = 10 * 60
+    hits = [detector.observe("1.2.3.4", ts + i * 0.1) for i in range(200)]
+    flagged = [hit for hit in hits if hit]
+    assert len(flagged) == 1
+    assert flagged[0]["expected"] < 15 <= flagged[0]["limit"] <= flagged[0]["count"]
+    # A new bucket can be flagged again (the baseline has learned from the first spike)
+    assert any(detector.observe("1.2.3.4", ts + 60 + i * 0.01) for i in range(3000))
+
+
+def test_steady_rate_is_not_flagged():
+    detector = RateAnomalyDetector(interval=60, min_count=5, track_count=2)
+    rng = random.Random(2)
+    hits = [detector.observe("web01", minute * 60 + rng.random() * 60)
+            for minute in range(60) for _ in range(rng.randint(90, 110))]
+    assert not any(hits[len(hits) // 10:])  # Allow the first few minutes of warm-up
+
+
+def test_tracked_keys_are_bounded():
+    detector = RateAnomalyDetector(track_count=1, max_keys=50)
+    for i in range(1000):
+        detector.observe(f"10.0.{i // 256}.{i % 256}", i)
+    assert len(detector) == 50
+    assert "10.0.3.231" in detector.state        # Newest kept, oldest dropped
+    assert "10.0.0.0" not in detector.state
+
+
+def test_rare_keys_stay_in_the_sketch():
+    detector = RateAnomalyDetector(track_count=5)
+    for i in range(1000):
+        detector.observe(f"10.0.{i // 256}.{i % 256}", 0)
+    assert len(detector) == 0
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+import archive
+from alert_journal import AlertJournal, list_segments
+from archive import Archive, ArchiveFile, compact, write_archive
+
+# -------------------------------
+#  ARCHIVE TESTS
+# -------------------------------
+
+def make(i):
+    minute, second = divmod(i, 60)
+    alert = {"time": f"2025-01-{1 + minute // 1440:02d} {minute // 60 % 24:02d}:{minute % 60:02d}:{second:02d}",
+             "severity": ("High", "Critical", "Medium")[i % 3], "type": ("XSS attempt", "Port scan")[i % 2],
+             "ip": f"10.0.{i % 7}.{i % 50}", "log": f"line {i} HOST=web{i % 4} åäø"}
+    if i % 10 == 0:
+        alert["intel"] = "tor-exit"
+    return alert
+
+
+def test_round_trip_keeps_every_alert(tmp_path):
+    alerts = [make(i) for i in range(5000)]
+    alerts[3]["ip"] = "2001:db8::1"               # Not IPv4: dictionary-coded instead
+    del alerts[4]["log"]
+    alerts[5]["time"] = "2025-01-01T00:00:05"     # Stored as written
+    alerts[6]["extra"] = {"score": 9}
+    path = str(tmp_path / "a.col")
+    header = write_archive(path, alerts, 1, 5)
+    archive_file = ArchiveFile(path)
+    assert (header["rows"], archive_file.first_seq, archive_file.last_seq) == (5000, 1, 5)
+    assert archive_file.alerts(range(5000)) == alerts
+    assert archive_file.dicts["host"] == ["web0", "web1", "web2", "web3"]
+
+
+def test_search_filters_pages_and_skips_files(tmp_path):
+    directory = str(tmp_path)
+    for n in range(3):   # Three files, two days apart
+        alerts = [make(i + n * 2 * 1440 * 60) for i in range(0, 3000)]
+        write_archive(os.path.join(directory, archive.archive_name(n * 10 + 1, n * 10 + 10)), alerts,
+                      n * 10 + 1, n * 10 + 10)
+    rare = [make(i) for i in range(10)]
+    for alert in rare:
+        alert["ip"] = "203.0.113.9"
+    write_archive(os.path.join(directory, archive.archive_name(31, 31)), rare, 31, 31)
+    store = Archive(directory)
+    assert len(store.files) == 4
+
+    alerts, cursor, stats = store.search(ip="203.0.113.9", limit=5)
+    assert len(alerts) == 5 and cursor
+    rest, cursor, stats = store.search(ip="203.0.113.9", cursor=cursor, limit=5)
+    assert cursor is None
+    assert alerts + rest == list(reversed(rare))
+    assert stats["skipped_bloom"] == 3 and stats["scanned"] == 1   # The other files cannot hold the IP
+
+    alerts, _, stats = store.search(ip="10.0.3.3", start="2025-01-03", end="2025-01-03", limit=1000)
+    expected = [a for a in (make(i + 2 * 1440 * 60) for i in range(3000)) if a["ip"] == "10.0.3.3"]
+    assert alerts == list(reversed(expected))
+    assert stats["skipped_time"] == 3   # Only the file from January 3rd is read
+
+    alerts, _, _ = store.search(severity="Critical", host="web2", type="XSS attempt", limit=1000)
+    assert alerts and all(a["severity"] == "Critical" and "HOST=web2" in a["log"] for a in alerts)
+    assert store.search(severity="Unknown")[0] == []
+    with pytest.raises(ValueError):
+        store.search(start="yesterday")
+
+
+def test_compaction_follows_the_journal_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "SEGMENTS_PER_FILE", 3)
+    journal_dir, archive_dir = str(tmp_path / "journal"), str(tmp_path / "archive")
+    with AlertJournal(journal_dir, segment_max_alerts=10, fsync=False,
+                      on_seal=lambda seq, path: compact(journal_dir, archive_dir)) as journal:
+        journal.append_many([make(i) for i in range(75)])   # 7 sealed segments + 5 alerts
+    assert sorted(os.listdir(archive_dir)) == [archive.archive_name(1, 3), archive.archive_name(4, 6)]
+    assert compact(journal_dir, archive_dir) == []           # Segment 7 waits for a full group
+    compact(journal_dir, archive_dir, force=True)
+    store = Archive(archive_dir)
+    assert store.stats()["rows"] == 70
+    sealed = [seq for seq, _, is_sealed in list_segments(journal_dir) if is_sealed]
+    assert store.files[-1].last_seq == sealed[-1]
+    alerts, _, _ = store.search(limit=100)
+    assert alerts == [make(i) for i in reversed(range(70))]
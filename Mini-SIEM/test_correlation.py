@@ -0,0 +1,64 @@
+from correlation import CorrelationEngine, RateRule, SequenceRule, ThresholdRule
+
+# -------------------------------
+#  CORRELATION TESTS
+# -------------------------------
+
+def event(second, event_type, ip="45.77.0.12", log=""):
+    return {"time": f"2025-01-01 00:{second // 60:02d}:{second % 60:02d}", "severity": "Medium",
+            "type": event_type, "ip": ip, "log": log}
+
+
+def test_brute_force_fires_once_per_burst():
+    engine = CorrelationEngine([ThresholdRule("bf", "Failed login", count=3, window=10,
+                                              output_type="Brute force attempt")])
+    derived = list(engine.process_many(event(s, "Failed login") for s in (0, 2, 4, 5)))
+    assert len(derived) == 1
+    assert derived[0]["type"] == "Brute force attempt"
+    assert derived[0]["ip"] == "45.77.0.12"
+
+
+def test_brute_force_ignores_slow_attempts():
+    engine = CorrelationEngine([ThresholdRule("bf", "Failed login", count=3, window=10,
+                                              output_type="Brute force attempt")])
+    assert list(engine.process_many(event(s, "Failed login") for s in (0, 20, 40, 60))) == []
+
+
+def test_brute_force_by_user():
+    engine = CorrelationEngine([ThresholdRule("bf", "Failed login", count=2, window=10, key="user",
+                                              output_type="Brute force attempt")])
+    alerts = [event(0, "Failed login", ip="1.1.1.1", log="EVENT=LOGIN user=admin ip=1.1.1.1"),
+              event(1, "Failed login", ip="2.2.2.2", log="EVENT=LOGIN user=admin ip=2.2.2.2")]
+    assert len(list(engine.process_many(alerts))) == 1
+
+
+def test_sequence_rule_requires_order_and_window():
+    rule = SequenceRule("scan", first=["Port scan detected"], then=["XSS attempt"], window=60,
+                        output_type="Multi-stage attack")
+    engine = CorrelationEngine([rule])
+    assert engine.process(event(0, "XSS attempt")) == []          # exploit before scan
+    assert engine.process(event(1, "Port scan detected")) == []
+    assert engine.process(event(120, "XSS attempt")) == []        # too late
+    engine.process(event(200, "Port scan detected"))
+    assert engine.process(event(230, "XSS attempt", ip="9.9.9.9")) == []  # other IP
+    assert len(engine.process(event(230, "XSS attempt"))) == 1
+
+
+def test_state_is_bounded():
+    rule = ThresholdRule("bf", "Failed login", count=5, window=10, output_type="x", max_keys=100)
+    engine = CorrelationEngine([rule])
+    for i in range(1000):
+        engine.process(event(0, "Failed login", ip=f"10.0.{i // 256}.{i % 256}"))
+    assert len(rule.state) == 100
+
+
+def test_rate_rule_flags_a_flood():
+    engine = CorrelationEngine([RateRule("rate", output_type="High request rate", key="ip",
+                                         interval=60, min_count=30, track_count=2)])
+    steady = [event(minute * 60 + i, "Info") for minute in range(5) for i in range(5)]
+    assert list(engine.process_many(steady)) == []
+    flood = [event(300 + i // 10, "Failed login") for i in range(100)]
+    derived = list(engine.process_many(flood))
+    assert len(derived) == 1
+    assert derived[0]["type"] == "High request rate"
+    assert derived[0]["rule"] == "rate"
@@ -0,0 +1,62 @@
+import csv
+import gzip
+import io
+import itertools
+import json
+
+import pytest
+
+import export
+from alert_journal import AlertJournal
+from export import export_chunks, select
+
+# -------------------------------
+#  EXPORT TESTS
+# -------------------------------
+
+def make(i):
+    alert = {"time": f"2025-01-01 00:{i // 60:02d}:{i % 60:02d}", "severity": ("High", "Critical")[i % 2],
+             "type": "XSS attempt", "ip": f"10.0.0.{i % 5}", "log": f'line {i} HOST=web{i % 2} "quoted", åäø'}
+    if i % 3 == 0:
+        alert["intel"] = "tor-exit"
+    return alert
+
+
+def test_ndjson_and_csv_round_trip_with_gzip():
+    alerts = [make(i) for i in range(500)]
+    data = b"".join(export_chunks(alerts, "ndjson", compress=True))
+    assert [json.loads(line) for line in gzip.decompress(data).splitlines()] == alerts
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(export_chunks(alerts, "csv")).decode("utf-8"))))
+    assert len(rows) == 500
+    assert rows[3]["log"] == alerts[3]["log"] and json.loads(rows[3]["extra"]) == {"intel": "tor-exit"}
+    assert rows[1]["extra"] == ""
+
+
+def test_chunks_stream_without_reading_everything(monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_BYTES", 1000)
+    endless = (make(i) for i in itertools.count())
+    for fmt in ("ndjson", "csv"):
+        chunks = export_chunks(endless, fmt, compress=fmt == "csv")
+        assert len(next(chunks)) < 5000   # The first chunk arrives after a few alerts
+
+
+def test_parquet_row_groups(monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(export, "ROW_GROUP", 100)
+    alerts = [make(i) for i in range(250)]
+    chunks = list(export_chunks(alerts, "parquet", compress=True))
+    table = pq.read_table(io.BytesIO(b"".join(chunks)))
+    assert table.num_rows == 250 and pq.ParquetFile(io.BytesIO(b"".join(chunks))).num_row_groups == 3
+    assert table.column("severity").to_pylist() == [a["severity"] for a in alerts]
+
+
+def test_select_filters_the_journal(tmp_path):
+    with AlertJournal(str(tmp_path), fsync=False) as journal:
+        journal.append_many([make(i) for i in range(120)])
+    picked = list(select("store", str(tmp_path), severity="Critical", host="web1", start="2025-01-01 00:01:00"))
+    assert picked == [make(i) for i in range(61, 120, 2)]
+    with pytest.raises(ValueError):
+        select("store", str(tmp_path), end="tomorrow")
+    with pytest.raises(ValueError):
+        export_chunks([], "xlsx")
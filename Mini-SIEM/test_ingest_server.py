@@ -0,0 +1,132 @@
+import asyncio
+
+from ingest_server import IngestServer, line_to_alert, parse_syslog
+from syslog_sender import generate, send, to_syslog
+
+# -------------------------------
+#  INGESTION TESTS
+# -------------------------------
+
+class ListWriter:
+    def __init__(self):
+        self.alerts = []
+
+    def append_many(self, alerts):
+        self.alerts.extend(alerts)
+
+
+def test_parse_syslog_formats():
+    assert parse_syslog("<134>1 2025-11-01T00:00:00Z web01 app - - - hello") == (134, "web01", "hello")
+    assert parse_syslog("<38>Nov  1 10:00:00 srv sshd[12]: hi") == (38, "srv", "sshd[12]: hi")
+    assert parse_syslog("plain line") == (None, None, "plain line")
+
+
+def test_line_to_alert_matches_generator_shape():
+    alert = {"time": "2025-11-01 00:00:00", "severity": "Medium", "type": "Failed login", "ip": "10.0.0.5",
+             "log": "2025-11-01 00:00:00 HOST=web01 EVENT=LOGIN user=root ip=10.0.0.5 status=failed"}
+    assert line_to_alert(to_syslog(alert)) == alert
+
+    sshd = line_to_alert("<38>Nov  1 10:00:00 srv sshd[1]: Failed password for root from 203.0.113.9", peer="1.1.1.1")
+    assert (sshd["type"], sshd["severity"], sshd["ip"]) == ("Failed login", "Medium", "203.0.113.9")
+
+    unknown = line_to_alert("<11>disk on fire", peer="1.1.1.1")
+    assert (unknown["type"], unknown["severity"], unknown["ip"]) == ("Syslog message", "High", "1.1.1.1")
+    assert line_to_alert("   ") is None
+
+
+def test_every_generated_event_type_is_classified():
+    for alert in generate(500, seed=3):
+        assert line_to_alert(to_syslog(alert))["type"] == alert["type"]
+
+
+def test_only_injected_http_requests_are_sql_injection():
+    def classify(url):
+        alert = line_to_alert(f"<134>2025-11-01 00:00:00 HOST=web01 EVENT=HTTP_REQUEST url='{url}' ip=10.0.0.7")
+        return alert["type"], alert["severity"]
+
+    assert classify("/product.php?id=1 OR 1=1") == ("SQL Injection attempt", "High")
+    assert classify("/search?q=1 UNION SELECT password FROM users") == ("SQL Injection attempt", "High")
+    assert classify("/product.php?id=1") == ("HTTP request", "Info")
+    assert classify("/docs/or-1-more") == ("HTTP request", "Info")
+
+
+def test_udp_and_tcp_ingest_end_to_end():
+    async def run():
+        writer = ListWriter()
+        server = IngestServer(writer, batch_size=50, flush_interval=0.05)
+        await server.start(udp=("127.0.0.1", 0), tcp=("127.0.0.1", 0))
+        (_, udp_port), (_, tcp_port) = server.addresses()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: send(generate(100, seed=1), tcp=f"127.0.0.1:{tcp_port}"))
+        await loop.run_in_executor(None, lambda: send(generate(20, seed=2), udp=f"127.0.0.1:{udp_port}"))
+        await asyncio.sleep(0.2)
+        await server.close()
+        return writer, server
+
+    writer, server = asyncio.run(run())
+    stats = server.stats()
+    assert stats["by_source"]["tcp"] == 100
+    assert stats["written"] == len(writer.alerts) == stats["received"] - sum(stats["dropped"].values())
+    assert stats["batches"] >= 2
+
+
+def test_udp_drops_are_counted_when_queue_is_full():
+    async def run():
+        server = IngestServer(ListWriter(), queue_size=5)
+        # No writer task: the queue fills up after five lines
+        for i in range(8):
+            server.offer(f"line {i}", "127.0.0.1", "udp")
+        return server
+
+    server = asyncio.run(run())
+    assert server.queue.qsize() == 5
+    assert server.dropped["queue_full"] == 3
+
+
+class FailingOnceWriter(ListWriter):
+    def __init__(self):
+        super().__init__()
+        self.failed = False
+
+    def append_many(self, alerts):
+        if not self.failed:
+            self.failed = True
+            raise OSError("No space left on device")
+        super().append_many(alerts)
+
+
+def test_write_error_is_counted_and_writer_keeps_going(capsys):
+    async def run():
+        writer = FailingOnceWriter()
+        server = IngestServer(writer, queue_size=10, batch_size=5, flush_interval=0.01)
+        await server.start(tcp=("127.0.0.1", 0))
+        (_, port), = server.addresses()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: send(generate(100, seed=6), tcp=f"127.0.0.1:{port}"))
+        while sum(server.received.values()) < 100:     # Every line read before closing
+            await asyncio.sleep(0.01)
+        await asyncio.wait_for(server.close(), timeout=5)
+        return writer, server
+
+    writer, server = asyncio.run(run())
+    lost = server.dropped["write_error"]
+    assert 0 < lost <= 5
+    assert len(writer.alerts) == 100 - lost
+    assert "No space left on device" in capsys.readouterr().err
+
+
+def test_tcp_backpressure_does_not_drop():
+    async def run():
+        writer = ListWriter()
+        server = IngestServer(writer, queue_size=10, batch_size=5, flush_interval=0.01)
+        await server.start(tcp=("127.0.0.1", 0))
+        (_, port), = server.addresses()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: send(generate(300, seed=4), tcp=f"127.0.0.1:{port}"))
+        await asyncio.sleep(0.2)
+        await server.close()
+        return writer, server
+
+    writer, server = asyncio.run(run())
+    assert len(writer.alerts) == 300
+    assert not server.dropped
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+import log_generator
+from alert_journal import iter_alerts
+
+# -------------------------------
+#  BATCH / REPLAY TESTS
+# -------------------------------
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_batch_is_deterministic_with_seed(tmp_path):
+    a, b = str(tmp_path / "a.ndjson"), str(tmp_path / "b.ndjson")
+    for path in (a, b):
+        log_generator.run_batch(250, seed=3, start="2025-11-01 00:00:00", output=path,
+                                batch_size=100, correlate=False)
+    assert len(read_lines(a)) == 250
+    assert read_lines(a) == read_lines(b)
+
+
+def test_batch_uses_given_start_time(tmp_path):
+    path = str(tmp_path / "a.ndjson")
+    log_generator.run_batch(30, seed=1, start="2025-11-01 00:00:00", output=path, correlate=False)
+    alerts = list(log_generator.read_recording(path))
+    assert len(alerts) == 30
+    assert alerts[0]["time"] == "2025-11-01 00:00:00"
+    assert alerts[0]["log"].startswith("2025-11-01 00:00:00 ")
+
+
+def test_replay_max_speed_into_journal(tmp_path):
+    recording = str(tmp_path / "rec.ndjson")
+    log_generator.run_batch(120, seed=5, start="2025-11-01 00:00:00", output=recording, correlate=False)
+    journal_dir = str(tmp_path / "journal")
+    assert log_generator.run_replay(recording, speed=None, output=journal_dir, batch_size=50) == 120
+    assert list(iter_alerts(journal_dir)) == list(log_generator.read_recording(recording))
+
+
+def test_replay_skips_timing_for_malformed_times(tmp_path, monkeypatch):
+    recording = tmp_path / "rec.ndjson"
+    alerts = [{"time": "not a time", "log": "a"},
+              {"time": "2025-11-01 00:00:00", "log": "b"},
+              {"time": "2025-11-01 00:00:02", "log": "c"}]
+    recording.write_text("".join(json.dumps(a) + "\n" for a in alerts), encoding="utf-8")
+    sleeps = []
+    monkeypatch.setattr(log_generator.time, "sleep", sleeps.append)
+    output = str(tmp_path / "out.ndjson")
+    assert log_generator.run_replay(str(recording), speed=10.0, output=output) == 3
+    assert [json.loads(line)["log"] for line in read_lines(output)] == ["a", "b", "c"]
+    # Paced from the first valid time: 2 s at 10x, not from epoch 0
+    assert sleeps and max(sleeps) <= 0.2
+
+
+def test_parse_speed():
+    assert log_generator.parse_speed("1x") == 1.0
+    assert log_generator.parse_speed("10") == 10.0
+    assert log_generator.parse_speed("max") is None
+
+
+def test_bulk_generation_matches_scalar_distributions():
+    pytest.importorskip("numpy")
+    alerts = log_generator.make_alerts_bulk(20_000, seed=1, start_epoch=0, spacing=0.01)
+    assert len(alerts) == 20_000
+    assert set(a["type"] for a in alerts) == set(log_generator.EVENTS)
+    assert all(a["severity"] == log_generator.EVENTS[a["type"]] for a in alerts)
+    internal = sum(a["ip"].startswith(("10.", "192.168.", "172.")) for a in alerts) / len(alerts)
+    assert 0.42 < internal < 0.48
+    assert all(a["log"].startswith(a["time"]) for a in alerts)
+    assert log_generator.make_alerts_bulk(100, seed=7, start_epoch=0) == \
+        log_generator.make_alerts_bulk(100, seed=7, start_epoch=0)
+
+
+def test_bulk_reuse_picks_recent_active_hosts():
+    np = pytest.importorskip("numpy")
+    assert len(set(log_generator.bulk_ips(np.random.default_rng(1), 1000, reuse_prob=1.0))) == 1
+
+    # A reused address is one of the last MAX_ACTIVE_HOSTS new addresses; other repeats are fresh collisions
+    ips = log_generator.bulk_ips(np.random.default_rng(1), 20_000, internal_prob=1.0, reuse_prob=0.5)
+    last_seen, new, near, far = {}, 0, 0, 0
+    for ip in ips:
+        if ip not in last_seen:
+            new += 1
+        elif new - last_seen[ip] < log_generator.MAX_ACTIVE_HOSTS:
+            near += 1
+        else:
+            far += 1
+        last_seen[ip] = new
+    assert 0.48 < near / len(ips) < 0.52
+    assert far / len(ips) < 0.01
+
+
+def test_bulk_exfiltration_destinations_come_from_active_hosts():
+    pytest.importorskip("numpy")
+    alerts = log_generator.make_alerts_bulk(20_000, seed=2, start_epoch=0)
+    sources = {a["ip"] for a in alerts}
+    dests = [a["log"].split(" to=")[1].split()[0] for a in alerts if a["type"] == "Exfiltration"]
+    internal = [d for d in dests if d.startswith("10.")]
+    # An independent pool would almost never draw the same 10.x host as a source
+    assert sum(d in sources for d in internal) / len(internal) > 0.3
@@ -0,0 +1,39 @@
+from log_parser import parse_log, parse_stream
+
+# -------------------------------
+#  PARSER TESTS
+# -------------------------------
+
+def test_parse_login_line():
+    fields = parse_log("2025-11-01 10:00:00 HOST=web01 EVENT=LOGIN user=admin ip=10.0.0.5 "
+                       "status=failed reason=invalid_password")
+    assert fields == {"time": "2025-11-01 10:00:00", "host": "web01", "event": "LOGIN", "user": "admin",
+                      "ip": "10.0.0.5", "status": "failed", "reason": "invalid_password"}
+
+
+def test_parse_quoted_values():
+    fields = parse_log("2025-11-01 10:00:00 HOST=web01 EVENT=HTTP_REQUEST "
+                       "url='/product.php?id=1 OR 1=1' ip=45.77.0.12 ua='sqlmap/1.6'")
+    assert fields["url"] == "/product.php?id=1 OR 1=1"
+    assert fields["ua"] == "sqlmap/1.6"
+    assert fields["ip"] == "45.77.0.12"
+    assert "id" not in fields
+
+
+def test_parse_typed_values():
+    fields = parse_log("2025-11-01 10:00:00 HOST=web01 EVENT=EXFILTRATION to=3.5.140.2 bytes=4818985")
+    assert fields["bytes"] == 4818985
+    assert fields["to"] == "3.5.140.2"
+
+
+def test_parse_stream_accepts_raw_and_ndjson():
+    lines = ["HOST=app01 EVENT=FILE_CHANGE file=/etc/passwd user=apache",
+             '{"type": "Sensitive file modified", "ip": "10.0.0.1", '
+             '"log": "2025-11-01 10:00:00 HOST=app01 EVENT=FILE_CHANGE file=/etc/passwd"}',
+             ""]
+    parsed = list(parse_stream(lines))
+    assert len(parsed) == 2
+    assert parsed[0]["file"] == "/etc/passwd"
+    assert "time" not in parsed[0]
+    assert parsed[1]["type"] == "Sensitive file modified"
+    assert parsed[1]["host"] == "app01"
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from metrics import Registry, SamplingProfiler, start_metrics_server
+
+# -------------------------------
+#  METRICS TESTS
+# -------------------------------
+
+def test_histogram_is_cumulative_with_sum_and_count():
+    registry = Registry()
+    hist = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(value, stage="render")
+    text = registry.render()
+    assert '# TYPE stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{stage="render",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="render",le="1.0"} 3' in text
+    assert 'stage_seconds_bucket{stage="render",le="+Inf"} 4' in text
+    assert 'stage_seconds_count{stage="render"} 4' in text
+    assert 'stage_seconds_sum{stage="render"} 6.05' in text
+
+
+def test_counters_gauges_callbacks_and_label_checks():
+    registry = Registry()
+    hits = registry.counter("hits_total", "Hits", ("route",))
+    hits.inc(route="/")
+    hits.inc(2, route='/a"b')
+    registry.gauge("depth", "Queue depth", fn=lambda: 7)
+    registry.counter("dropped_total", "Drops", ("reason",), fn=lambda: {"queue_full": 3})
+    text = registry.render()
+    assert 'hits_total{route="/"} 1' in text
+    assert 'hits_total{route="/a\\"b"} 2' in text
+    assert "depth 7" in text
+    assert 'dropped_total{reason="queue_full"} 3' in text
+    with pytest.raises(ValueError):
+        hits.inc(path="/")
+
+
+def test_profiler_finds_busy_function():
+    def busy_loop(seconds):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy_loop(0.2)
+    profiler.stop()
+    dump = profiler.dump(limit=5)
+    assert not profiler.running
+    assert profiler.samples > 0
+    assert ":busy_loop:" in dump
+
+
+def test_metrics_http_endpoint():
+    async def run():
+        registry = Registry()
+        registry.gauge("queue_depth", "Depth", fn=lambda: 3)
+        server = await start_metrics_server(registry, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        replies = []
+        for path in (b"/metrics", b"/other"):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET " + path + b" HTTP/1.1\r\nHost: x\r\n\r\n")
+            replies.append(await reader.read())
+            writer.close()
+        server.close()
+        await server.wait_closed()
+        return replies
+
+    ok, missing = asyncio.run(run())
+    assert ok.startswith(b"HTTP/1.1 200 OK") and b"queue_depth 3" in ok
+    assert missing.startswith(b"HTTP/1.1 404")
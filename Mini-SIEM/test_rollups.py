@@ -0,0 +1,49 @@
+import pytest
+
+from rollups import Rollups, parse_window
+
+# -------------------------------
+#  ROLLUP TESTS
+# -------------------------------
+
+BASE = 1_700_000_000 - 1_700_000_000 % 86400  # Midnight, so buckets line up
+
+
+def filled(seconds, every=30):
+    rollups = Rollups()
+    for i in range(0, seconds, every):
+        rollups.add(BASE + i, {"severity": "Critical" if i % 60 == 0 else "High", "type": "Port scan detected"})
+    return rollups
+
+
+def test_parse_window():
+    assert parse_window("90s") == 90
+    assert parse_window("15m") == 900
+    assert parse_window("24h") == 86400
+    assert parse_window("7d") == 7 * 86400
+    assert parse_window("120") == 120
+    with pytest.raises(ValueError):
+        parse_window("abc")
+    with pytest.raises(ValueError):
+        parse_window("0h")
+
+
+def test_last_hour_uses_minute_buckets():
+    stats = filled(2 * 3600).series(3600)
+    assert stats["resolution"] == 60
+    assert len(stats["labels"]) == 60
+    assert stats["totals"] == {"Critical": 60, "High": 60}
+
+
+def test_long_windows_stay_within_max_points():
+    rollups = filled(3 * 86400, every=60)
+    for window in ("24h", "7d", "30d", "365d"):
+        stats = rollups.series(parse_window(window), by="type")
+        assert len(stats["labels"]) <= 120
+        assert stats["totals"] == {"Port scan detected": min(3 * 1440, parse_window(window) // 60)}
+
+
+def test_empty_and_unknown_field():
+    assert Rollups().series(3600)["labels"] == []
+    with pytest.raises(ValueError):
+        Rollups().series(3600, by="ip")
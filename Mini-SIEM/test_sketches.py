@@ -0,0 +1,86 @@
+import random
+from collections import Counter
+
+from sketches import HyperLogLog, SourceSketches, SpaceSaving
+
+# -------------------------------
+#  SKETCH TESTS
+# -------------------------------
+
+def skewed_stream(n, keys, seed):
+    rng = random.Random(seed)
+    return [f"10.0.{k // 256}.{k % 256}" for k in (int(rng.paretovariate(1.0)) % keys for _ in range(n))]
+
+
+def test_space_saving_bounds_hold_and_heavy_hitters_are_kept():
+    stream = skewed_stream(50_000, 5000, seed=1)
+    truth = Counter(stream)
+    summary = SpaceSaving(capacity=32)
+    for key in stream:
+        summary.add(key)
+    assert len(summary) < 64
+    for key, count, error in summary.top(32):
+        assert count - error <= truth[key] <= count
+    # Every key above total / capacity must be present
+    heavy = {key for key, count in truth.items() if count > len(stream) / 32}
+    assert heavy <= {key for key, _, _ in summary.top(32)}
+    assert [key for key, _, _ in summary.top(3)] == [key for key, _ in truth.most_common(3)]
+
+
+def test_space_saving_merge_matches_one_pass():
+    a, b = skewed_stream(20_000, 3000, seed=2), skewed_stream(20_000, 3000, seed=3)
+    truth = Counter(a + b)
+    left, right = SpaceSaving(32), SpaceSaving(32)
+    for key in a:
+        left.add(key)
+    for key in b:
+        right.add(key)
+    merged = SpaceSaving.from_dict(left.to_dict()).merge(right)
+    assert merged.total == 40_000
+    for key, count, error in merged.top(10):
+        assert count - error <= truth[key] <= count
+    assert merged.top(1)[0][0] == truth.most_common(1)[0][0]
+
+
+def test_hyperloglog_estimate_and_union():
+    left, right = HyperLogLog(12), HyperLogLog(12)
+    for i in range(30_000):
+        left.add(f"a{i}")
+        right.add(f"b{i}" if i % 2 else f"a{i}")   # Half overlaps with `left`
+    assert abs(left.estimate() - 30_000) / 30_000 < 0.05
+    union = HyperLogLog.from_dict(left.to_dict()).merge(right)
+    assert abs(union.estimate() - 45_000) / 45_000 < 0.05
+    small = HyperLogLog(12)
+    for i in range(100):
+        small.add(str(i))
+    assert abs(small.estimate() - 100) <= 3
+
+
+def test_windows_use_time_buckets():
+    sketches = SourceSketches()
+    t0 = 1_700_000_000 - 1_700_000_000 % 86400
+    for minute in range(3 * 24 * 60):              # Three days, one new IP per minute
+        sketches.add(t0 + minute * 60, f"10.1.{minute // 256}.{minute % 256}")
+        sketches.add(t0 + minute * 60, "6.6.6.6")
+    last_hour = sketches.summary(3600)
+    assert last_hour["resolution"] == 60
+    assert last_hour["top"][0] == ["6.6.6.6", 60, 0]
+    assert 58 <= last_hour["unique"] <= 63
+    day = sketches.summary(86400)
+    assert day["resolution"] == 3600 and day["top"][0][1] == 24 * 60
+    assert abs(sketches.summary()["unique"] - 3 * 24 * 60) / (3 * 24 * 60) < 0.03
+
+
+def test_shards_merge_and_round_trip(tmp_path):
+    t0 = 1_700_000_000
+    shard_a, shard_b = SourceSketches(), SourceSketches()
+    for i in range(600):
+        shard_a.add(t0 + i, "1.1.1.1" if i % 3 else "2.2.2.2")
+        shard_b.add(t0 + i, "1.1.1.1")
+    path = str(tmp_path / "a.json")
+    shard_a.save(path)
+    merged = SourceSketches.load(path).merge(shard_b)
+    summary = merged.summary(3600)
+    assert summary["events"] == 1200
+    assert summary["top"][:2] == [["1.1.1.1", 1000, 0], ["2.2.2.2", 200, 0]]
+    assert summary["unique"] == 2
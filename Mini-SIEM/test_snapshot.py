@@ -0,0 +1,83 @@
+import pytest
+
+from alert_store import AlertStore
+from snapshot import Snapshot, SnapshotStore, write_snapshot
+
+# -------------------------------
+#  SNAPSHOT TESTS
+# -------------------------------
+
+def make(i):
+    alert = {"time": f"2025-01-01 00:{i // 60:02d}:{i % 60:02d}", "severity": ("High", "Critical")[i % 2],
+             "type": "XSS attempt", "ip": f"10.0.0.{i % 5}", "log": f"line {i} åäø"}
+    if i % 3 == 0:
+        alert["intel"] = "tor-exit"
+    if i == 7:
+        alert["extra"] = {"score": 9}   # Not a string: stored JSON-encoded
+    return alert
+
+
+def filled_store(n=100):
+    store = AlertStore(directory=None)
+    store.ingest([make(i) for i in range(n)])
+    return store
+
+
+def test_round_trip_keeps_every_field(tmp_path):
+    store = filled_store()
+    alerts, version = store.since(0)
+    path = str(tmp_path / "snap.bin")
+    write_snapshot(path, alerts, version, {"held": len(store)})
+    snapshot = Snapshot(path)
+    assert (snapshot.version, snapshot.rows, snapshot.first_id) == (100, 100, 1)
+    assert [snapshot.alert(i) for i in range(100)] == alerts
+    kinds = {field: kind for field, kind, *_ in snapshot.fields}
+    assert kinds["severity"] == "dict" and kinds["log"] == "blob"
+
+
+def test_queries_match_the_store(tmp_path):
+    store = filled_store()
+    alerts, version = store.since(0)
+    path = str(tmp_path / "snap.bin")
+    write_snapshot(path, alerts, version, {"held": len(store)})
+    workers = SnapshotStore(path)
+    for filters in ({}, {"severity": "Critical"}, {"ip": "10.0.0.3", "intel": "tor-exit"},
+                    {"start": "2025-01-01 00:00:30", "end": "2025-01-01 00:01:00"}, {"ip": "9.9.9.9"}):
+        assert workers.query(limit=7, **filters) == store.query(limit=7, **filters)
+    page, cursor = workers.query(severity="High", limit=10)
+    assert workers.query(severity="High", cursor=cursor, limit=10) == store.query(severity="High", cursor=cursor,
+                                                                                   limit=10)
+    assert workers.since(95) == store.since(95)
+    assert len(workers) == 100
+
+
+def test_refresh_switches_to_a_newer_snapshot(tmp_path):
+    path = str(tmp_path / "snap.bin")
+    store = filled_store(10)
+    write_snapshot(path, *store.since(0), extra={"windows": [3600], "series": {"3600|severity": {"ok": 1}}})
+    workers = SnapshotStore(path, check_interval=0)
+    old = workers.snapshot
+    store.ingest([make(10), make(11)])
+    write_snapshot(path, *store.since(0))
+    assert workers.refresh() == 2
+    assert workers.version == 12
+    assert old.alert(9)["id"] == 10   # Readers of the old mapping are unaffected
+    assert workers.wait_for_change(12, timeout=0) == 12
+    # The new snapshot has no precomputed series, but it holds every alert
+    assert workers.series(3600) == store.series(3600)
+
+
+def test_other_windows_are_counted_from_the_snapshot(tmp_path):
+    path = str(tmp_path / "snap.bin")
+    store = filled_store(100)                       # One alert per second from 00:00:00
+    write_snapshot(path, *store.since(0, 50), extra={"windows": [3600]})
+    workers = SnapshotStore(path)
+    # The newest 50 alerts cover the current minute, the bucket a 30 s window reads
+    assert workers.series(30, by="type") == store.series(30, by="type")
+    assert workers.sources(30, n=3) == store.sources(30, n=3)
+    with pytest.raises(ValueError, match="precomputed windows: 3600s"):
+        workers.series(600)
+    with pytest.raises(ValueError, match="all history"):
+        workers.sources(None)
+    with pytest.raises(ValueError, match="unknown field"):
+        workers.series(30, by="user")
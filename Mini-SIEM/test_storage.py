@@ -0,0 +1,81 @@
+import storage
+from alert_journal import AlertJournal, JournalReader
+from alert_store import AlertStore
+from storage import SqliteAlertDB, iter_stored, open_reader, open_writer
+
+# -------------------------------
+#  STORAGE TESTS
+# -------------------------------
+
+def make(i, severity="High", ip="10.0.0.1"):
+    return {"time": f"2025-01-01 00:{i // 60:02d}:{i % 60:02d}", "severity": severity,
+            "type": "XSS attempt", "ip": ip, "log": str(i)}
+
+
+def test_sqlite_round_trip_keeps_extra_fields(tmp_path):
+    path = str(tmp_path / "alerts.sqlite3")
+    with SqliteAlertDB(path) as db:
+        db.append_many([make(0), dict(make(1), rule="brute-force-ip")])
+        assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    alerts = list(iter_stored(path))
+    assert [a["log"] for a in alerts] == ["0", "1"]
+    assert alerts[1]["rule"] == "brute-force-ip"
+    assert "rule" not in alerts[0]
+
+
+def test_sqlite_reader_follows_writer(tmp_path):
+    path = str(tmp_path / "alerts.db")
+    writer = open_writer(path)
+    store = AlertStore(source=open_reader(path))
+    writer.append_many([make(0), make(1)])
+    assert store.refresh() == 2
+    assert store.refresh() == 0
+    writer.append(make(2, severity="Critical"))
+    assert store.refresh() == 1
+    assert [a["log"] for a in store.newest()] == ["2", "1", "0"]
+    assert store.severities["Critical"] == 1
+    writer.close()
+
+
+def test_sqlite_reader_catches_up_in_one_refresh(tmp_path):
+    total = storage.READ_BATCH * 2 + 5
+    path = str(tmp_path / "alerts.db")
+    with SqliteAlertDB(path) as db:
+        db.append_many([dict(make(i % 3600), log=str(i)) for i in range(total)])
+    reader = open_reader(path)
+    assert len(reader.read_new(limit=10)) == 10
+    store = AlertStore(source=reader)
+    assert store.refresh() == total - 10    # Everything that is left, not one batch
+    assert store.refresh() == 0
+    assert store.newest(1)[0]["log"] == str(total - 1)
+    reader.close()
+
+
+def test_sqlite_retention_by_size_and_age(tmp_path):
+    with SqliteAlertDB(str(tmp_path / "size.db"), max_rows=3) as db:
+        db.append_many([make(i) for i in range(10)])
+        assert [a["log"] for a in db.iter_alerts()] == ["7", "8", "9"]
+
+    with SqliteAlertDB(str(tmp_path / "age.db"), max_rows=None, max_age=60) as db:
+        db.append_many([make(i) for i in range(0, 200, 10)])
+        # Newest alert is at 190 s; anything before 130 s is gone
+        assert [a["log"] for a in db.iter_alerts()][0] == "130"
+
+
+def test_sqlite_indexed_query_and_count(tmp_path):
+    with SqliteAlertDB(str(tmp_path / "q.db")) as db:
+        db.append_many([make(i, severity="Critical" if i % 3 == 0 else "Low",
+                             ip="10.0.0.2" if i % 2 else "10.0.0.1") for i in range(30)])
+        assert db.count() == 30
+        assert db.count(severity="Critical") == 10
+        page = db.query(severity="Critical", ip="10.0.0.1", limit=2)
+        assert [a["log"] for a in page] == ["24", "18"]
+        assert db.count(start="2025-01-01 00:00:10", end="2025-01-01 00:00:19") == 10
+
+
+def test_open_writer_picks_backend_from_path(tmp_path):
+    writer = open_writer(str(tmp_path / "journal"))
+    assert isinstance(writer, AlertJournal)
+    writer.close()
+    assert isinstance(open_reader(str(tmp_path / "journal")), JournalReader)
+    assert isinstance(open_reader(str(tmp_path / "x.sqlite3")), SqliteAlertDB)
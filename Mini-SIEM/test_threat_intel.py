@@ -0,0 +1,67 @@
+import pytest
+
+from alert_store import AlertStore
+from threat_intel import ThreatIntel, build_index, open_intel, parse_network, read_blocklist
+
+# -------------------------------
+#  THREAT INTEL TESTS
+# -------------------------------
+
+def test_parse_network():
+    assert parse_network("10.0.0.0/8") == (4, 10 << 24, (11 << 24) - 1)
+    assert parse_network("1.2.3.4") == (4, 0x01020304, 0x01020304)
+    assert parse_network("10.1.2.3/8")[1] == 10 << 24  # Host bits are cleared
+    assert parse_network("2001:db8::/32")[0] == 6
+    for bad in ("10.0.0.0/33", "not-an-ip", "1.2.3.4/x"):
+        with pytest.raises(ValueError):
+            parse_network(bad)
+
+
+def test_overlapping_ranges_and_both_families(tmp_path):
+    path = str(tmp_path / "intel.bin")
+    entries = [("10.0.0.0/8", "corp"), ("10.1.0.0/16", "botnet"), ("10.2.0.0/16", "corp"),
+               ("203.0.113.7", "tor"), ("2001:db8::/32", "v6list"), ("bogus", "x")]
+    assert build_index(entries, path) == (4, 1, 1)  # corp, botnet+corp, corp, tor
+    with ThreatIntel(path) as intel:
+        assert intel.lookup("10.0.0.1") == ("corp",)
+        assert intel.lookup("10.1.255.255") == ("botnet", "corp")
+        assert intel.lookup("10.2.0.1") == ("corp",)
+        assert intel.lookup("11.0.0.0") == ()
+        assert intel.lookup("203.0.113.7") == ("tor",)
+        assert intel.lookup("203.0.113.8") == ()
+        assert intel.lookup("2001:db8:ffff::1") == ("v6list",)
+        assert intel.lookup("2001:db9::") == ()
+        assert intel.lookup("garbage") == ()
+        assert intel.lookup(None) == ()
+
+
+def test_matches_brute_force_on_random_ranges(tmp_path):
+    import random
+    rng = random.Random(5)
+    entries = [(f"{rng.randint(1, 20)}.{rng.randint(0, 255)}.0.0/{rng.randint(12, 24)}", f"list{i % 3}")
+               for i in range(300)]
+    path = str(tmp_path / "intel.bin")
+    build_index(entries, path)
+    networks = [(parse_network(net), tag) for net, tag in entries]
+    with ThreatIntel(path) as intel:
+        for _ in range(2000):
+            ip = f"{rng.randint(1, 20)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.1"
+            value = parse_network(ip)[1]
+            expected = tuple(sorted({tag for (_, first, last), tag in networks if first <= value <= last}))
+            assert intel.lookup(ip) == expected
+
+
+def test_blocklist_files_and_alert_tagging(tmp_path):
+    (tmp_path / "tor-exit.txt").write_text("# comment\n198.51.100.0/24\n\n203.0.113.5 botnet\n")
+    path = str(tmp_path / "intel.bin")
+    build_index(read_blocklist(str(tmp_path / "tor-exit.txt")), path)
+    assert open_intel(str(tmp_path / "missing.bin")) is None
+
+    intel = open_intel(path)
+    store = AlertStore(directory=None, enrich=intel.tag)
+    store.ingest([{"time": "2025-01-01 00:00:00", "severity": "High", "type": "XSS attempt", "ip": ip, "log": ""}
+                  for ip in ("198.51.100.9", "10.0.0.1", "203.0.113.5")])
+    page, _ = store.query(intel="tor-exit")
+    assert [a["ip"] for a in page] == ["198.51.100.9"]
+    assert store.count(intel="botnet") == 1
+    intel.close()
@@ -0,0 +1,158 @@
+import json
+import re
+
+import pytest
+
+pytest.importorskip("flask")
+
+import web_dashboard
+from alert_store import AlertStore
+
+# -------------------------------
+#  DASHBOARD CACHING TESTS
+# -------------------------------
+
+def make(i):
+    return {"time": f"2025-01-01 00:00:{i:02d}", "severity": "High", "type": "XSS attempt", "ip": "10.0.0.1", "log": str(i)}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(web_dashboard, "store", AlertStore(directory=None, enrich=web_dashboard.describe))
+    monkeypatch.setattr(web_dashboard, "page_cache", web_dashboard.PageCache())
+    return web_dashboard.app.test_client()
+
+
+def test_unchanged_page_returns_304(client):
+    web_dashboard.store.ingest([make(0), make(1)])
+    first = client.get("/")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Last-Modified"]
+
+    again = client.get("/", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert client.get("/", headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+
+
+def test_new_alert_changes_etag_and_renders_once(client, monkeypatch):
+    web_dashboard.store.ingest([make(0)])
+    etag = client.get("/").headers["ETag"]
+
+    renders = []
+    original = web_dashboard.render_dashboard
+    monkeypatch.setattr(web_dashboard, "render_dashboard", lambda: renders.append(1) or original())
+    assert client.get("/").status_code == 200
+    assert not renders  # Same version: served from the cache
+
+    web_dashboard.store.ingest([make(1)])
+    changed = client.get("/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert b"XSS attempt" in changed.data
+    assert len(renders) == 1
+
+
+def test_stream_resumes_from_last_event_id(client, monkeypatch):
+    monkeypatch.setattr(web_dashboard, "_poller_started", True)   # No journal to poll
+    web_dashboard.store.ingest([make(0), make(1), make(2)])
+    # A reconnecting browser repeats the page's ?since= and adds the id it last received
+    response = client.get("/stream?since=0", headers={"Last-Event-ID": "2"}, buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b"retry:")
+    event = next(chunks).decode()
+    response.close()
+    assert event.startswith("id: 3\nevent: alerts\n")
+    alerts = json.loads(event.split("data: ", 1)[1])["alerts"]
+    assert [a["log"] for a in alerts] == ["2"]
+
+
+def test_metrics_endpoint_reports_stages_and_store(client):
+    web_dashboard.store.ingest([make(0), make(1)])
+    etag = client.get("/").headers["ETag"]
+    client.get("/", headers={"If-None-Match": etag})
+    text = client.get("/metrics").data.decode()
+    assert 'siem_dashboard_stage_seconds_count{stage="render"}' in text
+    assert 'siem_dashboard_responses_total{result="not_modified"}' in text
+    assert "siem_store_alerts 2" in text
+    assert 'siem_http_request_seconds_bucket{route="/",le="+Inf"}' in text
+
+
+def page_responses(client):
+    """Exposed siem_dashboard_responses_total values (a label not seen yet counts as 0)."""
+    text = client.get("/metrics").data.decode()
+    counts = dict(re.findall(r'siem_dashboard_responses_total\{result="(\w+)"\} (\S+)', text))
+    return {result: float(counts.get(result, 0)) for result in ("rendered", "cached", "not_modified")}
+
+
+def test_page_responses_count_each_outcome_once(client):
+    web_dashboard.store.ingest([make(0)])
+    before = page_responses(client)
+    first = client.get("/")                                                                  # rendered
+    client.get("/")                                                                          # cached
+    client.get("/", headers={"If-None-Match": first.headers["ETag"]})                        # not_modified
+    client.get("/", headers={"If-Modified-Since": first.headers["Last-Modified"]})           # not_modified
+    after = page_responses(client)
+    assert {k: after[k] - before[k] for k in after} == {"rendered": 1, "cached": 1, "not_modified": 2}
+
+
+def test_profiler_is_opt_in(client, monkeypatch):
+    assert client.get("/debug/profiler").status_code == 404
+    monkeypatch.setattr(web_dashboard, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(web_dashboard, "profiler", web_dashboard.SamplingProfiler())
+    assert client.post("/debug/profiler?action=start").json == {"running": True}
+    assert client.post("/debug/profiler?action=stop").json == {"running": False}
+    assert client.get("/debug/profiler").data.startswith(b"# ")
+
+
+def test_sources_api_and_top_ips_card(client):
+    web_dashboard.store.ingest([make(0), make(1), dict(make(2), ip="10.0.0.2")])
+    assert client.get("/api/sources?window=1h&n=1").json["top"] == [["10.0.0.1", 2, 0]]
+    assert client.get("/api/sources").json["unique"] == 2
+    assert client.get("/api/sources?window=soon").status_code == 400
+    page = client.get("/").data.decode()
+    assert "~2 unique" in page and "10.0.0.1 (2)" in page
+
+
+def test_worker_mode_serves_from_the_snapshot(client, monkeypatch, tmp_path):
+    from dashboard_server import publish
+    from snapshot import SnapshotStore
+
+    web_dashboard.store.ingest([make(0), make(1)])
+    path = str(tmp_path / "snap.bin")
+    publish(web_dashboard.store, path)
+    monkeypatch.setattr(web_dashboard, "store", SnapshotStore(path))
+    page = client.get("/")
+    assert page.status_code == 200 and b"XSS attempt" in page.data
+    assert client.get("/api/alerts?ip=10.0.0.1").json["count"] == 2
+    assert client.get("/api/stats?window=24h").json["totals"] == {"High": 2}
+    assert client.get("/api/sources?window=1h").json["top"] == [["10.0.0.1", 2, 0]]
+
+
+def test_archive_api_searches_archived_alerts(client, monkeypatch, tmp_path):
+    from archive import Archive, archive_name, write_archive
+
+    write_archive(str(tmp_path / archive_name(1, 2)), [make(i) for i in range(10)], 1, 2)
+    monkeypatch.setattr(web_dashboard, "archive", Archive(str(tmp_path)))
+    result = client.get("/api/archive?ip=10.0.0.1&start=2025-01-01&limit=3").json
+    assert [a["log"] for a in result["alerts"]] == ["9", "8", "7"]
+    assert result["next_cursor"] == "1:7" and result["files"]["scanned"] == 1
+    assert client.get("/api/archive?ip=10.0.0.9").json["files"]["skipped_bloom"] == 1
+    assert client.get("/api/archive?cursor=oops").status_code == 400
+
+
+def test_export_streams_without_content_length(client, monkeypatch, tmp_path):
+    import gzip
+
+    from alert_journal import AlertJournal
+
+    with AlertJournal(str(tmp_path), fsync=False) as journal:
+        journal.append_many([make(i) for i in range(20)])
+    monkeypatch.setattr("storage.JOURNAL_DIR", str(tmp_path))
+    response = client.get("/api/export?format=ndjson&gzip=1&start=2025-01-01 00:00:10")
+    assert response.status_code == 200 and response.is_streamed
+    assert "Content-Length" not in response.headers
+    assert 'filename="alerts.ndjson.gz"' in response.headers["Content-Disposition"]
+    assert len(gzip.decompress(response.data).splitlines()) == 10
+    assert client.get("/api/export?format=xlsx").status_code == 400
@@ -0,0 +1,287 @@
+# =====================================================
+# threat_intel.py
+# IP reputation lookups for Mini-SIEM.
+# Blocklists (one IP or CIDR range per line, IPv4 or IPv6) are compiled
+# offline into a binary index of sorted, non-overlapping address intervals.
+# The index is memory-mapped, so opening it is instant however large it is,
+# and a lookup is one binary search over the mapped arrays.
+# Usage:  python threat_intel.py build blocklists/*.txt [-o threat_intel.bin]
+#         python threat_intel.py lookup 185.199.108.7
+# Developed by Jørgen A. Fjellstad - 2025
+# =====================================================
+
+import argparse
+import json
+import mmap
+import os
+import socket
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+# -----------------------------
+# Basic settings
+# -----------------------------
+INTEL_FILE = os.environ.get("MINI_SIEM_INTEL", "threat_intel.bin")  # Prebuilt index
+
+MAGIC = b"MSIEMTI1"
+_HEADER = struct.Struct("<8sI")   # magic, length of the JSON header that follows
+_ALIGN = 8
+
+# =====================================================
+# Parsing blocklists
+# =====================================================
+
+def parse_network(text):
+    """
+    '10.0.0.0/8', '2001:db8::/32' or a single address -> (family, first, last)
+    with family 4 or 6 and addresses as integers. Raises ValueError.
+    """
+    address, _, length = text.partition("/")
+    try:
+        if ":" in address:
+            family, bits = 6, 128
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+        else:
+            family, bits = 4, 32
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+        prefix = int(length) if length else bits
+    except (OSError, ValueError):
+        raise ValueError(f"invalid network: {text!r}") from None
+    if not 0 <= prefix <= bits:
+        raise ValueError(f"invalid network: {text!r}")
+    host_bits = (1 << (bits - prefix)) - 1
+    first = value & ~host_bits
+    return family, first, first | host_bits
+
+
+def read_blocklist(path, tag=None):
+    """
+    Yield (network, tag) from a blocklist file. The tag is the second column
+    when present, otherwise `tag` or the file name without extension.
+    '#' starts a comment; blank lines are ignored.
+    """
+    default = tag or os.path.splitext(os.path.basename(path))[0]
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split("#", 1)[0].replace(",", " ").split()
+            if parts:
+                yield parts[0], parts[1] if len(parts) > 1 else default
+
+# =====================================================
+# Building the index
+# =====================================================
+
+def _intervals(ranges):
+    """
+    Sweep overlapping (first, last, tag) ranges into sorted, disjoint
+    (first, last, tags) intervals; neighbours with equal tags are merged.
+    """
+    events = []
+    for first, last, tag in ranges:
+        events.append((first, 1, tag))
+        events.append((last + 1, -1, tag))
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    active = {}        # tag -> number of open ranges carrying it
+    out = []
+    position = None
+    for point, delta, tag in events:
+        if active and position is not None and point > position:
+            tags = tuple(sorted(active))
+            if out and out[-1][2] == tags and out[-1][1] + 1 == position:
+                out[-1][1] = point - 1
+            else:
+                out.append([position, point - 1, tags])
+        position = point
+        count = active.get(tag, 0) + delta
+        if count:
+            active[tag] = count
+        else:
+            del active[tag]
+    return out
+
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % _ALIGN))
+
+
+def build_index(entries, path=INTEL_FILE):
+    """
+    Compile (network, tag) pairs into a binary index at `path`.
+    Invalid networks are skipped. Returns (ipv4 intervals, ipv6 intervals, skipped).
+    """
+    ranges = {4: [], 6: []}
+    skipped = 0
+    for network, tag in entries:
+        try:
+            family, first, last = parse_network(network)
+        except ValueError:
+            skipped += 1
+            continue
+        ranges[family].append((first, last, tag))
+
+    tagsets = {}  # tuple of tags -> id
+    columns = {}
+    for family, width in ((4, 4), (6, 16)):
+        intervals = _intervals(ranges[family])
+        ids = array("I", (tagsets.setdefault(tags, len(tagsets)) for _, _, tags in intervals))
+        if family == 4:
+            starts = array("I", (first for first, _, _ in intervals)).tobytes()
+            ends = array("I", (last for _, last, _ in intervals)).tobytes()
+        else:
+            # Big-endian bytes compare in the same order as the numbers they encode
+            starts = b"".join(first.to_bytes(width, "big") for first, _, _ in intervals)
+            ends = b"".join(last.to_bytes(width, "big") for _, last, _ in intervals)
+        columns[family] = (len(intervals), starts, ends, ids.tobytes())
+
+    header = {"byteorder": sys.byteorder, "tagsets": [list(tags) for tags in tagsets],
+              "count": {"4": columns[4][0], "6": columns[6][0]}}
+    header_bytes = json.dumps(header).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        for family in (4, 6):
+            for block in columns[family][1:]:
+                _pad(f)
+                f.write(block)
+    os.replace(tmp, path)  # Readers never map a half-written index
+    return columns[4][0], columns[6][0], skipped
+
+# =====================================================
+# Lookups
+# =====================================================
+
+class _Keys16:
+    """Read-only sequence of 16-byte keys in a buffer, for bisect."""
+    __slots__ = ("view", "n")
+
+    def __init__(self, view, n):
+        self.view = view
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return self.view[i * 16:i * 16 + 16].tobytes()
+
+
+class ThreatIntel:
+    """
+    Memory-mapped reputation index built by build_index().
+    lookup() returns the tags of the lists an address is on (empty if none);
+    tag() stores them on an alert as `intel`, e.g. "tor-exit,botnet".
+    """
+
+    def __init__(self, path=INTEL_FILE):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a threat intel index")
+        offset = _HEADER.size
+        header = json.loads(self._map[offset:offset + length])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path}: built on a {header['byteorder']}-endian machine; rebuild it here")
+        self.tagsets = [tuple(tags) for tags in header["tagsets"]]
+        offset += length
+
+        view = memoryview(self._map)
+        self._views = [view]
+
+        def take(size, fmt=None):
+            nonlocal offset
+            offset += -offset % _ALIGN
+            block = view[offset:offset + size]
+            offset += size
+            self._views.append(block)
+            if fmt:
+                block = block.cast(fmt)
+                self._views.append(block)  # Released before the view it was cast from
+            return block
+
+        n4, n6 = header["count"]["4"], header["count"]["6"]
+        self._v4 = (take(4 * n4, "I"), take(4 * n4, "I"), take(4 * n4, "I"))
+        self._v6 = (_Keys16(take(16 * n6), n6), _Keys16(take(16 * n6), n6), take(4 * n6, "I"))
+        self.sizes = (n4, n6)
+
+    def lookup(self, ip):
+        """Return the tags for `ip` (IPv4 or IPv6 text) as a tuple; () if it is not listed."""
+        if not ip:
+            return ()
+        try:
+            if ":" in ip:
+                key = socket.inet_pton(socket.AF_INET6, ip)
+                starts, ends, ids = self._v6
+            else:
+                key = int.from_bytes(socket.inet_aton(ip), "big")
+                starts, ends, ids = self._v4
+        except OSError:
+            return ()
+        i = bisect_right(starts, key) - 1
+        if i >= 0 and key <= ends[i]:
+            return self.tagsets[ids[i]]
+        return ()
+
+    def tag(self, alert):
+        """Add an `intel` field to a listed alert. Returns the tags found."""
+        tags = self.lookup(alert.get("ip"))
+        if tags:
+            alert["intel"] = ",".join(tags)
+        return tags
+
+    def __len__(self):
+        return sum(self.sizes)
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_intel(path=INTEL_FILE):
+    """Return a ThreatIntel for `path`, or None when no index has been built."""
+    if not path or not os.path.exists(path):
+        return None
+    return ThreatIntel(path)
+
+# =====================================================
+# Command line
+# =====================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mini-SIEM threat intel index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="compile blocklists (IP/CIDR per line) into an index")
+    p.add_argument("blocklists", nargs="+")
+    p.add_argument("-o", "--output", default=INTEL_FILE)
+
+    p = sub.add_parser("lookup", help="look up addresses in an index")
+    p.add_argument("ips", nargs="+")
+    p.add_argument("-i", "--index", default=INTEL_FILE)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        entries = (entry for path in args.blocklists for entry in read_blocklist(path))
+        n4, n6, skipped = build_index(entries, args.output)
+        print(f"[Mini-SIEM] {args.output}: {n4:,} IPv4 and {n6:,} IPv6 intervals ({skipped:,} invalid lines skipped)")
+    else:
+        with ThreatIntel(args.index) as intel:
+            for ip in args.ips:
+                print(f"{ip}: {', '.join(intel.lookup(ip)) or 'not listed'}")
+
+
+if __name__ == "__main__":
+    main()
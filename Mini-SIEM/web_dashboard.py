@@ -5,9 +5,18 @@
 # Developed by Jørgen A. Fjellstad - 2025
 # =====================================================
 
-from flask import Flask, render_template_string
-import json, os, time
-from collections import Counter
+from flask import Flask, Response, g, jsonify, request
+import atexit, calendar, json, os, threading, time
+
+from alert_store import AlertStore
+from archive import ARCHIVE_DIR, Archive
+from export import FORMATS, export_chunks, file_name, select
+from log_generator import EVENTS
+from metrics import CONTENT_TYPE, Registry, SamplingProfiler
+from rollups import parse_window
+from sketches import SKETCH_FILE
+from storage import open_reader
+from threat_intel import open_intel
 
 app = Flask(__name__)
 
@@ -19,6 +28,10 @@ EXPLANATIONS = {
     "Successful login": "A login succeeded after suspicious attempts - verify legitimacy.",
     "Known malicious IP": "Connection with a known threat source was detected.",
     "Brute force attempt": "Multiple login failures from one IP - possible brute-force attack.",
+    "Successful login after suspicious attempts": "A login succeeded shortly after repeated failures from the same IP - verify legitimacy.",
+    "Multi-stage attack": "A port scan was followed by an exploit attempt from the same source.",
+    "High request rate": "One source sent far more events than it usually does - possible flood, scan or automated attack.",
+    "Lateral movement followed by exfiltration": "A host moved inside the network and then sent data out - possible data theft.",
     "Sensitive file modified": "A critical system file was changed - verify it was authorized.",
     "File deletion detected": "A file was deleted from the system - ensure it was intentional.",
     "SQL Injection attempt": "Attempt to manipulate database through input fields.",
@@ -36,7 +49,6 @@ TEMPLATE = """
 <html lang="en">
 <head>
 <meta charset="UTF-8">
-<meta http-equiv="refresh" content="10"> <!-- Auto refresh every 10 seconds -->
 <title>Mini-SIEM Threat Dashboard</title>
 <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
 
@@ -118,6 +130,7 @@ td:nth-child(2).Critical { color: #ff5252; font-weight: bold; }
 td:nth-child(2).High { color: #ffb74d; font-weight: bold; }
 td:nth-child(2).Medium { color: #4db6ac; font-weight: bold; }
 td:nth-child(2).Info { color: #aaa; }
+.intel { color: #ff5252; font-size: 0.85em; }
 
 /* Buttons and footer */
 .toggle { text-align:center; padding:10px; background:#1b1b1b; }
@@ -159,7 +172,7 @@ function toggleCharts() {
 
   <!-- Top status bar showing update time and total alerts -->
   <div class="update-line">
-    <span class="blink">●</span> Last update: {{ stats.last_update }} | Total alerts loaded: {{ stats.total }}
+    <span class="blink">●</span> Last update: <span id="lastUpdate">{{ stats.last_update }}</span> | Total alerts loaded: <span id="totalLine">{{ stats.total }}</span>
   </div>
 
   {% if stats %}
@@ -167,19 +180,19 @@ function toggleCharts() {
   <div class="stats">
     <!-- Clickable cards that filter table rows -->
     <div class="card Info" onclick="filterBySeverity('All')">
-      Total Alerts<br><strong>{{ stats.total }}</strong>
+      Total Alerts<br><strong id="totalCount">{{ stats.total }}</strong>
     </div>
     <div class="card Critical" onclick="filterBySeverity('Critical')">
-      Critical<br><strong>{{ stats.critical }}</strong>
+      Critical<br><strong id="criticalCount">{{ stats.critical }}</strong>
     </div>
     <div class="card High" onclick="filterBySeverity('High')">
-      High<br><strong>{{ stats.high }}</strong>
+      High<br><strong id="highCount">{{ stats.high }}</strong>
     </div>
     <div class="card Medium" onclick="filterBySeverity('Medium')">
-      Medium<br><strong>{{ stats.medium }}</strong>
+      Medium<br><strong id="mediumCount">{{ stats.medium }}</strong>
     </div>
-    <div class="card Info">
-      Top IPs<br>
+    <div class="card Info" id="topIps">
+      Top IPs ({{ chart_window }}, ~{{ stats.unique_ips }} unique)<br>
       {% if stats.top_ips %}
         {% for ip,count in stats.top_ips %}
           {{ ip }} ({{ count }})<br>
@@ -204,6 +217,9 @@ function toggleCharts() {
     <div style="max-width:400px;">
       <canvas id="topEventsChart" width="400" height="150"></canvas>
     </div>
+    <div style="max-width:400px;">
+      <canvas id="timelineChart" width="400" height="150"></canvas>
+    </div>
   </div>
 
   <!-- ======= ChartJS initialization ======= -->
@@ -215,7 +231,7 @@ function toggleCharts() {
   chartContainer.style.display = chartsVisible ? 'flex' : 'none';
 
   // Doughnut chart for severity distribution
-  new Chart(ctx1, {
+  const severityChart = new Chart(ctx1, {
     type: 'doughnut',
     data: {
       labels: ['Critical', 'High', 'Medium'],
@@ -225,17 +241,11 @@ function toggleCharts() {
     options: { plugins: { legend: { labels: { color: '#fff' } } } }
   });
 
-  // Bar chart for most frequent event types
-  let topEvents = {};
-  {% for a in alerts %}
-  if ("{{ a.type }}" !== "Heartbeat" && "{{ a.severity }}" !== "Info") {
-    topEvents["{{ a.type }}"] = (topEvents["{{ a.type }}"] || 0) + 1;
-  }
-  {% endfor %}
-  let sortedTypes = Object.entries(topEvents).sort((a,b) => b[1]-a[1]).slice(0,5);
-  let labels = sortedTypes.map(e => e[0]);
-  let values = sortedTypes.map(e => e[1]);
-  new Chart(ctx2, {
+  // Bar chart for most frequent event types (counted by the server over the chart window)
+  const topEvents = {{ stats.top_events | tojson }};
+  let labels = topEvents.map(e => e[0]);
+  let values = topEvents.map(e => e[1]);
+  const topEventsChart = new Chart(ctx2, {
     type: 'bar',
     data: { labels, datasets: [{ label: 'Most Frequent Events', data: values, backgroundColor: '#00bcd4' }] },
     options: {
@@ -247,13 +257,41 @@ function toggleCharts() {
     y: {
       ticks: { color: '#fff' },
       grid: { color: '#333' },
-      beginAtZero: true,
-      max: 40,           // upper limit on Y-axis
+      beginAtZero: true
     }
   },
   plugins: { legend: { labels: { color: '#fff' } } }
 }
   });
+
+  // Line chart of alerts over time, from pre-aggregated rollups (/api/stats)
+  const severityColors = { Critical: '#ff5252', High: '#ffb74d', Medium: '#4db6ac', Info: '#aaa' };
+  const timelineChart = new Chart(document.getElementById('timelineChart'), {
+    type: 'line',
+    data: { labels: [], datasets: [] },
+    options: {
+      scales: {
+        x: { ticks: { color: '#fff', maxTicksLimit: 6 }, grid: { color: '#333' } },
+        y: { ticks: { color: '#fff' }, grid: { color: '#333' }, beginAtZero: true }
+      },
+      plugins: { legend: { labels: { color: '#fff' } } }
+    }
+  });
+
+  function loadTimeline() {
+    fetch('/api/stats?window={{ chart_window }}&by=severity')
+      .then(resp => resp.json())
+      .then(stats => {
+        timelineChart.data.labels = stats.labels;
+        timelineChart.data.datasets = Object.entries(stats.series).map(([severity, counts]) => ({
+          label: severity, data: counts, borderColor: severityColors[severity] || '#00bcd4',
+          pointRadius: 0, tension: 0.2
+        }));
+        timelineChart.update();
+      });
+  }
+  loadTimeline();
+  setInterval(loadTimeline, 60000);
   </script>
   {% endif %}
 
@@ -267,13 +305,13 @@ function toggleCharts() {
   {% if alerts %}
   <table>
     <thead><tr><th>Time</th><th>Severity</th><th>Type</th><th>IP</th><th>Details</th></tr></thead>
-    <tbody>
+    <tbody id="advancedRows">
     {% for a in alerts %}
     <tr class="{{ a.severity }}">
       <td>{{ a.time }}</td>
       <td class="{{ a.severity }}">{{ a.severity }}</td>
       <td>{{ a.type }}</td>
-      <td>{{ a.ip or "-" }}</td>
+      <td>{{ a.ip or "-" }}{% if a.intel %} <span class="intel" title="On blocklist">⚠ {{ a.intel }}</span>{% endif %}</td>
       <td>{{ a.log }}</td>
     </tr>
     {% endfor %}
@@ -289,13 +327,13 @@ function toggleCharts() {
   {% if alerts %}
   <table>
     <thead><tr><th>Time</th><th>Severity</th><th>Type</th><th>IP</th><th>Explanation</th></tr></thead>
-    <tbody>
+    <tbody id="executiveRows">
     {% for a in alerts %}
     <tr class="{{ a.severity }}">
       <td>{{ a.time }}</td>
       <td class="{{ a.severity }}">{{ a.severity }}</td>
       <td>{{ a.type }}</td>
-      <td>{{ a.ip or "-" }}</td>
+      <td>{{ a.ip or "-" }}{% if a.intel %} <span class="intel" title="On blocklist">⚠ {{ a.intel }}</span>{% endif %}</td>
       <td>{{ a.description or "No explanation available." }}</td>
     </tr>
     {% endfor %}
@@ -339,56 +377,496 @@ function toggleCharts() {
 
   <!-- ======= Filter by clicking severity cards ======= -->
   <script>
-  function filterBySeverity(level) {
-    const allRows = document.querySelectorAll('tbody tr');
-    allRows.forEach(row => {
-      if (level === 'All') row.style.display = '';
-      else row.style.display = row.classList.contains(level) ? '' : 'none';
+  // Filtering is done by the server (/api/alerts), so matches beyond the
+  // rows currently on the page are found too. The tables are refilled with one page.
+  let currentFilter = 'All';
+
+  function makeRow(a, lastColumn) {
+    const tr = document.createElement('tr');
+    tr.className = a.severity;
+    const ip = (a.ip || '-') + (a.intel ? ` ⚠ ${a.intel}` : '');
+    [a.time, a.severity, a.type, ip, lastColumn].forEach((text, i) => {
+      const td = document.createElement('td');
+      if (i === 1) td.className = a.severity;
+      td.textContent = text;
+      tr.appendChild(td);
     });
+    return tr;
+  }
+
+  function fillRows(tbodyId, alerts, column) {
+    const tbody = document.getElementById(tbodyId);
+    if (!tbody) return;
+    tbody.replaceChildren(...alerts.map(a => makeRow(a, column(a))));
+  }
+
+  function filterBySeverity(level) {
+    currentFilter = level;
+    const params = new URLSearchParams({ limit: {{ display_limit }} });
+    if (level !== 'All') params.set('severity', level);
+    fetch('/api/alerts?' + params)
+      .then(resp => resp.json())
+      .then(page => {
+        fillRows('advancedRows', page.alerts, a => a.log);
+        fillRows('executiveRows', page.alerts, a => a.description || 'No explanation available.');
+      });
   }
   </script>
+
+  <!-- ======= Live updates: new alerts are pushed over server-sent events ======= -->
+  <script>
+  (function () {
+    const source = new EventSource('/stream?since={{ version }}');
+
+    function prependRows(tbodyId, alerts, column) {
+      const tbody = document.getElementById(tbodyId);
+      if (!tbody) return;
+      alerts
+        .filter(a => currentFilter === 'All' || a.severity === currentFilter)
+        .forEach(a => tbody.insertBefore(makeRow(a, column(a)), tbody.firstChild));
+      while (tbody.rows.length > {{ display_limit }}) tbody.deleteRow(-1);
+    }
+
+    function setText(id, value) {
+      const el = document.getElementById(id);
+      if (el) el.textContent = value;
+    }
+
+    source.addEventListener('alerts', (event) => {
+      const msg = JSON.parse(event.data);
+      // First alerts on an empty dashboard: the cards and charts do not exist yet
+      if (!document.getElementById('advancedRows')) { location.reload(); return; }
+
+      prependRows('advancedRows', msg.alerts, a => a.log);
+      prependRows('executiveRows', msg.alerts, a => a.description || 'No explanation available.');
+
+      const s = msg.stats;
+      setText('lastUpdate', s.last_update);
+      setText('totalLine', s.total);
+      setText('totalCount', s.total);
+      setText('criticalCount', s.critical);
+      setText('highCount', s.high);
+      setText('mediumCount', s.medium);
+
+      const topIps = document.getElementById('topIps');
+      if (topIps) {
+        topIps.innerHTML = `Top IPs ({{ chart_window }}, ~${s.unique_ips} unique)<br>`;
+        if (s.top_ips.length === 0) topIps.append('No recurring IPs detected');
+        s.top_ips.forEach(([ip, count]) => {
+          topIps.append(`${ip} (${count})`);
+          topIps.appendChild(document.createElement('br'));
+        });
+      }
+
+      if (typeof severityChart !== 'undefined') {
+        severityChart.data.datasets[0].data = [s.critical, s.high, s.medium];
+        severityChart.update();
+      }
+      if (typeof topEventsChart !== 'undefined') {
+        topEventsChart.data.labels = s.top_events.map(e => e[0]);
+        topEventsChart.data.datasets[0].data = s.top_events.map(e => e[1]);
+        topEventsChart.update();
+      }
+    });
+  })();
+  </script>
 </body>
 </html>
 """
 
 # =====================================================
-# Flask route: loads data and renders dashboard
+# Shared alert store (incrementally tails the journal or database)
 # =====================================================
-@app.route("/")
-def dashboard():
-    """Load alerts from alerts.json and build dashboard statistics."""
-    if not os.path.exists("alerts.json"):
-        return render_template_string(TEMPLATE, alerts=[], stats=None)
-
-    with open("alerts.json", "r", encoding="utf-8") as f:
-        alerts = json.load(f)
-
-    # Add descriptions for simplified view
-    for a in alerts:
-        a["description"] = EXPLANATIONS.get(a["type"], "No explanation available.")
-
-    # Sort newest first
-    alerts.sort(key=lambda x: x.get("time", ""), reverse=True)
-
-    # Collect counts and top IPs
-    total = len(alerts)
-    severities = Counter(a["severity"] for a in alerts)
-    ip_counter = Counter(a.get("ip") for a in alerts if a.get("ip"))
-    top_ips = [(ip, count) for ip, count in ip_counter.most_common(5) if count > 1]
-
-    stats = {
-        "total": total,
-        "critical": severities.get("Critical", 0),
-        "high": severities.get("High", 0),
-        "medium": severities.get("Medium", 0),
+intel = open_intel()  # Memory-mapped blocklist index, if one has been built
+
+
+def describe(alert):
+    """Attach the simplified-view explanation (and blocklist tags) once, when the alert is ingested."""
+    alert["description"] = EXPLANATIONS.get(alert.get("type"), "No explanation available.")
+    if intel is not None:
+        intel.tag(alert)
+
+
+# One store shared by all requests; it only parses alerts appended since the last refresh.
+# Backend from MINI_SIEM_STORAGE; top/unique IP sketches are saved to MINI_SIEM_SKETCHES
+store = AlertStore(source=open_reader(), enrich=describe, sketch_path=SKETCH_FILE)
+atexit.register(store.save_sketches)
+
+DISPLAY_LIMIT = 400  # Newest alerts rendered in the tables
+CHART_WINDOW = "24h" # Time span covered by the event charts
+
+# Routine events left out of the "Most Frequent Events" chart
+ROUTINE_TYPES = {event for event, severity in EVENTS.items() if severity == "Info"}
+
+POLL_INTERVAL = 1.0     # Seconds between journal polls while viewers are connected
+KEEPALIVE_INTERVAL = 15 # Seconds between SSE keep-alive comments
+
+_poller_lock = threading.Lock()
+_poller_started = False
+
+
+def _poll_journal():
+    """Background loop: one reader refreshes the store for all connected viewers."""
+    while True:
+        store.refresh()
+        time.sleep(POLL_INTERVAL)
+
+
+def ensure_poller():
+    """Start the journal poller the first time a viewer subscribes."""
+    global _poller_started
+    with _poller_lock:
+        if not _poller_started:
+            threading.Thread(target=_poll_journal, daemon=True).start()
+            _poller_started = True
+
+
+def build_stats():
+    """Collect the numbers shown in the cards and charts."""
+    # Counts are maintained incrementally by the store; top and unique IPs come
+    # from the sketches, so they cover the whole chart window in bounded memory
+    sources = store.sources(parse_window(CHART_WINDOW), n=5)
+    top_ips = [(ip, count) for ip, count, _ in sources["top"] if count > 1]
+    # Event types over the chart window, from the rollups instead of per-alert counting
+    by_type = store.series(parse_window(CHART_WINDOW), by="type")["totals"]
+    top_events = sorted(((t, n) for t, n in by_type.items() if t not in ROUTINE_TYPES),
+                        key=lambda e: e[1], reverse=True)[:5]
+    return {
+        "total": len(store),
+        "critical": store.severities.get("Critical", 0),
+        "high": store.severities.get("High", 0),
+        "medium": store.severities.get("Medium", 0),
         "top_ips": top_ips,
+        "unique_ips": sources["unique"],
+        "top_events": top_events,
         "last_update": time.strftime("%Y-%m-%d %H:%M:%S")
     }
 
-    return render_template_string(TEMPLATE, alerts=alerts, stats=stats)
+# =====================================================
+# Rendered page cache (one render per store version)
+# =====================================================
+# Compiled once instead of on every request as render_template_string() does
+DASHBOARD_TEMPLATE = app.jinja_env.from_string(TEMPLATE)
+
+# ETags include a per-process token: after a restart the store re-reads the
+# journal and version numbers may repeat with different content
+_BOOT_ID = f"{int(time.time()):x}"
+
+
+class PageCache:
+    """
+    The last rendered dashboard page and the store version it shows.
+    Concurrent requests for a new version wait for a single render.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.body = None
+        self.etag = None
+        # When this version was first rendered. Last-Modified has one-second
+        # resolution, so the ETag is what clients should (and browsers do) use
+        self.modified = None
+
+    def get(self):
+        """
+        Return (body, etag, modified, rendered) for the current store version,
+        rendering if needed; `rendered` tells whether this call did the render.
+        """
+        with self.lock:
+            rendered = self.version != store.version or self.body is None
+            if rendered:
+                self.body, self.version = render_dashboard()
+                self.etag = f"{_BOOT_ID}-{self.version}"
+                self.modified = time.time()
+            return self.body, self.etag, self.modified, rendered
+
+
+page_cache = PageCache()
+
+
+def render_dashboard():
+    """Render the full page. Returns (html, store version it corresponds to)."""
+    if not len(store):
+        return DASHBOARD_TEMPLATE.render(alerts=[], stats=None, version=store.version,
+                                         display_limit=DISPLAY_LIMIT), store.version
+
+    # Newest alerts plus the version they correspond to, taken together so the
+    # live stream continues exactly where this page leaves off
+    with STAGE_SECONDS.time(stage="query"):
+        alerts, version = store.since(0, DISPLAY_LIMIT)
+        alerts.reverse()  # Newest first
+    with STAGE_SECONDS.time(stage="stats"):
+        stats = build_stats()
+    with STAGE_SECONDS.time(stage="render"):
+        body = DASHBOARD_TEMPLATE.render(alerts=alerts, stats=stats, version=version,
+                                         display_limit=DISPLAY_LIMIT, chart_window=CHART_WINDOW)
+    return body, version
+
+# =====================================================
+# Flask route: loads data and renders dashboard
+# =====================================================
+@app.route("/")
+def dashboard():
+    """
+    Pick up new alerts and serve the dashboard page.
+    The page is rendered once per store version; a browser that already has
+    the current version (If-None-Match / If-Modified-Since) gets a 304.
+    """
+    with STAGE_SECONDS.time(stage="refresh"):
+        store.refresh()
+    cached = page_cache
+    if cached.version == store.version and cached.etag and request.if_none_match.contains(cached.etag):
+        PAGE_RESPONSES.inc(result="not_modified")
+        return _not_modified(cached.etag, cached.modified)
+
+    body, etag, modified, rendered = cached.get()
+    response = Response(body, mimetype="text/html")
+    response.set_etag(etag)
+    response.last_modified = modified
+    response.cache_control.no_cache = True  # Always revalidate, usually for a 304
+    response = response.make_conditional(request)
+    # Counted by what the client got: an If-Modified-Since match is a 304 too
+    if response.status_code == 304:
+        PAGE_RESPONSES.inc(result="not_modified")
+    elif rendered:
+        PAGE_RESPONSES.inc(result="rendered")
+    else:
+        PAGE_RESPONSES.inc(result="cached")
+    return response
+
+
+def _not_modified(etag, modified):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.last_modified = modified
+    response.cache_control.no_cache = True
+    return response
+
+# =====================================================
+# Flask route: live push of new alerts (server-sent events)
+# =====================================================
+@app.route("/stream")
+def stream():
+    """
+    Push only new alerts and updated counters to the browser.
+    The client sends the store version its page was rendered at; after that
+    each message carries just the alerts that arrived since the previous one.
+    """
+    # On reconnect the browser repeats the page's ?since= but also sends the id
+    # of the last event it received, which is the newer of the two
+    since = request.headers.get("Last-Event-ID", type=int)
+    if since is None:
+        since = request.args.get("since", default=store.version, type=int)
+    ensure_poller()
+
+    def events(version):
+        STREAM_CLIENTS.inc()
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                current = store.wait_for_change(version, timeout=KEEPALIVE_INTERVAL)
+                if current == version:
+                    yield ": keep-alive\n\n"
+                    continue
+                alerts, version = store.since(version, DISPLAY_LIMIT)
+                payload = json.dumps({"alerts": alerts, "stats": build_stats()}, ensure_ascii=False)
+                yield f"id: {version}\nevent: alerts\ndata: {payload}\n\n"
+        finally:
+            STREAM_CLIENTS.inc(-1)  # Client disconnected
+
+    return Response(events(since), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# =====================================================
+# Flask route: filtered, paginated JSON query API
+# =====================================================
+MAX_PAGE_SIZE = 500  # Upper bound on `limit` so one response stays small
+
+
+@app.route("/api/alerts")
+def api_alerts():
+    """
+    Query alerts newest first.
+    Filters: severity, type, ip, host, user, file, intel, start, end (time range, inclusive).
+    Paging: limit (default 50) and cursor (the `next_cursor` of the previous page).
+    """
+    store.refresh()
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), MAX_PAGE_SIZE)
+        cursor = request.args.get("cursor", type=int)
+        alerts, next_cursor = store.query(
+            severity=request.args.get("severity"),
+            type=request.args.get("type"),
+            ip=request.args.get("ip"),
+            host=request.args.get("host"),
+            user=request.args.get("user"),
+            file=request.args.get("file"),
+            intel=request.args.get("intel"),
+            start=request.args.get("start"),
+            end=request.args.get("end"),
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"alerts": alerts, "next_cursor": next_cursor, "count": len(alerts)})
+
+# =====================================================
+# Flask route: pre-aggregated chart series
+# =====================================================
+@app.route("/api/stats")
+def api_stats():
+    """
+    Alert counts over time from the rollups.
+    Parameters: window (e.g. 1h, 24h, 7d; default 24h) and by (severity or type).
+    At most 120 points are returned regardless of the window size.
+    """
+    store.refresh()
+    try:
+        window = parse_window(request.args.get("window", CHART_WINDOW))
+        return jsonify(store.series(window, by=request.args.get("by", "severity")))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+# =====================================================
+# Flask route: top sources and distinct sources (sketches)
+# =====================================================
+@app.route("/api/sources")
+def api_sources():
+    """
+    Estimated top attacking IPs and number of distinct IPs.
+    Parameters: window (e.g. 1h, 24h, 30d; default all history) and n (default 10).
+    Each top entry is [ip, count, error]: the true count is between count - error and count.
+    """
+    store.refresh()
+    try:
+        window = request.args.get("window")
+        n = min(max(int(request.args.get("n", 10)), 1), 100)
+        return jsonify(store.sources(parse_window(window) if window else None, n))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+# =====================================================
+# Flask route: search the columnar archive (history beyond the store)
+# =====================================================
+archive = Archive(ARCHIVE_DIR)
+
+
+@app.route("/api/archive")
+def api_archive():
+    """
+    Search archived alerts newest first.
+    Filters: ip, severity, type, host, start, end ("YYYY-MM-DD[ HH:MM:SS]", inclusive).
+    Paging: limit (default 50) and cursor (the `next_cursor` of the previous page).
+    `files` tells how many archive files were scanned or skipped by time, bloom filter or dictionary.
+    """
+    archive.refresh()
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), MAX_PAGE_SIZE)
+        alerts, next_cursor, stats = archive.search(
+            ip=request.args.get("ip"),
+            start=request.args.get("start"),
+            end=request.args.get("end"),
+            severity=request.args.get("severity"),
+            type=request.args.get("type"),
+            host=request.args.get("host"),
+            cursor=request.args.get("cursor"),
+            limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"alerts": alerts, "next_cursor": next_cursor, "count": len(alerts), "files": stats})
+
+# =====================================================
+# Flask route: streaming export (NDJSON, CSV, Parquet)
+# =====================================================
+@app.route("/api/export")
+def api_export():
+    """
+    Download filtered alerts, streamed in chunks (no Content-Length, so nothing is held in memory).
+    Parameters: format (ndjson, csv or parquet; default ndjson), gzip=1, source (store or archive),
+    and the filters severity, type, ip, host, start, end.
+    """
+    fmt = request.args.get("format", "ndjson")
+    compress = request.args.get("gzip", "") in ("1", "true", "yes")
+    filters = {name: request.args.get(name) for name in ("severity", "type", "ip", "host", "start", "end")}
+    try:
+        # Everything that can fail is checked here, before the first byte is sent
+        chunks = export_chunks(select(request.args.get("source", "store"), **filters), fmt, compress)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 501
+    mimetype = "application/gzip" if compress and fmt != "parquet" else FORMATS[fmt][0]
+    return Response(chunks, mimetype=mimetype,
+                    headers={"Content-Disposition": f'attachment; filename="{file_name(fmt, compress)}"'})
+
+# =====================================================
+# Metrics (Prometheus text format) and opt-in profiler
+# =====================================================
+registry = Registry()
+REQUEST_SECONDS = registry.histogram("siem_http_request_seconds", "Time to handle a request", ("route",))
+STAGE_SECONDS = registry.histogram("siem_dashboard_stage_seconds",
+                                   "Time per stage of the dashboard request path", ("stage",))
+PAGE_RESPONSES = registry.counter("siem_dashboard_responses_total",
+                                  "Dashboard pages by outcome (rendered, cached, not_modified)", ("result",))
+STREAM_CLIENTS = registry.gauge("siem_stream_clients", "Connected /stream viewers")
+STREAM_CLIENTS.set(0)
+registry.counter("siem_alerts_ingested_total", "Alerts added to the store since start", fn=lambda: store.version)
+registry.gauge("siem_store_alerts", "Alerts held in memory", fn=lambda: len(store))
+registry.counter("siem_source_read_bytes_total", "Bytes read from the alert journal",
+                 fn=lambda: getattr(store.source, "bytes_read", 0))
+registry.gauge("siem_newest_alert_age_seconds",
+               "Seconds between now and the newest alert's time (generator/ingest lag)",
+               fn=lambda: calendar.timegm(time.localtime()) - store.times[-1] if len(store.times) else 0)
+
+# Off unless MINI_SIEM_PROFILER=1: stack dumps reveal file paths and code
+PROFILER_ENABLED = os.environ.get("MINI_SIEM_PROFILER") == "1"
+profiler = SamplingProfiler()
+
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def _record_time(response):
+    started = g.get("started")
+    if started is not None and request.url_rule is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route=request.url_rule.rule)
+    return response
+
+
+@app.route("/metrics")
+def metrics():
+    """Internal counters for Prometheus (or curl) to scrape."""
+    return Response(registry.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+
+@app.route("/debug/profiler", methods=["GET", "POST"])
+def debug_profiler():
+    """
+    Sampling profiler toggle. POST ?action=start|stop; GET returns the hottest
+    stacks in collapsed format ("frame;frame;frame count"). ?limit= sets how many.
+    """
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "profiler disabled; start with MINI_SIEM_PROFILER=1"}), 404
+    if request.method == "POST":
+        action = request.args.get("action")
+        if action == "start":
+            profiler.start()
+        elif action == "stop":
+            profiler.stop()
+        else:
+            return jsonify({"error": "action must be start or stop"}), 400
+        return jsonify({"running": profiler.running})
+    return Response(profiler.dump(request.args.get("limit", 50, type=int)), mimetype="text/plain")
 
 # =====================================================
 # Run Flask web server
 # =====================================================
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Development server; see dashboard_server.py for several worker processes
+    app.run(debug=True, threaded=True)
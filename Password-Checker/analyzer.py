@@ -1,6 +1,9 @@
 import hashlib
+import os
 import requests
-from functools import lru_cache
+
+from pwned_index import PwnedIndex
+from range_cache import CACHE_PATH, PackedRange, RangeCache
 
 # Custom User-Agent required by Have I Been Pwned API.
 # Identifies your project when making requests.
@@ -8,17 +11,98 @@ HEADERS = {
     "User-Agent": "Jorgenfje-PasswordChecker/1.0 (https://github.com/Jorgenfje/Python-Projects/tree/main/Password-Checker)"
 }
 
-@lru_cache(maxsize=1024)
+# Range endpoint of the Pwned Passwords API (the 5-character prefix is appended).
+RANGE_URL = "https://api.pwnedpasswords.com/range/"
+
+# Offline mode: path to an index built by pwned_index.py.
+# When set, breach checks never touch the network.
+PWNED_INDEX = os.environ.get("PWNED_INDEX")
+
+_offline_index = None
+
+
+def use_offline_index(path):
+    """Switch breach checks to a local index file (None switches back to the live API)."""
+    global _offline_index, PWNED_INDEX
+    PWNED_INDEX = path
+    _offline_index = PwnedIndex(path) if path else None
+
+
+def offline_index():
+    """The configured offline index, opened on first use (None in online mode)."""
+    global _offline_index
+    if _offline_index is None and PWNED_INDEX:
+        _offline_index = PwnedIndex(PWNED_INDEX)
+    return _offline_index
+
+
+# Persistent range cache (see range_cache.py); an empty PWNED_CACHE turns it off.
+_range_cache = None
+
+
+def use_range_cache(path):
+    """Keep downloaded ranges in the cache file at `path` (None: no cache)."""
+    global _range_cache, CACHE_PATH
+    if _range_cache is not None:
+        _range_cache.close()
+    CACHE_PATH = path
+    _range_cache = RangeCache(path) if path else None
+
+
+def range_cache():
+    """The configured range cache, opened on first use (None if turned off)."""
+    global _range_cache
+    if _range_cache is None and CACHE_PATH:
+        _range_cache = RangeCache(CACHE_PATH)
+    return _range_cache
+
+
 def query_pwned_range(prefix: str) -> str:
     """
     Query the Have I Been Pwned 'range' API using only the first 5 characters
     of the SHA-1 hash (k-anonymity). The API returns all suffixes that share
     this prefix, keeping the password itself private.
+    Ranges are kept in the persistent cache, so a repeated check costs no request.
+    """
+    return get_range(prefix)[0].to_text()
+
+
+def get_range(prefix: str, session=None, base_url: str = None, use_cache: bool = True,
+              cache: RangeCache = None):
+    """
+    One range through the cache, parsed. Returns (PackedRange, how), where how is
+      "cached"      served from the cache, within its TTL
+      "revalidated" the cached copy was confirmed by the server (HTTP 304)
+      "downloaded"  fetched and stored
+      "stale"       the server could not be reached; the expired copy is used
+    `cache` is the RangeCache to use (default: the configured one, see range_cache());
+    use_cache=False bypasses caching altogether.
     """
-    url = f"https://api.pwnedpasswords.com/range/{prefix}"
-    resp = requests.get(url, headers=HEADERS, timeout=10)
-    resp.raise_for_status()
-    return resp.text
+    cache = (range_cache() if cache is None else cache) if use_cache else None
+    cached = cache.get(prefix) if cache is not None else None
+    if cached is not None and cached.fresh:
+        return cached.range, "cached"
+
+    headers = dict(HEADERS)
+    if cached is not None and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    try:
+        resp = (session or requests).get(f"{base_url or RANGE_URL}{prefix}", headers=headers, timeout=10)
+        if resp.status_code == 304 and cached is not None:
+            cache.renew(prefix)
+            return cached.range, "revalidated"
+        resp.raise_for_status()
+        if resp.status_code != 200:
+            # E.g. a 304 we did not ask for: there is no body to parse
+            raise requests.HTTPError(f"Unexpected status {resp.status_code} for range {prefix}", response=resp)
+    except requests.RequestException:
+        if cached is not None:
+            return cached.range, "stale"  # Better an old copy than no answer
+        raise
+    packed = PackedRange.from_text(resp.text)
+    if cache is not None:
+        cache.put(prefix, packed, resp.headers.get("ETag"))
+    return packed, "downloaded"
 
 
 def count_pwned_occurrences(password: str) -> int:
@@ -33,14 +117,12 @@ def count_pwned_occurrences(password: str) -> int:
     sha1 = hashlib.sha1(password.encode("utf-8")).hexdigest().upper()
     prefix, suffix = sha1[:5], sha1[5:]
 
-    # Query API for all hashes with this prefix
-    data = query_pwned_range(prefix)
-
-    # Compare suffixes locally to find exact match
-    for line in data.splitlines():
-        h_suffix, count = line.split(":")
-        if h_suffix.strip() == suffix:
-            return int(count)
+    # Offline: binary search in the memory-mapped index
+    index = offline_index()
+    if index is not None:
+        return index.count(sha1)
 
-    # Not found in the database
-    return 0
+    # All hashes with this prefix, from the cache or the API, parsed into a sorted
+    # array: the exact suffix is found by binary search (0 if not in the database)
+    packed, _ = get_range(prefix)
+    return packed.count(suffix)
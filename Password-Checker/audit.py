@@ -0,0 +1,175 @@
+import argparse
+import hashlib
+import json
+import string
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from analyzer import get_range, offline_index
+from range_cache import RangeCache
+
+# ---------------------------------------------------------------
+# Bulk password audit.
+# Checks a whole file of passwords (or SHA-1 hashes, e.g. from a
+# credential export) against Have I Been Pwned and prints a summary.
+#   - entries are hashed locally and grouped by their 5-character prefix,
+#     so every range is downloaded once, however many entries share it
+#   - ranges in the persistent cache (range_cache.py) are not downloaded
+#     again; expired ones are revalidated with their ETag
+#   - ranges are fetched concurrently by a bounded thread pool that shares
+#     one requests.Session (pooled keep-alive connections, retries on 429/5xx)
+#   - with an offline index (PWNED_INDEX) nothing is downloaded at all
+# Usage:  python audit.py passwords.txt [--hashes] [--workers 16] [--json report.json]
+# ---------------------------------------------------------------
+
+WORKERS = 16          # Concurrent range downloads
+RETRIES = 3           # Per range, with exponential backoff (HIBP answers 429 when rate limited)
+_HEX = set(string.hexdigits)
+
+
+def to_sha1(entry: str, hashes: bool = None) -> str:
+    """
+    Uppercase SHA-1 of a password, or the entry itself if it already is a hash.
+    hashes=None detects 40-hex-digit entries; True/False forces either reading.
+    """
+    if hashes or (hashes is None and len(entry) == 40 and set(entry) <= _HEX):
+        if len(entry) != 40 or not set(entry) <= _HEX:
+            raise ValueError(f"not a SHA-1 hash: {entry!r}")
+        return entry.upper()
+    # surrogateescape: lines that are not valid UTF-8 are hashed as their original bytes
+    return hashlib.sha1(entry.encode("utf-8", "surrogateescape")).hexdigest().upper()
+
+
+def make_session(workers: int = WORKERS) -> requests.Session:
+    """Session with one keep-alive connection per worker and retries for rate limits and server errors."""
+    session = requests.Session()
+    retry = Retry(total=RETRIES, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def audit(entries, hashes: bool = None, workers: int = WORKERS, session=None, base_url: str = None,
+          use_cache: bool = True, cache: RangeCache = None) -> dict:
+    """
+    Check every entry (password or SHA-1 hash), one per line of a file, and return a report:
+      entries, unique, pwned (entries found), ranges (prefixes looked up),
+      requests (HTTP downloads), sources (ranges per get_range() outcome: cached,
+      revalidated, downloaded, stale), failed (prefixes that could not be fetched),
+      invalid (line numbers of entries that are not a SHA-1 hash, with hashes=True),
+      results: one [line number, sha1, count] per entry (count None if its range failed).
+    Blank lines are skipped but still counted, so line numbers match the file.
+    `cache` and use_cache are passed to get_range(): the configured range cache
+    by default, another RangeCache, or none at all with use_cache=False.
+    """
+    started = time.perf_counter()
+    numbered, invalid = [], []
+    for line, entry in enumerate(entries, 1):
+        if not entry.strip():
+            continue
+        try:
+            numbered.append((line, to_sha1(entry, hashes)))
+        except ValueError:
+            invalid.append(line)
+    hashed = [sha1 for _, sha1 in numbered]
+    prefixes = sorted({sha1[:5] for sha1 in hashed})
+    ranges, failed = {}, {}
+    sources = Counter()
+
+    index = offline_index()
+    if index is not None:
+        counts = {sha1: index.count(sha1) for sha1 in set(hashed)}
+    else:
+        own_session = session is None
+        session = session or make_session(workers)
+        try:
+            with ThreadPoolExecutor(max_workers=min(workers, len(prefixes)) or 1) as pool:
+                futures = {prefix: pool.submit(get_range, prefix, session, base_url, use_cache, cache) for prefix in prefixes}
+                for prefix, future in futures.items():
+                    try:
+                        ranges[prefix], how = future.result()
+                        sources[how] += 1
+                    except requests.RequestException as e:
+                        failed[prefix] = str(e)
+        finally:
+            if own_session:
+                session.close()
+        counts = {sha1: (ranges[sha1[:5]].count(sha1[5:]) if sha1[:5] in ranges else None)
+                  for sha1 in set(hashed)}
+
+    results = [[line, sha1, counts[sha1]] for line, sha1 in numbered]
+    return {
+        "entries": len(hashed),
+        "unique": len(counts),
+        "pwned": sum(1 for _, _, count in results if count),
+        "ranges": len(prefixes),
+        "requests": sources["downloaded"] + sources["revalidated"],
+        "sources": dict(sources),
+        "failed": failed,
+        "invalid": invalid,
+        "seconds": round(time.perf_counter() - started, 3),
+        "results": results,
+    }
+
+
+def print_report(report: dict, top: int = 10):
+    """Human-readable summary. Never prints the passwords themselves, only line numbers and hash prefixes."""
+    RED = "\033[91m"
+    GREEN = "\033[92m"
+    YELLOW = "\033[93m"
+    CYAN = "\033[96m"
+    RESET = "\033[0m"
+
+    print(f"\n{CYAN}--- Bulk Password Audit ---{RESET}")
+    print(f"📄 Entries: {report['entries']} ({report['unique']} unique)")
+    sources = report.get("sources", {})
+    print(f"🌐 Ranges: {report['ranges']} prefixes in {report['seconds']} s - {sources.get('downloaded', 0)} downloaded, "
+          f"{sources.get('cached', 0)} from cache, {sources.get('revalidated', 0)} revalidated")
+    if sources.get("stale"):
+        print(f"{YELLOW}⚠️  {sources['stale']} ranges could not be refreshed; expired cached copies were used.{RESET}")
+    if report["failed"]:
+        print(f"{YELLOW}⚠️  {len(report['failed'])} ranges could not be fetched; their entries are unchecked.{RESET}")
+    if report.get("invalid"):
+        lines = ", ".join(map(str, report["invalid"][:10])) + (", …" if len(report["invalid"]) > 10 else "")
+        print(f"{YELLOW}⚠️  {len(report['invalid'])} lines are not SHA-1 hashes and were skipped (line {lines}).{RESET}")
+    color = RED if report["pwned"] else GREEN
+    share = report["pwned"] / report["entries"] * 100 if report["entries"] else 0
+    print(f"{color}🔓 Found in breaches: {report['pwned']} of {report['entries']} ({share:.1f}%){RESET}")
+
+    worst = sorted((r for r in report["results"] if r[2]), key=lambda r: -r[2])[:top]
+    if worst:
+        print("\nMost breached (line, hash prefix, times seen):")
+        for line, sha1, count in worst:
+            print(f"  line {line:>6}  {sha1[:5]}…  {count:>12,}")
+    print(f"{CYAN}------------------------------------------------------------{RESET}")
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Check a file of passwords or SHA-1 hashes against HIBP")
+    parser.add_argument("file", help="one password or SHA-1 hash per line")
+    parser.add_argument("--hashes", action="store_true", help="every line is a SHA-1 hash")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="concurrent range downloads")
+    parser.add_argument("--top", type=int, default=10, help="most breached entries to list")
+    parser.add_argument("--json", help="also write the full report (hashes, not passwords) to this file")
+    parser.add_argument("--url", help="range endpoint (default: the HIBP API)")
+    args = parser.parse_args(argv)
+
+    with open(args.file, encoding="utf-8", errors="surrogateescape") as f:
+        entries = [line.rstrip("\r\n") for line in f]   # Blank lines too, so line numbers stay right
+    report = audit(entries, hashes=args.hashes or None, workers=args.workers, base_url=args.url)
+    print_report(report, args.top)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import strength
+from range_cache import PackedRange, RangeCache
+
+# ---------------------------------------------------------------
+# Micro-benchmarks for Password Checker internals.
+# Run e.g.:  python benchmark.py ranges --lookups 100000
+# ---------------------------------------------------------------
+
+RANGE_HASHES = 800           # Typical number of hashes in one HIBP range
+
+
+def synthetic_range(n: int = RANGE_HASHES, seed: int = 42) -> str:
+    """A range response body like the API's: n 'SUFFIX:COUNT' lines, CRLF-separated."""
+    rng = random.Random(seed)
+    return "\r\n".join(f"{rng.getrandbits(140):035X}:{int(rng.paretovariate(0.8))}" for _ in range(n))
+
+
+def rate(label: str, fn, items) -> float:
+    """Call fn on every item, print and return the calls per second."""
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    per_second = len(items) / (time.perf_counter() - started)
+    print(f"  {label:<45} {per_second:>14,.0f} lookups/s")
+    return per_second
+
+
+def measured(build):
+    """Bytes allocated while build() runs and stays alive (tracemalloc)."""
+    build()   # Warm up first: one-time caches (string interning, imports) are not part of the result
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def bench_ranges(args):
+    """Lookups in one cached range: the old splitlines() scan vs a dict vs a PackedRange."""
+    text = synthetic_range(args.hashes)
+    suffixes = [line[:35] for line in text.splitlines()]
+    rng = random.Random(1)
+    # Half hits, half misses (a miss is the usual answer for a good password)
+    probes = [rng.choice(suffixes) if i % 2 else f"{rng.getrandbits(140):035X}" for i in range(args.lookups)]
+
+    def scan(suffix):
+        for line in text.splitlines():
+            h_suffix, count = line.split(":")
+            if h_suffix.strip() == suffix:
+                return int(count)
+        return 0
+
+    as_dict, dict_bytes = measured(
+        lambda: {line[:35]: int(line[36:]) for line in text.splitlines()})
+    packed, packed_bytes = measured(lambda: PackedRange.from_text(text))
+    assert all(packed.count(s) == as_dict.get(s, 0) == scan(s) for s in probes[:200])
+
+    print(f"One range of {args.hashes} hashes, {args.lookups:,} lookups (half hits):")
+    slow = rate("splitlines() scan of the text", scan, probes[:max(1, args.lookups // 100)])
+    rate("dict {suffix: count}", lambda s: as_dict.get(s, 0), probes)
+    fast = rate("PackedRange (bisect)", packed.count, probes)
+    print(f"  -> PackedRange is {fast / slow:,.0f}x the scan")
+
+    print("Memory per range:")
+    print(f"  {'response text':<45} {sys.getsizeof(text):>14,} bytes")
+    print(f"  {'dict {suffix: count}':<45} {dict_bytes:>14,} bytes")
+    print(f"  {'PackedRange (also its size on disk)':<45} {packed_bytes:>14,} bytes")
+
+
+def bench_cache(args):
+    """count_pwned_occurrences()-style lookups through a RangeCache: memory hits vs SQLite reads."""
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ranges.sqlite3")
+        cache = RangeCache(path)
+        prefixes = [f"{p:05X}" for p in rng.sample(range(1 << 20), args.ranges)]
+        for p in prefixes:
+            cache.put(p, PackedRange.from_text(synthetic_range(args.hashes, seed=int(p, 16))))
+        probes = [(rng.choice(prefixes), f"{rng.getrandbits(140):035X}") for _ in range(args.lookups)]
+        print(f"{args.ranges} cached ranges of {args.hashes} hashes, {args.lookups:,} lookups:")
+        rate("hot (in memory)", lambda pair: cache.get(pair[0]).range.count(pair[1]), probes)
+        cold = RangeCache(path, hot_ranges=0)
+        rate("cold (read and unpacked from SQLite)", lambda pair: cold.get(pair[0]).range.count(pair[1]),
+             probes[:max(1, args.lookups // 10)])
+        cache.close()
+        cold.close()
+
+
+TYPICAL_PASSWORDS = [
+    "Password123!", "p@ssw0rd", "qwerty123", "iloveyou2", "Jorgen1998", "zxcvbnm,./", "abcabcabc",
+    "Summer2024!", "Tr0ub4dour&3", "x7#Kp2$qLm9!vR4t", "monkeydragon", "correcthorse", "1qaz2wsx",
+    "ab" * 50, "1" * 100,   # Long repetitive input: the worst case for the matchers and the search
+]
+
+
+def bench_strength(args):
+    """Time per strength.estimate() call (what a per-keystroke meter would pay), and the trie build."""
+    started = time.perf_counter()
+    strength.trie()
+    built = time.perf_counter() - started
+    trie, trie_bytes = measured(strength.PackedTrie.from_wordlists)
+    print(f"Packed trie: {len(trie):,} nodes, built in {built * 1000:.1f} ms, {trie_bytes:,} bytes")
+
+    print(f"estimate(), {args.rounds:,} rounds per password:")
+    everything = []
+    for password in TYPICAL_PASSWORDS:
+        times = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            strength.estimate(password)
+            times.append(time.perf_counter() - started)
+        times.sort()
+        everything += times
+        result = strength.estimate(password)
+        print(f"  {password[:20]:<20} score {result['score']}  {sum(times) / len(times) * 1e6:>8.0f} µs mean"
+              f"  {times[len(times) * 99 // 100] * 1e6:>8.0f} µs p99")
+    everything.sort()
+    print(f"  {'all':<20}          {sum(everything) / len(everything) * 1e6:>8.0f} µs mean"
+          f"  {everything[len(everything) * 99 // 100] * 1e6:>8.0f} µs p99")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password Checker micro-benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ranges", help="lookups/s and memory for one parsed range vs the raw text")
+    p.add_argument("--hashes", type=int, default=RANGE_HASHES)
+    p.add_argument("--lookups", type=int, default=100_000)
+    p.set_defaults(func=bench_ranges)
+
+    p = sub.add_parser("cache", help="lookups/s through the range cache, hot vs from SQLite")
+    p.add_argument("--ranges", type=int, default=200)
+    p.add_argument("--hashes", type=int, default=RANGE_HASHES)
+    p.add_argument("--lookups", type=int, default=100_000)
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser("strength", help="time per strength estimate for typical passwords")
+    p.add_argument("--rounds", type=int, default=500)
+    p.set_defaults(func=bench_strength)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from math import log2
 from analyzer import count_pwned_occurrences
+from strength import estimate
 
 # ---------------------------------------------------------------
 # This script is the main entry point for the Password Checker tool.
@@ -7,12 +7,12 @@ from analyzer import count_pwned_occurrences
 #   - length
 #   - character variety
 #   - known data breaches (Have I Been Pwned)
-#   - estimated entropy (theoretical strength)
+#   - estimated guesses (patterns: words, keyboard walks, repeats, ...)
 # The script outputs a color-coded analysis and final rating.
 # ---------------------------------------------------------------
 
 def check_strength(password: str) -> str:
-    """Performs detailed password analysis with color-coded output and entropy estimation."""
+    """Performs detailed password analysis with color-coded output and a guess estimate."""
     # ANSI color codes for terminal styling
     RED = "\033[91m"
     YELLOW = "\033[93m"
@@ -47,20 +47,13 @@ def check_strength(password: str) -> str:
         score -= 3  # penalize if found
         if score < 0:
             score = 0
-    score = min(score, 10)
-
-    # ---- Entropy estimation ----
-    # Approximates theoretical strength based on character set and length
-    charset_size = 0
-    if has_lower:
-        charset_size += 26
-    if has_upper:
-        charset_size += 26
-    if has_digit:
-        charset_size += 10
-    if has_symbol:
-        charset_size += 32  # typical printable symbols
-    entropy = round(len(password) * log2(charset_size), 2) if charset_size else 0
+
+    # ---- Guess estimation ----
+    # How many guesses an attacker trying common words, keyboard walks,
+    # repeats and sequences first would need (see strength.py).
+    # Length and variety cannot make up for a guessable pattern.
+    guess_estimate = estimate(password)
+    score = min(score, 10, 2 * guess_estimate["score"] + 2)
 
     # ---- Determine color for overall score ----
     if score >= 8 and pwned_count == 0:
@@ -91,15 +84,23 @@ def check_strength(password: str) -> str:
     else:
         print(f"{GREEN}✅ Data breach check: Not found in known breaches.{RESET}")
 
-    # Interpret entropy value in human-readable terms
-    if entropy < 40:
-        entropy_label = f"{RED}Weak - easily guessable{RESET}"
-    elif entropy < 70:
-        entropy_label = f"{YELLOW}Moderate - acceptable for short-term use{RESET}"
+    # Interpret the estimate in human-readable terms
+    guess_score = guess_estimate["score"]
+    if guess_score <= 1:
+        guess_label = f"{RED}Weak - easily guessable{RESET}"
+    elif guess_score <= 2:
+        guess_label = f"{YELLOW}Moderate - acceptable for short-term use{RESET}"
     else:
-        entropy_label = f"{GREEN}Strong - very hard to brute-force{RESET}"
-
-    print(f"🧮 Entropy: {color}{entropy} bits{RESET} ({entropy_label})")
+        guess_label = f"{GREEN}Strong - very hard to guess{RESET}"
+
+    log10_guesses = guess_estimate["guesses_log10"]
+    print(f"🧮 Estimated guesses: {color}10^{log10_guesses:.1f}{RESET} "
+          f"(~{log10_guesses * 3.32:.0f} bits, {guess_label})")
+    found = [f"{m['pattern']} '{m['token']}'" for m in guess_estimate["sequence"] if m["pattern"] != "bruteforce"]
+    if found:
+        print(f"🧩 Patterns found: {', '.join(found)}")
+    if guess_estimate["warning"]:
+        print(f"{YELLOW}⚠️  {guess_estimate['warning']}{RESET}")
     print(f"📊 Overall strength score: {color}{score}/10{RESET}")
 
     # ---- Final rating ----
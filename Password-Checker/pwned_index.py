@@ -0,0 +1,170 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import time
+from array import array
+
+# ---------------------------------------------------------------
+# Offline Have I Been Pwned lookups.
+# Builds a compact binary index from the downloadable Pwned Passwords
+# SHA-1 dump (or any text file with one HASH:COUNT per line) and looks
+# hashes up in it without any network access.
+#
+# Index layout:
+#   header        magic + number of records
+#   prefix table  2^20 + 1 uint32 record numbers: hashes starting with
+#                 the 5-hex prefix p are the records table[p]..table[p+1]
+#   records       sorted, fixed width: the last 18 bytes of the SHA-1
+#                 (the prefix covers the first 2.5) + uint32 count
+#
+# A lookup reads one table entry and binary-searches ~1,000 records of
+# its range through a memory map, so it takes microseconds and only the
+# touched pages are ever loaded.
+#
+# Usage:  python pwned_index.py build pwned-passwords-sha1.txt -o pwned.idx
+#         python pwned_index.py lookup pwned.idx <password or SHA-1>
+# ---------------------------------------------------------------
+
+MAGIC = b"PWNDIDX1"
+HEADER = struct.Struct("<8sQ")       # magic, number of records
+PREFIXES = 1 << 20                   # Every 5-hex-digit prefix
+KEY_BYTES = 18                       # SHA-1 bytes 2..19
+RECORD = struct.Struct(f"<{KEY_BYTES}sI")
+TABLE_BYTES = (PREFIXES + 1) * 4
+
+
+def parse_line(line: bytes):
+    """b'HASH:COUNT' -> (20-byte digest, count), or None for blank / malformed lines."""
+    hash_hex, _, count = line.strip().partition(b":")
+    if len(hash_hex) != 40:
+        return None
+    try:
+        return bytes.fromhex(hash_hex.decode("ascii")), int(count or 1)
+    except ValueError:
+        return None
+
+
+def build_index(source: str, output: str) -> int:
+    """
+    Build the index for `source` (HASH:COUNT lines, sorted or not) into `output`.
+    Two passes over the file with constant memory besides the 4 MB prefix table:
+    count the hashes per prefix, then write each record straight to its slot
+    and sort the (small) prefix ranges in place. Returns the number of records.
+    """
+    # ---- Pass 1: hashes per prefix ----
+    counts = array("I", bytes(PREFIXES * 4))
+    with open(source, "rb") as f:
+        for line in f:
+            parsed = parse_line(line)
+            if parsed:
+                digest = parsed[0]
+                counts[digest[0] << 12 | digest[1] << 4 | digest[2] >> 4] += 1
+    total = sum(counts)
+    if total >= 1 << 32:
+        raise ValueError("too many hashes for 32-bit record numbers")
+
+    table = array("I", [0])
+    for n in counts:
+        table.append(table[-1] + n)
+
+    # ---- Pass 2: scatter the records into their prefix ranges ----
+    records_at = HEADER.size + TABLE_BYTES
+    tmp = f"{output}.tmp"
+    with open(tmp, "wb+") as out:
+        out.truncate(records_at + total * RECORD.size)
+        out.write(HEADER.pack(MAGIC, total))
+        out.write(table.tobytes())
+        out.flush()
+        if total:
+            with mmap.mmap(out.fileno(), 0) as m:
+                cursor = array("I", table)   # Next free record number per prefix
+                with open(source, "rb") as f:
+                    for line in f:
+                        parsed = parse_line(line)
+                        if parsed:
+                            digest, count = parsed
+                            p = digest[0] << 12 | digest[1] << 4 | digest[2] >> 4
+                            RECORD.pack_into(m, records_at + cursor[p] * RECORD.size, digest[2:],
+                                             min(count, 0xFFFFFFFF))
+                            cursor[p] += 1
+                # ---- Sort each prefix range (a few hundred records) ----
+                for p in range(PREFIXES):
+                    start, end = records_at + table[p] * RECORD.size, records_at + table[p + 1] * RECORD.size
+                    if end - start > RECORD.size:
+                        chunk = m[start:end]
+                        rows = sorted(chunk[i:i + RECORD.size] for i in range(0, len(chunk), RECORD.size))
+                        m[start:end] = b"".join(rows)
+                m.flush()
+    os.replace(tmp, output)
+    return total
+
+
+class PwnedIndex:
+    """Read-only, memory-mapped index built by build_index()."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.records = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a pwned-passwords index")
+        self._table = memoryview(self._map)[HEADER.size:HEADER.size + TABLE_BYTES].cast("I")
+        self._records_at = HEADER.size + TABLE_BYTES
+
+    def count(self, sha1_hex: str) -> int:
+        """Breach count for an uppercase or lowercase SHA-1 hex digest (0 if not in the index)."""
+        digest = bytes.fromhex(sha1_hex)
+        key = digest[2:]
+        p = digest[0] << 12 | digest[1] << 4 | digest[2] >> 4
+        lo, hi = self._table[p], self._table[p + 1]
+        m, base, width = self._map, self._records_at, RECORD.size
+        # Binary search within the prefix range
+        while lo < hi:
+            mid = (lo + hi) // 2
+            at = base + mid * width
+            probe = m[at:at + KEY_BYTES]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return RECORD.unpack_from(m, at)[1]
+        return 0
+
+    def range_size(self, prefix: str) -> int:
+        """Number of hashes sharing a 5-hex-digit prefix."""
+        p = int(prefix, 16)
+        return self._table[p + 1] - self._table[p]
+
+    def close(self):
+        self._table.release()
+        self._map.close()
+
+
+def main(argv=None):
+    """Command line: build an index, or look a password / hash up in one."""
+    parser = argparse.ArgumentParser(description="Offline Pwned Passwords index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="index a HASH:COUNT text file")
+    p.add_argument("source")
+    p.add_argument("-o", "--output", default="pwned.idx")
+    p = sub.add_parser("lookup", help="breach count for a password or SHA-1 hash")
+    p.add_argument("index")
+    p.add_argument("value")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        started = time.perf_counter()
+        total = build_index(args.source, args.output)
+        print(f"Indexed {total:,} hashes into {args.output} in {time.perf_counter() - started:.1f} s")
+    else:
+        value = args.value
+        is_hash = len(value) == 40 and all(c in "0123456789abcdefABCDEF" for c in value)
+        sha1 = value if is_hash else hashlib.sha1(value.encode("utf-8")).hexdigest()
+        print(PwnedIndex(args.index).count(sha1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+# ---------------------------------------------------------------
+# Persistent cache for Have I Been Pwned range responses.
+# Each range is parsed once into a PackedRange (sorted binary suffixes
+# and counts) and kept in one SQLite database (WAL mode, so several
+# processes can share it), with its ETag:
+#   - entries younger than the TTL are served without any request
+#   - older entries are revalidated with If-None-Match: a 304 answer
+#     renews them without downloading the body again
+#   - the least recently used ranges are evicted above a size limit
+#   - the most recently used ranges also stay in memory, so repeated
+#     lookups in the same process never touch the database
+# Repeated audits of the same password lists are then served locally.
+# ---------------------------------------------------------------
+
+CACHE_PATH = os.environ.get(
+    "PWNED_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "password-checker", "ranges.sqlite3"))
+CACHE_TTL = int(os.environ.get("PWNED_CACHE_TTL", 7 * 24 * 3600))            # Seconds before revalidation
+CACHE_MAX_BYTES = int(os.environ.get("PWNED_CACHE_MAX_BYTES", 256 * 1024 * 1024))  # Packed ranges on disk
+HOT_RANGES = 512             # Parsed ranges kept in memory (~18 KB each)
+
+SCHEMA_VERSION = 2           # 1 stored zlib-compressed response text
+KEY_BYTES = 18               # A 35-hex-digit suffix, left-padded with one 0 digit
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ranges (
+    prefix  TEXT PRIMARY KEY,
+    body    BLOB NOT NULL,
+    etag    TEXT,
+    fetched REAL NOT NULL,
+    used    REAL NOT NULL,
+    size    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ranges_used ON ranges (used);
+"""
+
+
+class PackedRange:
+    """
+    One range as sorted fixed-width binary keys plus uint32 counts: 22 bytes
+    per hash instead of ~39 as response text, and a lookup is a binary search
+    (about 10 key comparisons) instead of splitting and comparing every line.
+    """
+
+    __slots__ = ("keys", "counts")
+
+    def __init__(self, keys: bytes, counts: array):
+        self.keys = keys          # len(counts) sorted keys of KEY_BYTES each
+        self.counts = counts
+
+    @classmethod
+    def from_text(cls, text: str):
+        """Parse a range response ('SUFFIX:COUNT' lines)."""
+        pairs = []
+        for line in text.splitlines():
+            suffix, _, count = line.partition(":")
+            if count:
+                pairs.append((bytes.fromhex("0" + suffix.strip()), int(count)))
+        pairs.sort()
+        return cls(b"".join(key for key, _ in pairs), array("I", (count for _, count in pairs)))
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """Inverse of to_bytes()."""
+        n = len(data) // (KEY_BYTES + 4)
+        counts = array("I")
+        counts.frombytes(data[n * KEY_BYTES:])
+        return cls(data[:n * KEY_BYTES], counts)
+
+    def to_bytes(self) -> bytes:
+        return self.keys + self.counts.tobytes()
+
+    def to_text(self) -> str:
+        """Back to the API's response format."""
+        return "\r\n".join(f"{self._key(i).hex().upper()[1:]}:{count}" for i, count in enumerate(self.counts))
+
+    def _key(self, i: int) -> bytes:
+        return self.keys[i * KEY_BYTES:(i + 1) * KEY_BYTES]
+
+    def count(self, suffix: str) -> int:
+        """Breach count for a 35-hex-digit suffix (0 if absent)."""
+        key = bytes.fromhex("0" + suffix)
+        i = bisect_left(range(len(self.counts)), key, key=self._key)
+        if i < len(self.counts) and self._key(i) == key:
+            return self.counts[i]
+        return 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.keys) + self.counts.itemsize * len(self.counts)
+
+
+class CachedRange:
+    """One cache entry: the parsed range, its ETag and whether it is still within the TTL."""
+
+    __slots__ = ("range", "etag", "fresh")
+
+    def __init__(self, packed: PackedRange, etag, fresh: bool):
+        self.range = packed
+        self.etag = etag
+        self.fresh = fresh
+
+
+class RangeCache:
+    """
+    SQLite-backed range cache with an in-memory LRU in front. Safe to share
+    between threads (one connection behind a lock) and between processes
+    (WAL mode, short transactions).
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL, max_bytes: int = CACHE_MAX_BYTES,
+                 hot_ranges: int = HOT_RANGES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hot_ranges = hot_ranges
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._hot = OrderedDict()   # prefix -> (PackedRange, etag, fetched)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")   # A crash may lose recent entries, never corrupt
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS ranges")   # Older format: start over
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(_SCHEMA)
+        self._bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ranges").fetchone()[0]
+
+    def _remember(self, prefix, packed, etag, fetched):
+        self._hot[prefix] = (packed, etag, fetched)
+        self._hot.move_to_end(prefix)
+        if len(self._hot) > self.hot_ranges:
+            self._hot.popitem(last=False)
+
+    def get(self, prefix: str):
+        """The cached range for `prefix` (fresh or stale), or None."""
+        now = time.time()
+        with self._lock:
+            hot = self._hot.get(prefix)
+            if hot is not None:
+                # Served from memory; `used` on disk is only updated when read from there
+                self._hot.move_to_end(prefix)
+                packed, etag, fetched = hot
+                return CachedRange(packed, etag, now - fetched < self.ttl)
+            row = self.conn.execute("SELECT body, etag, fetched FROM ranges WHERE prefix = ?", (prefix,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE ranges SET used = ? WHERE prefix = ?", (now, prefix))
+            body, etag, fetched = row
+            packed = PackedRange.from_bytes(body)
+            self._remember(prefix, packed, etag, fetched)
+        return CachedRange(packed, etag, now - fetched < self.ttl)
+
+    def put(self, prefix: str, packed: PackedRange, etag=None):
+        """Store a freshly downloaded range, then evict old ranges if the cache is too big."""
+        body = packed.to_bytes()
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM ranges WHERE prefix = ?", (prefix,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO ranges VALUES (?, ?, ?, ?, ?, ?)",
+                              (prefix, body, etag, now, now, len(body)))
+            self._remember(prefix, packed, etag, now)
+            self._bytes += len(body) - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def renew(self, prefix: str):
+        """The server confirmed the cached range is current (HTTP 304): restart its TTL."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("UPDATE ranges SET fetched = ?, used = ? WHERE prefix = ?", (now, now, prefix))
+            hot = self._hot.get(prefix)
+            if hot is not None:
+                self._hot[prefix] = (hot[0], hot[1], now)
+
+    def _evict(self):
+        """Delete least recently used ranges until the cache is below 90 % of its limit."""
+        # Other processes write to the same file: start from the real total
+        self._bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ranges").fetchone()[0]
+        target = self.max_bytes * 0.9
+        if self._bytes <= self.max_bytes:
+            return
+        rows = self.conn.execute("SELECT prefix, size FROM ranges ORDER BY used").fetchall()
+        # Ranges in memory were used more recently than `used` on disk says: they go last, oldest first
+        rank = {prefix: i for i, prefix in enumerate(self._hot)}
+        rows.sort(key=lambda row: rank.get(row[0], -1))
+        doomed = []
+        for prefix, size in rows:
+            if self._bytes <= target:
+                break
+            doomed.append((prefix,))
+            self._hot.pop(prefix, None)
+            self._bytes -= size
+        self.conn.executemany("DELETE FROM ranges WHERE prefix = ?", doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ranges").fetchone()
+        return {"ranges": count, "bytes": size, "in_memory": len(self._hot), "path": self.path}
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM ranges")
+            self._hot.clear()
+            self._bytes = 0
+
+    def close(self):
+        self.conn.close()
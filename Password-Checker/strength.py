@@ -0,0 +1,556 @@
+import os
+import re
+from array import array
+from datetime import date
+from functools import lru_cache
+from math import comb, factorial, log10
+
+# ---------------------------------------------------------------
+# Pattern-aware password strength estimation (in the style of zxcvbn).
+# A password is split into the patterns an attacker would try first:
+#   - words from the bundled wordlists (also reversed, capitalised, l33t)
+#   - keyboard walks (qwerty, keypad), repeats, sequences, recent years
+# and the cheapest way to cover it with those patterns (plus brute force
+# for the rest) is found by dynamic programming. The result is the
+# estimated number of guesses, not the theoretical charset entropy.
+# ---------------------------------------------------------------
+
+WORDLIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlists")
+SOURCES = ("passwords", "names", "english")      # wordlists/<source>.txt, ordered by frequency
+MAX_LENGTH = 100                # Longer input is truncated (the estimate is already 'very strong')
+
+BRUTEFORCE_CARDINALITY = 10
+MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10_000
+MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
+MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
+MIN_YEAR_SPACE = 20
+REFERENCE_YEAR = date.today().year
+MAX_SEQUENCE_DELTA = 5
+SCORE_THRESHOLDS = (1e3 + 5, 1e6 + 5, 1e8 + 5, 1e10 + 5)    # guesses for scores 1..4
+
+L33T = {
+    "4": "a", "@": "a", "8": "b", "(": "c", "{": "c", "[": "c", "<": "c", "3": "e",
+    "6": "g", "9": "g", "1": "il", "!": "i", "|": "il", "0": "o", "$": "s", "5": "s",
+    "7": "lt", "+": "t", "%": "x", "2": "z",
+}
+
+
+# ---- Wordlists in a packed trie ----
+
+class PackedTrie:
+    """
+    A trie flattened into arrays: the children of node n are the characters
+    labels[first[n]:first[n + 1]] leading to nodes targets[first[n]:first[n + 1]].
+    A node that ends a word has its frequency rank (1 = most common) in ranks[n]
+    and the wordlist it came from in sources[n]; ranks[n] is 0 otherwise.
+    """
+
+    __slots__ = ("first", "labels", "targets", "ranks", "sources")
+
+    def __init__(self, words: dict):
+        """Build from {word: (rank, source index)}."""
+        root = {}
+        for word in words:
+            node = root
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[""] = words[word]
+
+        self.first, self.targets = array("I", [0]), array("I")
+        self.ranks, self.sources = array("I"), array("B")
+        labels, queue = [], [root]
+        for node in queue:       # Breadth first, so node ids follow the queue order
+            rank, source = node.get("", (0, 0))
+            self.ranks.append(rank)
+            self.sources.append(source)
+            for ch in sorted(k for k in node if k):
+                labels.append(ch)
+                self.targets.append(len(queue))
+                queue.append(node[ch])
+            self.first.append(len(labels))
+        self.labels = "".join(labels)
+
+    @classmethod
+    def from_wordlists(cls, directory: str = WORDLIST_DIR) -> "PackedTrie":
+        """Load wordlists/<source>.txt; a word in several lists keeps its best rank."""
+        words = {}
+        for source, name in enumerate(SOURCES):
+            with open(os.path.join(directory, f"{name}.txt"), encoding="utf-8") as f:
+                for rank, line in enumerate(f, start=1):
+                    word = line.strip().lower()
+                    if word and (word not in words or rank < words[word][0]):
+                        words[word] = (rank, source)
+        return cls(words)
+
+    def prefixes(self, text: str, start: int, l33t: bool = True):
+        """
+        Yield (end, word, rank, source, subs) for every word that is a prefix of
+        text[start:], trying l33t substitutions for non-letters along the way.
+        `subs` maps each substituted character to the letter it stands for.
+        """
+        labels, first, targets, ranks = self.labels, self.first, self.targets, self.ranks
+        stack = [(0, start, "", {})]
+        while stack:
+            node, i, word, subs = stack.pop()
+            if i > start and ranks[node]:
+                yield i - 1, word, ranks[node], SOURCES[self.sources[node]], subs
+            if i == len(text):
+                continue
+            lo, hi = first[node], first[node + 1]
+            if lo == hi:
+                continue
+            ch = text[i]
+            k = labels.find(ch, lo, hi)
+            if k >= 0:
+                stack.append((targets[k], i + 1, word + ch, subs))
+            if l33t and ch in L33T:
+                for letter in L33T[ch]:
+                    # One meaning per character within a word ('1' is either i or l)
+                    if subs.get(ch, letter) != letter:
+                        continue
+                    k = labels.find(letter, lo, hi)
+                    if k >= 0:
+                        stack.append((targets[k], i + 1, word + letter, {**subs, ch: letter}))
+
+    def __len__(self) -> int:
+        return len(self.ranks)
+
+    def nbytes(self) -> int:
+        """Size of the arrays and labels."""
+        return sum(a.itemsize * len(a) for a in (self.first, self.targets, self.ranks, self.sources)) \
+            + len(self.labels)
+
+
+_trie = None
+
+
+def trie() -> PackedTrie:
+    """The bundled wordlists, loaded on first use."""
+    global _trie
+    if _trie is None:
+        _trie = PackedTrie.from_wordlists()
+    return _trie
+
+
+# ---- Keyboard layouts ----
+
+def _layout(rows, offsets, slanted: bool) -> dict:
+    """
+    {key: {neighbour: direction}} for keys laid out in rows (each entry is
+    'unshifted shifted' characters, '_' is no key). On a slanted keyboard a key
+    touches 6 others (left, right and 2 per adjacent row); on a keypad 8.
+    """
+    positions = {}
+    for r, (row, offset) in enumerate(zip(rows, offsets)):
+        for c, key in enumerate(row.split()):
+            if key != "_":
+                positions[key] = (r, c + offset)
+    graph = {}
+    for key, (r, x) in positions.items():
+        neighbours = {}
+        for other, (r2, x2) in positions.items():
+            dr, dx = r2 - r, x2 - x
+            if other == key or abs(dr) > 1:
+                continue
+            if (dr == 0 and abs(dx) == 1) or (dr and (-1 < dx < 1 if slanted else abs(dx) <= 1)):
+                for ch in other:
+                    neighbours[ch] = (dr, dx)
+        for ch in key:
+            graph[ch] = neighbours
+    return graph
+
+
+QWERTY = _layout(
+    ("`~ 1! 2@ 3# 4$ 5% 6^ 7& 8* 9( 0) -_ =+",
+     "qQ wW eE rR tT yY uU iI oO pP [{ ]} \\|",
+     "aA sS dD fF gG hH jJ kK lL ;: '\"",
+     "zZ xX cC vV bB nN mM ,< .> /?"),
+    (0, 0.5, 0.75, 1.25), slanted=True)
+KEYPAD = _layout(
+    ("_ / * -",
+     "7 8 9 +",
+     "4 5 6",
+     "1 2 3",
+     "_ 0 ."),
+    (0, 0, 0, 0, 0), slanted=False)
+SHIFTED = set("~!@#$%^&*()_+{}|:\"<>?ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+GRAPHS = {
+    # graph, starting characters, average number of neighbouring keys
+    name: (graph, len(graph), sum(len(set(n.values())) for n in graph.values()) / len(graph))
+    for name, graph in (("qwerty", QWERTY), ("keypad", KEYPAD))
+}
+
+
+# ---- Matchers ----
+
+def dictionary_matches(password: str) -> list:
+    """Wordlist words anywhere in the password, as typed, reversed and in l33t."""
+    lower = password.lower()
+    words = trie()
+    matches = []
+    for i in range(len(lower)):
+        for j, word, rank, source, subs in words.prefixes(lower, i):
+            matches.append({"pattern": "dictionary", "i": i, "j": j, "token": password[i:j + 1], "word": word,
+                            "rank": rank, "source": source, "l33t": subs, "reversed": False})
+
+    n = len(lower)
+    backwards = lower[::-1]
+    for i in range(n):
+        for j, word, rank, source, subs in words.prefixes(backwards, i, l33t=False):
+            if j - i < 2:
+                continue     # Short words read backwards are mostly other short words
+            matches.append({"pattern": "dictionary", "i": n - 1 - j, "j": n - 1 - i,
+                            "token": password[n - 1 - j:n - i], "word": word, "rank": rank,
+                            "source": source, "l33t": {}, "reversed": True})
+    return matches
+
+
+def spatial_matches(password: str) -> list:
+    """Runs of 3 or more adjacent keys, counting changes of direction and shifted keys."""
+    matches = []
+    for name, (graph, _, _) in GRAPHS.items():
+        i = 0
+        while i < len(password) - 2:
+            j, turns, direction = i + 1, 0, None
+            while j < len(password) and password[j] in graph.get(password[j - 1], ()):
+                step = graph[password[j - 1]][password[j]]
+                if step != direction:
+                    turns += 1
+                    direction = step
+                j += 1
+            if j - i > 2:
+                token = password[i:j]
+                matches.append({"pattern": "spatial", "i": i, "j": j - 1, "token": token, "graph": name,
+                                "turns": turns, "shifted": sum(ch in SHIFTED for ch in token)})
+                i = j - 1     # A walk can start where the last one ended
+            else:
+                i += 1
+    return matches
+
+
+_GREEDY = re.compile(r"(.+)\1+")
+_LAZY = re.compile(r"(.+?)\1+")
+_LAZY_ANCHORED = re.compile(r"^(.+?)\1+$")
+
+
+@lru_cache(maxsize=1024)
+def _base_guesses(base: str) -> float:
+    """Guesses for the repeated part of a repeat match; cached, as 'abab...' asks for 'ab' at every level."""
+    return estimate(base)["guesses"]
+
+
+def repeat_matches(password: str) -> list:
+    """Repeated substrings ('aaa', 'abcabc'); the repeated part is itself estimated."""
+    matches = []
+    pos = 0
+    while pos < len(password):
+        greedy = _GREEDY.search(password, pos)
+        if not greedy:
+            break
+        lazy = _LAZY.search(password, pos)
+        if len(greedy.group(0)) > len(lazy.group(0)):
+            # 'aabaab': greedy finds 'aab' twice, lazy only 'aa'
+            found, base = greedy, _LAZY_ANCHORED.match(greedy.group(0)).group(1)
+        else:
+            found, base = lazy, lazy.group(1)
+        matches.append({"pattern": "repeat", "i": found.start(), "j": found.end() - 1,
+                        "token": found.group(0), "base_token": base,
+                        "base_guesses": _base_guesses(base),
+                        "repeat_count": len(found.group(0)) // len(base)})
+        pos = found.end()
+    return matches
+
+
+def sequence_matches(password: str) -> list:
+    """Runs with a constant step between characters: 'abcd', '9753', 'ZYX'."""
+    matches = []
+
+    def add(i, j, delta):
+        if (j - i > 1 or abs(delta) == 1) and 0 < abs(delta) <= MAX_SEQUENCE_DELTA:
+            token = password[i:j + 1]
+            matches.append({"pattern": "sequence", "i": i, "j": j, "token": token,
+                            "ascending": delta > 0})
+
+    if len(password) < 2:
+        return matches
+    i, last = 0, None
+    for k in range(1, len(password)):
+        delta = ord(password[k]) - ord(password[k - 1])
+        if last is None:
+            last = delta
+        if delta == last:
+            continue
+        add(i, k - 1, last)
+        i, last = k - 1, delta
+    add(i, len(password) - 1, last)
+    return matches
+
+
+_YEAR = re.compile(r"19\d\d|20\d\d")
+
+
+def year_matches(password: str) -> list:
+    """Four-digit years from 1900 to 2099."""
+    return [{"pattern": "year", "i": m.start(), "j": m.end() - 1, "token": m.group(0)}
+            for m in _YEAR.finditer(password)]
+
+
+MATCHERS = (dictionary_matches, spatial_matches, repeat_matches, sequence_matches, year_matches)
+
+
+# ---- Guesses per match ----
+
+def _variations(a: int, b: int) -> int:
+    """Ways to pick which of a+b characters are the 'a' kind, at most half of them."""
+    return sum(comb(a + b, k) for k in range(1, min(a, b) + 1))
+
+
+def uppercase_variations(token: str) -> int:
+    """1 for lowercase; 2 for 'Word', 'worD' and 'WORD'; otherwise every way to place the capitals."""
+    if token.islower() or not any(ch.isalpha() for ch in token):
+        return 1
+    if token.isupper() or (token[0].isupper() and token[1:].islower()) \
+            or (token[-1].isupper() and token[:-1].islower()):
+        return 2
+    upper = sum(ch.isupper() for ch in token)
+    lower = sum(ch.islower() for ch in token)
+    return _variations(upper, lower)
+
+
+def l33t_variations(match: dict) -> int:
+    """Extra guesses for the substituted characters (either all, or any mix of them)."""
+    variations = 1
+    token = match["token"].lower()
+    for sub, letter in match["l33t"].items():
+        subbed = token.count(sub)
+        unsubbed = sum(token.count(ch) for ch in letter)
+        variations *= 2 if not unsubbed else _variations(subbed, unsubbed)
+    return variations
+
+
+def spatial_guesses(match: dict) -> float:
+    """Walks of this length with at most this many turns, from any start key."""
+    _, starts, degree = GRAPHS[match["graph"]]
+    length, turns = len(match["token"]), match["turns"]
+    guesses = 0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += comb(i - 1, j - 1) * starts * degree ** j
+    shifted, unshifted = match["shifted"], length - match["shifted"]
+    if shifted:
+        guesses *= 2 if not unshifted else _variations(shifted, unshifted)
+    return guesses
+
+
+def sequence_guesses(match: dict) -> float:
+    """Obvious starts ('a', '1', 'z') are tried first; descending doubles the guesses."""
+    first = match["token"][0]
+    if first in "aAzZ019":
+        base = 4
+    elif first.isdigit():
+        base = 10
+    else:
+        base = 26
+    if not match["ascending"]:
+        base *= 2
+    return base * len(match["token"])
+
+
+def match_guesses(match: dict, password: str) -> float:
+    """Guesses to find this match's token, knowing its pattern."""
+    pattern = match["pattern"]
+    if pattern == "bruteforce":
+        return bruteforce_guesses(match["token"])
+    if pattern == "dictionary":
+        guesses = match["rank"] * uppercase_variations(match["token"]) * l33t_variations(match)
+        if match["reversed"]:
+            guesses *= 2
+    elif pattern == "spatial":
+        guesses = spatial_guesses(match)
+    elif pattern == "repeat":
+        guesses = match["base_guesses"] * match["repeat_count"]
+    elif pattern == "sequence":
+        guesses = sequence_guesses(match)
+    else:    # year
+        guesses = max(abs(int(match["token"]) - REFERENCE_YEAR), MIN_YEAR_SPACE)
+    if len(match["token"]) < len(password):
+        floor = MIN_SUBMATCH_GUESSES_SINGLE_CHAR if len(match["token"]) == 1 else MIN_SUBMATCH_GUESSES_MULTI_CHAR
+        guesses = max(guesses, floor)
+    return guesses
+
+
+def bruteforce_guesses(token: str) -> float:
+    """10 per character, with the same floors as a submatch (plus one, so a pattern wins a tie)."""
+    guesses = float(BRUTEFORCE_CARDINALITY) ** len(token)
+    floor = MIN_SUBMATCH_GUESSES_SINGLE_CHAR + 1 if len(token) == 1 else MIN_SUBMATCH_GUESSES_MULTI_CHAR + 1
+    return max(guesses, floor)
+
+
+# ---- Minimum guesses over all matches ----
+
+def _sequence_guesses(sequence: list) -> float:
+    pi = 1
+    for m in sequence:
+        pi = m["guesses"] * pi
+    return factorial(len(sequence)) * pi + MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (len(sequence) - 1)
+
+
+def greedy_sequence(password: str, matches: list):
+    """
+    A quick cover of the password: at each position the longest match starting
+    there, brute force in between. Returns (guesses, sequence); the guesses
+    are an upper bound for most_guessable_sequence().
+    """
+    longest = {}
+    for m in matches:
+        best = longest.get(m["i"])
+        if best is None or (m["j"], -m["guesses"]) > (best["j"], -best["guesses"]):
+            longest[m["i"]] = m
+    sequence, gap, i = [], 0, 0
+    while i < len(password):
+        m = longest.get(i)
+        if m is None:
+            i += 1
+            continue
+        if gap < i:
+            token = password[gap:i]
+            sequence.append({"pattern": "bruteforce", "i": gap, "j": i - 1, "token": token,
+                             "guesses": bruteforce_guesses(token)})
+        sequence.append(m)
+        i = gap = m["j"] + 1
+    if gap < len(password):
+        token = password[gap:]
+        sequence.append({"pattern": "bruteforce", "i": gap, "j": len(password) - 1, "token": token,
+                         "guesses": bruteforce_guesses(token)})
+    return _sequence_guesses(sequence), sequence
+
+
+def most_guessable_sequence(password: str, matches: list):
+    """
+    The sequence of non-overlapping matches (gaps filled by brute force) that
+    covers the password with the fewest guesses. For a sequence of l matches
+    that is l! * product(guesses) + 10000^(l-1): the attacker does not know
+    the order or the number of patterns, and each extra pattern costs a step.
+    Returns (guesses, sequence).
+    Extending a sequence never lowers its guesses, so anything worse than the
+    greedy cover is dropped: brute-force runs of more than log10(bound)
+    characters and sequences of more than log10(bound) / 4 + 1 matches are
+    never tried, which keeps long repetitive input ('abab...') fast.
+    """
+    n = len(password)
+    if n == 0:
+        return 1, []
+    bound, greedy = greedy_sequence(password, matches)
+    max_run = int(log10(bound)) + 1
+    max_matches = int(log10(bound) / 4) + 2
+    by_end = [[] for _ in range(n)]
+    for m in matches:
+        by_end[m["j"]].append(m)
+
+    # best_*[k][l]: best sequence of l matches covering password[:k + 1]
+    best_g = [{} for _ in range(n)]      # Total guesses
+    best_pi = [{} for _ in range(n)]     # Product of the match guesses
+    best_m = [{} for _ in range(n)]      # Last match
+
+    def update(m, l):
+        if l > max_matches:
+            return
+        k = m["j"]
+        pi = m["guesses"]
+        if l > 1:
+            pi *= best_pi[m["i"] - 1][l - 1]
+        g = factorial(l) * pi + MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (l - 1)
+        if g > bound:
+            return
+        # Only keep it if no sequence of at most l matches ending here is as good
+        for other_l, other_g in best_g[k].items():
+            if other_l <= l and other_g <= g:
+                return
+        best_g[k][l], best_pi[k][l], best_m[k][l] = g, pi, m
+
+    def bruteforce(i, k):
+        token = password[i:k + 1]
+        return {"pattern": "bruteforce", "i": i, "j": k, "token": token, "guesses": bruteforce_guesses(token)}
+
+    for k in range(n):
+        for m in by_end[k]:
+            if m["i"] > 0:
+                for l in list(best_m[m["i"] - 1]):
+                    update(m, l + 1)
+            else:
+                update(m, 1)
+        update(bruteforce(0, k), 1)
+        for i in range(max(1, k + 1 - max_run), k + 1):
+            # Two brute-force runs in a row are one run, so only extend sequences ending in a pattern
+            lengths = [l for l, last in best_m[i - 1].items() if last["pattern"] != "bruteforce"]
+            if lengths:
+                m = bruteforce(i, k)
+                for l in lengths:
+                    update(m, l + 1)
+
+    if not best_g[n - 1]:
+        return bound, greedy   # Every sequence the search kept ended up worse than the greedy one
+    l = min(best_g[n - 1], key=best_g[n - 1].get)
+    guesses = best_g[n - 1][l]
+    sequence, k = [], n - 1
+    while k >= 0:
+        m = best_m[k][l]
+        sequence.append(m)
+        k, l = m["i"] - 1, l - 1
+    return guesses, sequence[::-1]
+
+
+# ---- Result ----
+
+def score_for(guesses: float) -> int:
+    """0 (too guessable) .. 4 (very unguessable)."""
+    return sum(guesses >= t for t in SCORE_THRESHOLDS)
+
+
+def warning_for(sequence: list, score: int) -> str:
+    """A short hint about the main weakness ('' for strong passwords)."""
+    if score > 2 or not sequence:
+        return ""
+    m = max(sequence, key=lambda m: len(m["token"]))
+    pattern = m["pattern"]
+    if pattern == "dictionary":
+        if m["source"] == "passwords":
+            if len(sequence) == 1 and not m["l33t"] and not m["reversed"]:
+                return "This is a very common password."
+            return "This is similar to a commonly used password."
+        if m["source"] == "names":
+            return "Names and surnames are easy to guess."
+        return "A word by itself is easy to guess."
+    if pattern == "spatial":
+        return "Straight rows of keys are easy to guess." if m["turns"] == 1 \
+            else "Short keyboard patterns are easy to guess."
+    if pattern == "repeat":
+        return 'Repeats like "aaa" are easy to guess.' if len(m["base_token"]) == 1 \
+            else 'Repeats like "abcabcabc" are only slightly harder to guess than "abc".'
+    if pattern == "sequence":
+        return "Sequences like abc or 6543 are easy to guess."
+    if pattern == "year":
+        return "Recent years are easy to guess."
+    return ""
+
+
+def estimate(password: str) -> dict:
+    """
+    Estimate how many guesses it takes to find `password`.
+    Returns {'guesses', 'guesses_log10', 'score' (0-4), 'sequence', 'warning'},
+    where 'sequence' is the list of matches (dicts with 'pattern', 'token',
+    'i', 'j', 'guesses', ...) the estimate is based on.
+    """
+    password = password[:MAX_LENGTH]
+    matches = [m for matcher in MATCHERS for m in matcher(password)]
+    for m in matches:
+        m["guesses"] = match_guesses(m, password)
+    guesses, sequence = most_guessable_sequence(password, matches)
+    score = score_for(guesses)
+    return {
+        "guesses": guesses,
+        "guesses_log10": log10(guesses),
+        "score": score,
+        "sequence": sequence,
+        "warning": warning_for(sequence, score),
+    }
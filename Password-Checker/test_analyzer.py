@@ -1,25 +1,76 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+import analyzer
 from analyzer import count_pwned_occurrences
+from pwned_index import build_index
 
-# This script performs simple manual tests (not pytest).
+# This script performs simple tests (plain asserts, also collected by pytest).
 # Run with:  python test_analyzer.py
-# Purpose: verify that the Have I Been Pwned API integration works correctly.
+# Purpose: verify the breach check. By default it runs offline against the
+# sample in fixtures/pwned_sample.txt, so results never depend on the network.
+# Set HIBP_LIVE=1 to also check the live Have I Been Pwned API.
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pwned_sample.txt")
+LIVE = os.environ.get("HIBP_LIVE") == "1"
+
+
+@contextmanager
+def sample_index():
+    """Build the sample index in a temporary directory and switch the analyzer to it until the block ends."""
+    with tempfile.TemporaryDirectory(prefix="pwned-") as tmp:
+        path = os.path.join(tmp, "sample.idx")
+        build_index(FIXTURE, path)
+        analyzer.use_offline_index(path)
+        try:
+            yield path
+        finally:
+            analyzer.offline_index().close()
+            analyzer.use_offline_index(None)
 
-def test_common_password():
+
+@pytest.fixture
+def fixture_index():
+    with sample_index() as path:
+        yield path
+
+
+def test_common_password(fixture_index):
     """Test with a very common password expected to appear in breaches."""
     result = count_pwned_occurrences("password123")
-    assert result > 0, "Expected 'password123' to appear in data breaches."
-    print(f"✅ Test passed: 'password123' found {result} times in HIBP database.")
+    assert result == 2_556_117, "Expected 'password123' to appear in the sample."
+    print(f"✅ Test passed: 'password123' found {result} times in the offline sample.")
 
 
-def test_unique_password():
+def test_unique_password(fixture_index):
     """Test with a unique password that should not appear in breaches."""
     result = count_pwned_occurrences("fjellstad_unique_2025_pass")
     assert result == 0, "Expected unique password not to appear in breaches."
-    print("✅ Test passed: unique password not found in HIBP database.")
+    print("✅ Test passed: unique password not found in the offline sample.")
+
+
+def test_live_api():
+    """The same checks against the live API (only with HIBP_LIVE=1)."""
+    if not LIVE:
+        print("⏭️  Skipped live API test (set HIBP_LIVE=1 to run it).")
+        return
+    saved = analyzer.PWNED_INDEX
+    analyzer.use_offline_index(None)
+    try:
+        assert count_pwned_occurrences("password123") > 0, "Expected 'password123' to appear in data breaches."
+        assert count_pwned_occurrences("fjellstad_unique_2025_pass") == 0
+        print("✅ Test passed: live HIBP API agrees.")
+    finally:
+        analyzer.use_offline_index(saved)
 
 
 if __name__ == "__main__":
     print("Running analyzer self-tests...\n")
-    test_common_password()
-    test_unique_password()
+    with sample_index() as path:
+        test_common_password(path)
+        test_unique_password(path)
+    test_live_api()
     print("\nAll manual tests completed successfully.")
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import analyzer
+from audit import audit, main, to_sha1
+from range_cache import RangeCache
+
+# Tests for the bulk audit (run with pytest).
+# A local stand-in for the HIBP range API serves fixtures/pwned_sample.txt
+# and counts the requests per prefix.
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pwned_sample.txt")
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.setattr(analyzer, "_offline_index", None)
+    monkeypatch.setattr(analyzer, "PWNED_INDEX", None)
+    monkeypatch.setattr(analyzer, "_range_cache", None)
+    monkeypatch.setattr(analyzer, "CACHE_PATH", str(tmp_path / "ranges.sqlite3"))
+    ranges = {}
+    with open(FIXTURE, encoding="ascii") as f:
+        for line in f:
+            if not line.startswith("#"):
+                hash_hex, count = line.strip().split(":")
+                ranges.setdefault(hash_hex[:5], []).append(f"{hash_hex[5:]}:{count}")
+    hits = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            prefix = self.path.rsplit("/", 1)[-1]
+            hits[prefix] += 1
+            if prefix == "FFFFF":
+                self.send_error(404)   # Never retried: the entries stay unchecked
+                return
+            if prefix == "EEEEE":
+                self.send_response(304)   # Without an If-None-Match, so there is nothing to reuse
+                self.end_headers()
+                return
+            body = "\r\n".join(ranges.get(prefix, [])).encode("ascii")
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                hits[prefix, 304] += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/range/", hits
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_each_range_is_fetched_once(server):
+    base_url, hits = server
+    entries = ["password123", "qwerty", "password123", "not-breached-1", "not-breached-2",
+               hashlib.sha1(b"letmein").hexdigest()]                  # Hashes and passwords can be mixed
+    report = audit(entries, workers=4, base_url=base_url, use_cache=False)
+    counts = [count for _, _, count in report["results"]]
+    assert counts == [2_556_117, 10_400_000, 2_556_117, 0, 0, 650_000]
+    assert (report["entries"], report["unique"], report["pwned"]) == (6, 5, 4)
+    assert report["requests"] == report["ranges"] == 5
+    assert set(hits.values()) == {1}
+
+
+def test_repeated_audits_use_the_cache(server):
+    base_url, hits = server
+    entries = ["password123", "qwerty", "not-breached-1"]
+    first = audit(entries, base_url=base_url)
+    assert first["sources"] == {"downloaded": 3}
+    second = audit(entries, base_url=base_url)
+    assert second["sources"] == {"cached": 3} and second["results"] == first["results"]
+    assert sum(hits.values()) == 3
+
+    analyzer.range_cache().ttl = 0       # Everything expired: revalidate with the ETag
+    third = audit(entries, base_url=base_url)
+    assert third["sources"] == {"revalidated": 3} and third["results"] == first["results"]
+    assert sum(n for key, n in hits.items() if isinstance(key, tuple)) == 3
+
+
+def test_cache_can_be_chosen_or_bypassed(server, tmp_path):
+    base_url, hits = server
+    own = RangeCache(str(tmp_path / "own.sqlite3"))
+    assert audit(["qwerty"], base_url=base_url, cache=own)["sources"] == {"downloaded": 1}
+    assert own.get(to_sha1("qwerty")[:5]) is not None
+    assert audit(["qwerty"], base_url=base_url, use_cache=False)["sources"] == {"downloaded": 1}
+    assert analyzer.range_cache().get(to_sha1("qwerty")[:5]) is None    # Neither audit used the configured cache
+    own.close()
+
+
+def test_failed_ranges_are_reported(server):
+    base_url, hits = server
+    report = audit(["F" * 40, "qwerty"], base_url=base_url)
+    assert list(report["failed"]) == ["FFFFF"]
+    assert [count for _, _, count in report["results"]] == [None, 10_400_000]
+
+
+def test_unexpected_status_is_not_stored_as_a_range(server):
+    base_url, hits = server
+    with pytest.raises(requests.HTTPError):
+        analyzer.get_range("EEEEE", base_url=base_url)
+    assert analyzer.range_cache().get("EEEEE") is None
+    assert list(audit(["E" * 40], base_url=base_url)["failed"]) == ["EEEEE"]
+
+
+def test_report_uses_file_line_numbers(server, tmp_path):
+    base_url, hits = server
+    sha1 = hashlib.sha1(b"qwerty").hexdigest()
+    path = tmp_path / "hashes.txt"
+    path.write_text(f"\n{sha1}\n\nnot-a-hash\n{sha1.upper()}\n", encoding="utf-8")
+    report_path = tmp_path / "report.json"
+    main([str(path), "--hashes", "--url", base_url, "--json", str(report_path)])
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert [line for line, _, _ in report["results"]] == [2, 5]
+    assert report["invalid"] == [4]
+    assert report["entries"] == 2 and report["pwned"] == 2
+
+
+def test_hash_detection():
+    sha1 = hashlib.sha1(b"x").hexdigest()
+    assert to_sha1(sha1) == sha1.upper()
+    assert to_sha1(sha1, hashes=False) == hashlib.sha1(sha1.encode()).hexdigest().upper()
+    with pytest.raises(ValueError):
+        to_sha1("not-a-hash", hashes=True)
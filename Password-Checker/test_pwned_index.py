@@ -0,0 +1,48 @@
+import hashlib
+import os
+
+import pytest
+
+from pwned_index import PwnedIndex, build_index
+
+# Tests for the offline index (run with pytest).
+# They build an index from fixtures/pwned_sample.txt, which is unsorted,
+# has CRLF line endings in places, a comment line, and several hashes
+# sharing the prefix of 'password123'.
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pwned_sample.txt")
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "sample.idx")
+    assert build_index(FIXTURE, path) == 313
+    return PwnedIndex(path)
+
+
+def sha1(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest().upper()
+
+
+def test_every_fixture_line_is_found(index):
+    with open(FIXTURE, encoding="ascii") as f:
+        entries = [line.strip().split(":") for line in f if not line.startswith("#")]
+    for hash_hex, count in entries:
+        assert index.count(hash_hex) == int(count)
+        assert index.count(hash_hex.lower()) == int(count)
+
+
+def test_missing_hashes_and_shared_prefix(index):
+    assert index.count(sha1("password123")) == 2_556_117
+    assert index.range_size(sha1("password123")[:5]) == 9
+    assert index.count(sha1("not in the sample")) == 0
+    # Same prefix and nearly the same suffix as a stored hash
+    assert index.count(sha1("password123")[:-1] + "0") == 0
+
+
+def test_empty_source(tmp_path):
+    source = tmp_path / "empty.txt"
+    source.write_text("\n")
+    path = str(tmp_path / "empty.idx")
+    assert build_index(str(source), path) == 0
+    assert PwnedIndex(path).count(sha1("password")) == 0
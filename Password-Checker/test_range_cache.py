@@ -0,0 +1,59 @@
+import time
+
+from range_cache import PackedRange, RangeCache
+
+# Tests for the persistent range cache (run with pytest).
+
+
+def text(i):
+    return "\r\n".join(f"{i:05X}{n:030X}:{n + 1}" for n in range(200))
+
+
+def body(i):
+    return PackedRange.from_text(text(i))
+
+
+def test_packed_range_lookups_and_round_trip():
+    lines = [f"{n * 7919:035X}:{n + 1}" for n in range(300)]
+    packed = PackedRange.from_text("\r\n".join(reversed(lines)) + "\r\n")   # Unsorted, trailing newline
+    assert len(packed) == 300
+    assert all(packed.count(line[:35]) == int(line[36:]) for line in lines)
+    assert packed.count("F" * 35) == 0 and packed.count(lines[5][:34] + "1") == 0
+    assert packed.to_text() == "\r\n".join(lines)
+    assert PackedRange.from_bytes(packed.to_bytes()).to_text() == packed.to_text()
+    assert PackedRange.from_text("").count("0" * 35) == 0
+    assert packed.nbytes < len("\r\n".join(lines))
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = RangeCache(path, ttl=60)
+    cache.put("ABCDE", body(1), '"v1"')
+    cache.close()
+    entry = RangeCache(path, ttl=60).get("ABCDE")
+    assert (entry.range.to_text(), entry.etag, entry.fresh) == (text(1), '"v1"', True)
+    assert RangeCache(path, ttl=0).get("ABCDE").fresh is False
+    assert RangeCache(path).get("00000") is None
+
+
+def test_renew_restarts_the_ttl(tmp_path):
+    cache = RangeCache(str(tmp_path / "cache.sqlite3"), ttl=0.05)
+    cache.put("ABCDE", body(1))
+    time.sleep(0.06)
+    assert not cache.get("ABCDE").fresh
+    cache.renew("ABCDE")
+    assert cache.get("ABCDE").fresh
+
+
+def test_least_recently_used_ranges_are_evicted(tmp_path):
+    limit = sum(len(body(i).to_bytes()) for i in range(10))   # Exactly the first ten
+    cache = RangeCache(str(tmp_path / "cache.sqlite3"), max_bytes=limit, hot_ranges=4)
+    for i in range(10):
+        cache.put(f"{i:05X}", body(i))
+        time.sleep(0.001)
+    cache.get("00000")                    # Recently used: kept
+    cache.put("0000A", body(10))          # Over the limit: the oldest unused ranges go
+    assert cache.get("00000") is not None
+    assert cache.get("00001") is None and cache.get("00002") is None
+    assert cache.stats()["bytes"] <= limit * 0.9
+    assert cache.stats()["in_memory"] <= 4
@@ -0,0 +1,72 @@
+from strength import PackedTrie, estimate
+
+# Tests for the pattern-aware strength estimator (run with pytest).
+
+
+def patterns(password):
+    return [(m["pattern"], m["token"]) for m in estimate(password)["sequence"]]
+
+
+def test_packed_trie_prefixes():
+    trie = PackedTrie({"pass": (5, 0), "password": (2, 0), "word": (9, 2)})
+    found = [(j, word, rank) for j, word, rank, _, _ in trie.prefixes("xpassword", 1)]
+    assert sorted(found) == [(4, "pass", 5), (8, "password", 2)]
+    assert [w for _, w, _, _, subs in trie.prefixes("p@$$w0rd", 0) if subs == {"@": "a", "$": "s", "0": "o"}] \
+        == ["password"]
+
+
+def test_common_password_with_decorations_is_weak():
+    # Charset entropy called this ~79 bits
+    result = estimate("Password123!")
+    assert result["score"] <= 1
+    assert result["sequence"][0]["pattern"] == "dictionary"
+    assert result["warning"]
+
+
+def test_l33t_substitutions():
+    result = estimate("p@ssw0rd")
+    (match,) = result["sequence"]
+    assert match["word"] == "password" and match["l33t"] == {"@": "a", "0": "o"}
+    assert result["score"] == 0
+
+
+def test_reversed_word():
+    (match,) = estimate("drowssap")["sequence"]
+    assert match["pattern"] == "dictionary" and match["reversed"]
+
+
+def test_keyboard_walk():
+    assert patterns("zxcvbnm,./") == [("spatial", "zxcvbnm,./")]
+    assert ("spatial", "7412369") in patterns("q7412369")
+    assert estimate("zxcvbnm,./")["score"] <= 1
+
+
+def test_repeat():
+    assert patterns("xyzxyzxyz") == [("repeat", "xyzxyzxyz")]
+    result = estimate("aaaaaaaaaaaa")
+    assert result["sequence"][0]["repeat_count"] == 12
+    assert result["score"] == 0
+
+
+def test_long_repetitive_input():
+    assert patterns("ab" * 50) == [("repeat", "ab" * 50)]
+    assert patterns("ab" * 48 + "q7#") == [("repeat", "ab" * 48), ("bruteforce", "q7#")]
+    assert estimate("1" * 100)["sequence"][0]["repeat_count"] == 100
+
+
+def test_sequence_and_year():
+    assert patterns("klmnopqr") == [("sequence", "klmnopqr")]
+    assert patterns("97531") == [("sequence", "97531")]
+    assert ("year", "1998") in patterns("Jorgen1998")
+
+
+def test_random_password_is_strong():
+    result = estimate("x7#Kp2$qLm9!vR4t")
+    assert result["score"] == 4
+    assert result["warning"] == ""
+    assert result["guesses_log10"] > 15
+
+
+def test_empty_and_overlong():
+    assert estimate("")["guesses"] == 1
+    assert estimate("a" * 5000)["sequence"][0]["token"] == "a" * 100